@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare the default asyncio loop with uvloop.
+
+Runs the load harness (throughput through the broker-backed work queue)
+and an in-process load measured by LoopWatchdog (scheduling lag) with
+each loop implementation. uvloop is optional; its rows are skipped when
+it is not installed.
+
+    python -m benchmarks.bench_event_loop --workers 1 --jobs 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.load_harness import run_load, _burn_cpu
+from utils.loop_watchdog import LoopWatchdog, install_event_loop_policy
+
+
+async def _lag_under_load(jobs, concurrency, cpu_ms, io_ms):
+    watchdog = LoopWatchdog(interval=0.01, threshold=1.0, report_interval=3600)
+    watchdog.start()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def handle():
+        async with slots:
+            _burn_cpu(cpu_ms / 2)
+            await asyncio.sleep(io_ms / 1000)
+            _burn_cpu(cpu_ms / 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handle() for _ in range(jobs)))
+    elapsed = time.perf_counter() - started
+    watchdog.stop()
+    return jobs / elapsed, watchdog.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--cpu-ms', type=float, default=2.0)
+    parser.add_argument('--io-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"{'loop':>8} {'harness jobs/s':>15} {'local jobs/s':>13} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    for name in ('asyncio', 'uvloop'):
+        installed = install_event_loop_policy(name)
+        if installed != name:
+            print(f"{name:>8} {'(not installed)':>15}")
+            continue
+        harness_rate = run_load(args.workers, args.jobs, args.concurrency, args.cpu_ms, args.io_ms, name)
+        local_rate, lag = asyncio.run(_lag_under_load(args.jobs, args.concurrency, args.cpu_ms, args.io_ms))
+        print(
+            f"{name:>8} {harness_rate:>15.1f} {local_rate:>13.1f} "
+            f"{lag['lag_p50_ms']:>6.1f}ms {lag['lag_p99_ms']:>6.1f}ms {lag['lag_max_ms']:>6.1f}ms"
+        )
+    asyncio.set_event_loop_policy(None)
+
+
+if __name__ == "__main__":
+    main()
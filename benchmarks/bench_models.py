@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-object memory and encode/decode cost of the session models.
+
+Compares the slotted models and their binary fast path against the previous
+dataclass + asdict + JSON/isoformat round trip.
+
+    python -m benchmarks.bench_models
+"""
+import json
+import timeit
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+from models import UserSession, RequestState
+
+
+@dataclass
+class LegacyUserSession:
+    """The dataclass model as it was before the slotted rewrite"""
+    user_id: int
+    original_query: str
+    current_index: int = 0
+    total_files: int = 0
+    buttons_data: List[Dict[str, Any]] = None
+    session_id: str = None
+    created_at: datetime = None
+    last_activity: datetime = None
+
+    def __post_init__(self):
+        if self.buttons_data is None:
+            self.buttons_data = []
+        if self.created_at is None:
+            self.created_at = datetime.now()
+        if self.last_activity is None:
+            self.last_activity = self.created_at
+        if self.session_id is None:
+            import uuid
+            self.session_id = str(uuid.uuid4())[:8]
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data['created_at'] = self.created_at.isoformat()
+        data['last_activity'] = self.last_activity.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> 'LegacyUserSession':
+        data = json.loads(raw)
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        data['last_activity'] = datetime.fromisoformat(data['last_activity'])
+        return cls(**data)
+
+
+def _buttons(count):
+    # JSON cannot carry raw callback bytes, so the legacy path gets str payloads
+    return [{'text': f"Movie.Name.2003.1080p.Part{i}.mkv [1.4GB]", 'data': f"file_{i:04d}", 'same_peer': False}
+            for i in range(count)]
+
+
+def _measure_memory(factory, count=10000):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return total / count
+
+
+def _time(stmt, number=20000):
+    return timeit.timeit(stmt, number=number) / number * 1e6
+
+
+def main():
+    buttons = _buttons(10)
+
+    print("Per-object memory (bytes, empty buttons):")
+    print(f"  legacy UserSession  {_measure_memory(lambda i: LegacyUserSession(user_id=i, original_query='matrix reloaded')):8.0f}")
+    print(f"  slotted UserSession {_measure_memory(lambda i: UserSession(user_id=i, original_query='matrix reloaded')):8.0f}")
+    print(f"  slotted RequestState {_measure_memory(lambda i: RequestState(i, 'abcd1234', 'matrix reloaded', 'puppet', i, 1.0)):7.0f}")
+
+    legacy = LegacyUserSession(user_id=42, original_query='matrix reloaded', total_files=10, buttons_data=buttons)
+    slotted = UserSession(user_id=42, original_query='matrix reloaded', total_files=10,
+                          buttons_data=[dict(b, data=b['data'].encode()) for b in buttons])
+    legacy_raw = legacy.to_json()
+    slotted_raw = slotted.to_bytes()
+
+    print("\nUserSession with 10 buttons:")
+    print(f"  encoded size   legacy {len(legacy_raw.encode()):6d} B   slotted {len(slotted_raw):6d} B")
+    print(f"  encode         legacy {_time(legacy.to_json):6.2f} us  slotted {_time(slotted.to_bytes):6.2f} us")
+    print(f"  decode         legacy {_time(lambda: LegacyUserSession.from_json(legacy_raw)):6.2f} us  "
+          f"slotted {_time(lambda: UserSession.from_bytes(slotted_raw)):6.2f} us")
+
+    state = RequestState(42, 'abcd1234', 'matrix reloaded', 'puppet', 1234, 1.0)
+    state_raw = state.to_bytes()
+    state_json = json.dumps(state.to_dict())
+    print("\nRequestState:")
+    print(f"  encoded size   json   {len(state_json):6d} B   binary  {len(state_raw):6d} B")
+    print(f"  encode         json   {_time(lambda: json.dumps(state.to_dict())):6.2f} us  binary  {_time(state.to_bytes):6.2f} us")
+    print(f"  decode         json   {_time(lambda: RequestState.from_dict(json.loads(state_json))):6.2f} us  "
+          f"binary  {_time(lambda: RequestState.from_bytes(state_raw)):6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load harness for the multi-process topology.
+
+Pushes search jobs through the shared work queue (Unix-socket broker) and
+drains them with N simulated puppet worker processes. Each job burns some
+CPU (parsing, session encode/decode) and waits on simulated backend I/O,
+so a single event loop saturates one core while N workers should scale
+close to linearly.
+
+    python -m benchmarks.load_harness --workers 1,2,4 --jobs 2000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from database.local_broker import LocalBroker, BrokerQueueClient
+from utils.loop_watchdog import install_event_loop_policy
+
+AUTHKEY = 'load-harness'
+
+
+def _burn_cpu(milliseconds):
+    deadline = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _worker_loop(client, processed, stop, concurrency, cpu_ms, io_ms):
+    tasks = set()
+
+    async def handle(entry_id):
+        _burn_cpu(cpu_ms / 2)              # parse + session lookup
+        await asyncio.sleep(io_ms / 1000)  # backend round trip
+        _burn_cpu(cpu_ms / 2)              # forward + session update
+        await asyncio.to_thread(client.ack, entry_id)
+        with processed.get_lock():
+            processed.value += 1
+
+    while not stop.is_set():
+        free = concurrency - len(tasks)
+        if free <= 0:
+            await asyncio.sleep(0.001)
+            continue
+        jobs = await asyncio.to_thread(client.claim, free, 100)
+        for entry_id, _ in jobs:
+            task = asyncio.create_task(handle(entry_id))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _worker_main(address, index, processed, stop, concurrency, cpu_ms, io_ms, loop_policy):
+    install_event_loop_policy(loop_policy)
+    client = BrokerQueueClient(address, AUTHKEY, consumer=f"bench-{index}")
+    asyncio.run(_worker_loop(client, processed, stop, concurrency, cpu_ms, io_ms))
+
+
+def run_load(workers, jobs, concurrency=20, cpu_ms=2.0, io_ms=50.0, loop_policy='asyncio'):
+    """Return jobs/second for the given number of worker processes"""
+    address = os.path.join(tempfile.mkdtemp(), 'broker.sock')
+    broker = LocalBroker(address, AUTHKEY)
+    broker.start()
+    try:
+        producer = BrokerQueueClient(address, AUTHKEY, consumer='producer')
+        for i in range(jobs):
+            producer.enqueue({'action': 'search', 'user_id': str(i), 'session_id': f"s{i}", 'query': f"query {i}"})
+
+        processed = multiprocessing.Value('i', 0)
+        stop = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(address, index, processed, stop, concurrency, cpu_ms, io_ms, loop_policy)
+            )
+            for index in range(workers)
+        ]
+
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        while processed.value < jobs:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for process in processes:
+            process.join()
+        return jobs / elapsed
+    finally:
+        broker.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts')
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20, help='In-flight jobs per worker')
+    parser.add_argument('--cpu-ms', type=float, default=2.0, help='CPU time per job')
+    parser.add_argument('--io-ms', type=float, default=50.0, help='Simulated backend latency per job')
+    parser.add_argument('--loop', choices=['asyncio', 'uvloop'], default='asyncio')
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'jobs/s':>10} {'speedup':>8}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        rate = run_load(workers, args.jobs, args.concurrency, args.cpu_ms, args.io_ms, args.loop)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
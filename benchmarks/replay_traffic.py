@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Replay a backend traffic capture (TRAFFIC_RECORD_PATH) offline.
+
+Each recorded backend message is rebuilt and fed either through
+parse_message alone (--mode parse) or through the whole puppet pipeline
+(--mode pipeline): dedupe, the session dispatcher, request context lookup,
+button clicks and the event bus. In pipeline mode the latency percentiles
+cover queueing a message; see the dispatcher line for handling latency.
+Recorded searches seed user sessions and request states so replies map
+back to their requests; Telegram calls go to an offline stand-in that
+answers immediately. Messages are paced at the recorded timing divided by
+--speed (0 replays as fast as possible). Run pipeline replays with
+USE_REDIS=false so replayed events stay in this process.
+
+    python -m benchmarks.replay_traffic capture.jsonl --mode pipeline --speed 10
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+from puppet.message_parser import parse_message
+from puppet.traffic import deserialize_message
+from utils.metrics import LatencyWindow
+
+
+def load_capture(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class _OfflineBackend:
+    """Answers the Telegram calls the pipeline makes without touching the network"""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    async def callback_query(self, **kwargs):
+        self.calls['callback_query'] += 1
+
+    async def send_message(self, *args, **kwargs):
+        self.calls['send_message'] += 1
+        return SimpleNamespace(id=0)
+
+    async def get_messages(self, *args, **kwargs):
+        self.calls['get_messages'] += 1
+        return None
+
+    async def iter_messages(self, *args, **kwargs):
+        self.calls['iter_messages'] += 1
+        return
+        yield
+
+
+def _make_puppet(workdir):
+    from database import redis_client
+    from models import SessionManager, RequestStateManager
+    from config import Config
+    from puppet.client import PuppetClient
+    from puppet.checkpoint import PuppetCheckpoint
+
+    puppet = PuppetClient()
+    puppet.client = _OfflineBackend()
+    puppet.checkpoint = PuppetCheckpoint(path=Path(workdir) / 'checkpoint.json')
+
+    users = {}
+
+    def seed(record):
+        """A recorded search: open a session for a replay user and track the request"""
+        user_id = users.setdefault(record['text'], 9_000_000 + len(users))
+        session = SessionManager.create_session(user_id, record['text'])
+        redis_client.set_user_session(user_id, session.to_dict())
+        puppet.generations.advance(user_id, session.session_id)
+        state = RequestStateManager.create_state(
+            user_id, session.session_id, record['text'], Config.PUPPET_SESSION_NAME, record['id']
+        )
+        redis_client.set_request_state(Config.PUPPET_SESSION_NAME, record['id'], state)
+
+    return puppet, seed
+
+
+async def replay(records, mode='parse', speed=0.0):
+    """Feed a capture through the parser or the pipeline; returns the report dict"""
+    latency = LatencyWindow(size=max(1, len(records)))
+    types_seen = Counter()
+    puppet = seed = None
+    workdir = tempfile.mkdtemp()
+    if mode == 'pipeline':
+        puppet, seed = _make_puppet(workdir)
+
+    previous_at = None
+    started = time.perf_counter()
+    replayed = 0
+    for record in records:
+        if speed > 0 and previous_at is not None:
+            await asyncio.sleep(max(0.0, record['received_at'] - previous_at) / speed)
+        previous_at = record['received_at']
+
+        if record.get('direction') == 'out':
+            if seed is not None:
+                seed(record)
+            continue
+
+        message = deserialize_message(record)
+        t0 = time.perf_counter()
+        if puppet is not None:
+            await puppet._dispatch_backend_message(message)
+        else:
+            types_seen[parse_message(message)[0]] += 1
+        latency.record(time.perf_counter() - t0)
+        replayed += 1
+
+    if puppet is not None:
+        await puppet.dispatcher.drain()
+    elapsed = time.perf_counter() - started
+    report = {
+        'messages': replayed,
+        'elapsed': elapsed,
+        'throughput': replayed / elapsed if elapsed else 0.0,
+        'latency_p50': latency.percentile(0.5),
+        'latency_p95': latency.percentile(0.95),
+        'latency_p99': latency.percentile(0.99),
+    }
+    if puppet is not None:
+        report['backend_calls'] = dict(puppet.client.calls)
+        report['dropped'] = puppet.generations.stats.get('dropped', 0)
+        report['dispatcher'] = puppet.dispatcher.metrics()
+        await puppet.dispatcher.stop()
+    else:
+        report['types'] = dict(types_seen)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture', help='JSONL capture written by the traffic recorder')
+    parser.add_argument('--mode', choices=['parse', 'pipeline'], default='parse')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='Pace multiplier (1 = recorded timing, 0 = as fast as possible)')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay the capture this many times (parse mode)')
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)
+    if args.repeat > 1 and args.mode == 'parse':
+        records = records * args.repeat
+    report = asyncio.run(replay(records, args.mode, args.speed))
+
+    print(f"messages:   {report['messages']}")
+    print(f"elapsed:    {report['elapsed']:.3f}s")
+    print(f"throughput: {report['throughput']:.1f} msg/s")
+    for q in ('p50', 'p95', 'p99'):
+        value = report[f'latency_{q}']
+        print(f"latency {q}: {value * 1000:.3f} ms" if value is not None else f"latency {q}: -")
+    for key in ('types', 'backend_calls', 'dropped', 'dispatcher'):
+        if key in report:
+            print(f"{key}: {report[key]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,11 +20,145 @@ class Config:
     # Database Configuration
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     USE_REDIS = os.getenv('USE_REDIS', 'true').lower() == 'true'
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2.0))
+    REDIS_FAILURE_THRESHOLD = int(os.getenv('REDIS_FAILURE_THRESHOLD', 3))  # Consecutive failures to trip
+    REDIS_PROBE_INTERVAL = float(os.getenv('REDIS_PROBE_INTERVAL', 5.0))
+    REDIS_WRITE_BUFFER_MAX = int(os.getenv('REDIS_WRITE_BUFFER_MAX', 10000))
+    LOCAL_STORE_MAX_ENTRIES = int(os.getenv('LOCAL_STORE_MAX_ENTRIES', 50000))
+    
+    # Search Work Queue (Redis Streams)
+    WORKER_ID = os.getenv('WORKER_ID')  # Consumer name; defaults to host:pid
+    QUEUE_STREAM = os.getenv('QUEUE_STREAM', 'search_jobs')
+    QUEUE_GROUP = os.getenv('QUEUE_GROUP', 'puppet_workers')
+    QUEUE_RECLAIM_IDLE = int(os.getenv('QUEUE_RECLAIM_IDLE', 180))  # Seconds before a stuck job is reclaimed
+    QUEUE_MAX_DELIVERIES = int(os.getenv('QUEUE_MAX_DELIVERIES', 5))
+    WORKER_MAX_INFLIGHT = int(os.getenv('WORKER_MAX_INFLIGHT', 20))  # Concurrent searches per worker
+    
+    # Process Topology
+    PROCESS_MODE = os.getenv('PROCESS_MODE', 'single')  # single, multi
+    PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'all')  # all, frontend, worker (set by the supervisor)
+    PUPPET_WORKERS = int(os.getenv('PUPPET_WORKERS', 2))
+    PUPPET_SESSION_NAMES = [name.strip() for name in os.getenv('PUPPET_SESSION_NAMES', '').split(',') if name.strip()]
+    BROKER_SOCKET = os.getenv('BROKER_SOCKET', '/tmp/file_helper_broker.sock')  # Supervisor broker: PROCESS_MODE=multi without Redis
+    BROKER_AUTHKEY = os.getenv('BROKER_AUTHKEY', 'file-helper-broker')
+    DELIVERY_CHANNEL = os.getenv('DELIVERY_CHANNEL', 'delivery_events')  # Redis pub/sub channel
+    DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 32))  # Users delivered to in parallel
+    DELIVERY_MAX_PENDING = int(os.getenv('DELIVERY_MAX_PENDING', 2000))  # Events queued or running
+    
+    # Outbound Bot API Rate Limits
+    SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))  # Messages per second across all chats
+    SEND_PER_CHAT_RATE = float(os.getenv('SEND_PER_CHAT_RATE', 1))  # Messages per second per chat
+    SEND_PER_CHAT_BURST = float(os.getenv('SEND_PER_CHAT_BURST', 2))
+    SEND_MAX_CONCURRENT = int(os.getenv('SEND_MAX_CONCURRENT', 30))  # In-flight Bot API calls
+    
+    # Near Cache (in-process LRU in front of Redis)
+    NEAR_CACHE_ENABLED = os.getenv('NEAR_CACHE_ENABLED', 'true').lower() == 'true'
+    NEAR_CACHE_MAX_ENTRIES = int(os.getenv('NEAR_CACHE_MAX_ENTRIES', 10000))
+    NEAR_CACHE_TTL = float(os.getenv('NEAR_CACHE_TTL', 2.0))  # Staleness bound if an invalidation is lost
+    NEAR_CACHE_CHANNEL = os.getenv('NEAR_CACHE_CHANNEL', 'near_cache:invalidate')
+    
+    # "Send all" batches
+    BATCH_CLICK_CONCURRENCY = int(os.getenv('BATCH_CLICK_CONCURRENCY', 4))  # Clicks awaiting their file
+    BATCH_FILE_TIMEOUT = float(os.getenv('BATCH_FILE_TIMEOUT', 30))
+    MEDIA_GROUP_SIZE = min(10, int(os.getenv('MEDIA_GROUP_SIZE', 10)))  # Bot API maximum is 10
+    
+    # Results List (direct-jump pages of parsed result buttons)
+    RESULTS_PAGE_SIZE = int(os.getenv('RESULTS_PAGE_SIZE', 8))
+    
+    # Media Relay (files downloaded by the puppet and re-uploaded by the frontend bot)
+    RELAY_MEDIA_ENABLED = os.getenv('RELAY_MEDIA_ENABLED', 'false').lower() == 'true'
+    RELAY_MAX_FILE_SIZE = int(os.getenv('RELAY_MAX_FILE_SIZE', 50 * 1024 * 1024))  # Bot API upload limit
+    BLOB_CACHE_DIR = os.getenv('BLOB_CACHE_DIR', 'data/blobs')  # Shared by puppet and frontend processes
+    BLOB_CACHE_MAX_BYTES = int(os.getenv('BLOB_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+    PARALLEL_DOWNLOAD_MIN_SIZE = int(os.getenv('PARALLEL_DOWNLOAD_MIN_SIZE', 10 * 1024 * 1024))  # Smaller: one stream
+    DOWNLOAD_CONNECTIONS = int(os.getenv('DOWNLOAD_CONNECTIONS', 4))  # Senders per large download
+    DOWNLOAD_MAX_PARTS_IN_FLIGHT = int(os.getenv('DOWNLOAD_MAX_PARTS_IN_FLIGHT', 8))  # Across all downloads
+    
+    # Query Cache
+    QUERY_INDEX_MAX_ENTRIES = int(os.getenv('QUERY_INDEX_MAX_ENTRIES', 5000))
+    QUERY_SIMILARITY_THRESHOLD = float(os.getenv('QUERY_SIMILARITY_THRESHOLD', 0.6))  # Trigram Jaccard
+    QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', 6 * 3600))
+    
+    # Negative Cache (queries the backend has no result for)
+    NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', 30 * 60))
+    NEGATIVE_CACHE_CAPACITY = int(os.getenv('NEGATIVE_CACHE_CAPACITY', 10000))
+    NEGATIVE_CACHE_ERROR_RATE = float(os.getenv('NEGATIVE_CACHE_ERROR_RATE', 0.01))
+    NEGATIVE_CACHE_REBUILD_INTERVAL = int(os.getenv('NEGATIVE_CACHE_REBUILD_INTERVAL', 10 * 60))
+    
+    # Cache Warming (re-run the most frequent queries before their cached results expire)
+    CACHE_WARM_ENABLED = os.getenv('CACHE_WARM_ENABLED', 'true').lower() == 'true'
+    CACHE_WARM_TRACKED = int(os.getenv('CACHE_WARM_TRACKED', 500))  # Heavy-hitter counters kept
+    CACHE_WARM_TOP_K = int(os.getenv('CACHE_WARM_TOP_K', 50))
+    CACHE_WARM_MIN_HITS = float(os.getenv('CACHE_WARM_MIN_HITS', 5))  # Decayed count to qualify
+    CACHE_WARM_INTERVAL = float(os.getenv('CACHE_WARM_INTERVAL', 60))
+    CACHE_WARM_AHEAD = int(os.getenv('CACHE_WARM_AHEAD', 30 * 60))  # Refresh entries expiring this soon
+    CACHE_WARM_MAX_PER_CYCLE = int(os.getenv('CACHE_WARM_MAX_PER_CYCLE', 3))
+    CACHE_WARM_MAX_PENDING_JOBS = int(os.getenv('CACHE_WARM_MAX_PENDING_JOBS', 5))  # Idle: fewer searches in flight
+    CACHE_WARM_MAX_SEND_DEPTH = int(os.getenv('CACHE_WARM_MAX_SEND_DEPTH', 20))
+    CACHE_WARM_DECAY = float(os.getenv('CACHE_WARM_DECAY', 0.9))  # Per cycle, so counts follow recent traffic
+    
+    # Channel Memberships (join prompts from the backend)
+    MEMBERSHIP_CACHE_DIR = os.getenv('MEMBERSHIP_CACHE_DIR', 'data')
+    MEMBERSHIP_TTL = int(os.getenv('MEMBERSHIP_TTL', 7 * 24 * 3600))
+    MEMBERSHIP_RECHECK_WINDOW = int(os.getenv('MEMBERSHIP_RECHECK_WINDOW', 120))  # Repeat prompt => stale
+    JOIN_CONFIRM_TIMEOUT = float(os.getenv('JOIN_CONFIRM_TIMEOUT', 5))
+    
+    # Backend Dispatcher (per-session ordering, sessions in parallel)
+    DISPATCH_WORKERS = int(os.getenv('DISPATCH_WORKERS', 16))
+    DISPATCH_MAX_PENDING = int(os.getenv('DISPATCH_MAX_PENDING', 1000))  # Backend messages queued or running
+    
+    # Warm Restart (puppet checkpoint and catch-up)
+    CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', 'data')
+    CHECKPOINT_INTERVAL = float(os.getenv('CHECKPOINT_INTERVAL', 1.0))  # Max checkpoint write frequency
+    CATCHUP_LIMIT = int(os.getenv('CATCHUP_LIMIT', 500))  # Missed backend messages to replay on connect
+    
+    # Traffic Capture (sanitized backend messages, for replay)
+    TRAFFIC_RECORD_PATH = os.getenv('TRAFFIC_RECORD_PATH', '')  # JSONL file; empty disables recording
+    
+    # Inline mode (answered from the local index of delivered files)
+    FILE_INDEX_PATH = os.getenv('FILE_INDEX_PATH', 'data/file_index.jsonl')
+    INLINE_RESULTS_LIMIT = int(os.getenv('INLINE_RESULTS_LIMIT', 20))
+    INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', 30))
+
+    # Event Loop
+    EVENT_LOOP = os.getenv('EVENT_LOOP', 'asyncio').lower()  # 'asyncio' or 'uvloop' (optional dependency)
+    LOOP_WATCHDOG_ENABLED = os.getenv('LOOP_WATCHDOG_ENABLED', 'true').lower() == 'true'
+    LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', 0.1))
+    LOOP_LAG_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', 0.25))  # Log stack samples beyond this
+    LOOP_LAG_REPORT_INTERVAL = float(os.getenv('LOOP_LAG_REPORT_INTERVAL', 60))
+    
+    # Hot-path Logging (structured, rate limited per call site)
+    LOG_HOT_RATE = float(os.getenv('LOG_HOT_RATE', 5))  # Events per second per call site; 0 disables limiting
+    LOG_HOT_BURST = int(os.getenv('LOG_HOT_BURST', 20))
+    LOG_VALUE_MAX_LENGTH = int(os.getenv('LOG_VALUE_MAX_LENGTH', 200))  # Longer values are truncated
+    LOG_SESSION_SAMPLE_RATE = float(os.getenv('LOG_SESSION_SAMPLE_RATE', 0.01))  # Sessions always logged in full
+    
+    # Profiling
+    ADMIN_USER_IDS = [int(uid) for uid in os.getenv('ADMIN_USER_IDS', '').split(',') if uid.strip()]
+    HANDLER_STATS_ENABLED = os.getenv('HANDLER_STATS_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_DEFAULT_SECONDS = int(os.getenv('PROFILE_DEFAULT_SECONDS', 30))
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 120))
     
     # Application Settings
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', 300))  # 5 minutes
     
+    # Retry / Hedging Policy
+    SEARCH_TIMEOUT = int(os.getenv('SEARCH_TIMEOUT', 20))  # Base wait for a backend reply
+    SEARCH_MAX_ATTEMPTS = int(os.getenv('SEARCH_MAX_ATTEMPTS', 3))
+    SEARCH_HEDGE_ENABLED = os.getenv('SEARCH_HEDGE_ENABLED', 'false').lower() == 'true'
+    SEARCH_HEDGE_QUANTILE = float(os.getenv('SEARCH_HEDGE_QUANTILE', 0.95))
+    CLICK_MAX_ATTEMPTS = int(os.getenv('CLICK_MAX_ATTEMPTS', 2))
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', 0.1))  # Retries per first attempt
+    
+    # Adaptive Timeouts (per stage: search reply, click to file, channel join)
+    ADAPTIVE_TIMEOUT_QUANTILE = float(os.getenv('ADAPTIVE_TIMEOUT_QUANTILE', 0.99))
+    ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv('ADAPTIVE_TIMEOUT_FACTOR', 3.0))  # Timeout = quantile x factor
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv('ADAPTIVE_TIMEOUT_MIN_SAMPLES', 20))  # Static timeouts until then
+    ADAPTIVE_TIMEOUT_FLOOR = float(os.getenv('ADAPTIVE_TIMEOUT_FLOOR', 1.0))
+    ADAPTIVE_TIMEOUT_CEILING = float(os.getenv('ADAPTIVE_TIMEOUT_CEILING', 300))
+    
     # Validate required environment variables
     @classmethod
     def validate(cls):
@@ -1,3 +1,5 @@
 from .redis_client import redis_client
+from .work_queue import work_queue
+from .event_bus import event_bus
 
-__all__ = ['redis_client']
+__all__ = ['redis_client', 'work_queue', 'event_bus']
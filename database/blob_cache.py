@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BlobWriter:
+    """File-like sink for one blob; hashes the content as it is written"""
+
+    def __init__(self, file):
+        self._file = file
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def seek(self, *args):
+        # Writes must be sequential for the running hash to be valid
+        raise OSError("BlobWriter does not support seeking")
+
+    def flush(self):
+        self._file.flush()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class BlobCache:
+    """
+    Size-capped disk cache for media relayed through the puppet. Blobs are
+    stored as <document id>.<sha256 prefix>, written to a temp file and
+    renamed into place, evicted least recently used first. The index is
+    rebuilt from file names and stat() alone, so startup doesn't read blobs.
+
+    The directory is shared between processes: the cap applies to what is
+    on disk, so the index is rebuilt from the directory before evicting,
+    and entries whose file another process evicted are dropped on lookup.
+    """
+
+    STALE_TEMP_AGE = 3600  # Temp files of writers that can't be identified as alive
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = Path(directory or Config.BLOB_CACHE_DIR)
+        self.max_bytes = max_bytes or Config.BLOB_CACHE_MAX_BYTES
+        self._entries = OrderedDict()  # document id -> (file name, size), least recently used first
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self.reindex()
+        if self._entries:
+            logger.info(f"Indexed {len(self._entries)} cached blobs ({self.total_bytes} bytes)")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, document_id):
+        document_id = str(document_id)
+        entry = self._entries.get(document_id)
+        if entry is None:
+            return False
+        if not (self.directory / entry[0]).exists():
+            self._forget(document_id)  # Evicted by another process
+            return False
+        return True
+
+    def reindex(self):
+        """Rebuild the index from the directory listing, oldest access first"""
+        found = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.tmp-'):
+                        if self._is_stale_temp(entry):
+                            os.unlink(entry.path)  # Interrupted write
+                        continue
+                    document_id, _, digest = entry.name.partition('.')
+                    if digest and entry.is_file():
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, document_id, entry.name, stat.st_size))
+        except FileNotFoundError:
+            pass  # Nothing cached yet
+        except OSError as e:
+            logger.error(f"Error indexing blob cache: {e}")
+
+        with self._lock:
+            # mtime is coarse: equal times keep the order this process already knows
+            order = {document_id: index for index, document_id in enumerate(self._entries)}
+            found.sort(key=lambda blob: (blob[0], order.get(blob[1], len(order))))
+            self._entries.clear()
+            self.total_bytes = 0
+            for _, document_id, name, size in found:
+                self._entries[document_id] = (name, size)
+                self.total_bytes += size
+        self._evict()
+
+    @classmethod
+    def _is_stale_temp(cls, entry):
+        """A temp file is stale once the process writing it (named in the file) is gone"""
+        try:
+            pid = int(entry.name.split('-')[-2])
+        except (IndexError, ValueError):
+            try:
+                return entry.stat().st_mtime < time.time() - cls.STALE_TEMP_AGE
+            except FileNotFoundError:
+                return False  # Renamed into place meanwhile
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass  # Alive, owned by another user
+        return False
+
+    def path(self, document_id):
+        """Path of a cached blob (marking it recently used), or None"""
+        document_id = str(document_id)
+        with self._lock:
+            entry = self._entries.get(document_id) or self._adopt(document_id)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(document_id)
+            self.stats['hits'] += 1
+        path = self.directory / entry[0]
+        try:
+            os.utime(path)  # Access order survives restarts via mtime
+        except FileNotFoundError:
+            self._forget(document_id)
+            return None
+        return path
+
+    def open(self, document_id):
+        """Binary file object for streaming a blob into an upload, or None"""
+        path = self.path(document_id)
+        try:
+            return open(path, 'rb') if path else None
+        except FileNotFoundError:
+            self._forget(str(document_id))
+            return None
+
+    @contextmanager
+    def writer(self, document_id):
+        """
+        Write a blob through the yielded BlobWriter. It becomes visible
+        atomically when the block exits cleanly and is discarded otherwise.
+        """
+        document_id = str(document_id)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / f".tmp-{document_id}-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                writer = BlobWriter(f)
+                yield writer
+                f.flush()
+                os.fsync(f.fileno())
+            name = f"{document_id}.{writer.hexdigest()[:16]}"
+            os.replace(tmp_path, self.directory / name)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            old = self._entries.pop(document_id, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+                if old[0] != name:
+                    (self.directory / old[0]).unlink(missing_ok=True)
+            self._entries[document_id] = (name, writer.size)
+            self.total_bytes += writer.size
+            self.stats['stored'] += 1
+        # Other processes write here too: check the cap against the whole directory
+        self.reindex()
+
+    def _adopt(self, document_id):
+        """Index a blob written by another process (the puppet) since our last reindex"""
+        for path in self.directory.glob(f"{document_id}.*"):
+            try:
+                entry = self._entries[document_id] = (path.name, path.stat().st_size)
+            except FileNotFoundError:
+                continue
+            self.total_bytes += entry[1]
+            return entry
+        return None
+
+    def _forget(self, document_id):
+        with self._lock:
+            entry = self._entries.pop(document_id, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def _evict(self):
+        """Drop least recently used blobs until the cache fits its cap"""
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                _, (name, size) = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                self.stats['evicted'] += 1
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error evicting blob {name}: {e}")
+
+    def metrics(self):
+        return {'blobs': len(self._entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes, **self.stats}
+
+
+# Global blob cache instance
+blob_cache = BlobCache()
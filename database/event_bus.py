@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import queue
+import threading
+from abc import ABC, abstractmethod
+
+import redis
+from config import Config
+from models import DeliveryEvent
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessEventBus:
+    """Delivery bus for the single-process topology (puppet and frontend share a loop)"""
+
+    def __init__(self):
+        self._queue = None
+        self._loop = None
+
+    def _bind(self):
+        # The queue must belong to the running loop, which doesn't exist at import time
+        if self._queue is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def start(self):
+        """Bind to the running loop, so threads can publish before anything is consumed"""
+        self._bind()
+
+    def publish(self, event: DeliveryEvent):
+        """Queue an event for the frontend"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a thread without a loop
+            if self._loop is None:
+                raise RuntimeError("Event bus published to from a thread before start()")
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+            return
+        self._bind().put_nowait(event)
+
+    async def consume_batch(self, max_batch=50, timeout=1.0):
+        """Wait up to timeout for events, then drain at most max_batch of them"""
+        events_queue = self._bind()
+        try:
+            events = [await asyncio.wait_for(events_queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while len(events) < max_batch and not events_queue.empty():
+            events.append(events_queue.get_nowait())
+        return events
+
+    async def close(self):
+        pass
+
+
+class _BufferedSubscriber(ABC):
+    """Thread-fed asyncio buffer shared by the cross-process bus implementations"""
+
+    def __init__(self):
+        self._buffer = None
+        self._loop = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def _ensure_reader(self):
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._buffer = asyncio.Queue()
+            self._thread = threading.Thread(target=self._reader, name=type(self).__name__, daemon=True)
+            self._thread.start()
+        return self._buffer
+
+    def start(self):
+        """Nothing to bind: the reader thread starts with the first consume_batch"""
+
+    def _deliver(self, raw):
+        try:
+            event = DeliveryEvent.from_json(raw)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Dropping malformed delivery event: {e}")
+            return
+        self._loop.call_soon_threadsafe(self._buffer.put_nowait, event)
+
+    @abstractmethod
+    def _reader(self):
+        """Blocking loop (on its own thread) feeding raw events to _deliver until stopped"""
+
+    async def consume_batch(self, max_batch=50, timeout=1.0):
+        """Wait up to timeout for events, then drain at most max_batch of them"""
+        buffer = self._ensure_reader()
+        try:
+            events = [await asyncio.wait_for(buffer.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while len(events) < max_batch and not buffer.empty():
+            events.append(buffer.get_nowait())
+        return events
+
+    async def close(self):
+        self._stopped.set()
+
+
+class RedisEventBus(_BufferedSubscriber):
+    """Delivery bus over Redis pub/sub, for puppets and frontends on other processes/hosts"""
+
+    def __init__(self, connection, channel=None):
+        super().__init__()
+        self.redis = connection
+        self.channel = channel or Config.DELIVERY_CHANNEL
+
+    def publish(self, event: DeliveryEvent):
+        receivers = self.redis.publish(self.channel, event.to_json())
+        if not receivers:
+            logger.warning(f"No frontend subscribed to {self.channel}; {event!r} was not delivered")
+
+    def _reader(self):
+        while not self._stopped.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message['type'] == 'message':
+                        self._deliver(message['data'])
+            except redis.RedisError as e:
+                logger.error(f"Delivery subscription lost: {e}; resubscribing")
+                self._stopped.wait(1.0)
+            finally:
+                pubsub.close()
+
+
+class BrokerEventBus(_BufferedSubscriber):
+    """Delivery bus through the supervisor's Unix-socket broker (multi-process, no Redis)"""
+
+    def __init__(self, address=None, authkey=None):
+        super().__init__()
+        self.address = address or Config.BROKER_SOCKET
+        self.authkey = (authkey or Config.BROKER_AUTHKEY).encode()
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def _events(self):
+        with self._lock:
+            if self._proxy is None:
+                from .local_broker import BrokerManager
+                manager = BrokerManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._proxy = manager.delivery_events()
+            return self._proxy
+
+    def publish(self, event: DeliveryEvent):
+        try:
+            self._events().put(event.to_json())
+        except (ConnectionError, EOFError, OSError):
+            with self._lock:
+                self._proxy = None
+            raise
+
+    def _reader(self):
+        while not self._stopped.is_set():
+            try:
+                self._deliver(self._events().get(timeout=1.0))
+            except queue.Empty:
+                continue
+            except (ConnectionError, EOFError, OSError) as e:
+                logger.error(f"Broker connection lost: {e}; reconnecting")
+                with self._lock:
+                    self._proxy = None
+                self._stopped.wait(1.0)
+
+
+def create_event_bus(connection=None):
+    """Pick the delivery bus matching the process topology"""
+    if connection is not None:
+        return RedisEventBus(connection)
+    if Config.PROCESS_MODE == 'multi':
+        return BrokerEventBus()
+    return InProcessEventBus()
+
+
+# Global event bus instance
+event_bus = create_event_bus(redis_client.redis_client)
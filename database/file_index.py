@@ -0,0 +1,158 @@
+import bisect
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from config import Config
+from utils.query_normalizer import canonicalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """
+    Inverted index over file names of files already delivered through the
+    frontend bot, holding their reusable Bot API file_id. Updates are
+    appended to a JSONL journal and compacted into a snapshot, so the
+    index survives restarts without rewriting it on every file.
+    """
+
+    def __init__(self, path=None, compact_after=1000):
+        self.path = Path(path or Config.FILE_INDEX_PATH)
+        self.snapshot_path = self.path.with_suffix('.snapshot.json')
+        self.compact_after = compact_after
+        self._docs = {}       # doc key -> {'type', 'file_id', 'file_name', 'file_size'}
+        self._postings = {}   # token -> set of doc keys
+        self._sorted_tokens = None
+        self._journal = None
+        self._journal_lines = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _tokens(file_name):
+        return set(canonicalize_query(file_name).split())
+
+    def _index(self, key, doc):
+        old = self._docs.get(key)
+        if old is not None:
+            for token in self._tokens(old['file_name']):
+                keys = self._postings.get(token)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[token]
+        self._docs[key] = doc
+        for token in self._tokens(doc['file_name']):
+            self._postings.setdefault(token, set()).add(key)
+        self._sorted_tokens = None
+
+    def add(self, backend_file_id, media_type, bot_file_id, file_name, file_size=0):
+        """Index (or update) a delivered file; returns False when there is nothing to index"""
+        if not bot_file_id or not file_name or file_name == 'Unknown':
+            return False
+        key = str(backend_file_id or bot_file_id)
+        doc = {'type': media_type, 'file_id': bot_file_id, 'file_name': file_name, 'file_size': file_size or 0}
+        with self._lock:
+            if self._docs.get(key) == doc:
+                return True
+            self._index(key, doc)
+            self._append_journal(key, doc)
+        return True
+
+    def search(self, query, limit=20):
+        """Files whose names contain every query token (the last one as a prefix)"""
+        tokens = canonicalize_query(query).split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            candidates = None
+            for token in tokens[:-1]:
+                keys = self._postings.get(token, set())
+                candidates = set(keys) if candidates is None else candidates & keys
+                if not candidates:
+                    return []
+
+            # Type-ahead: the token being typed matches as a prefix
+            prefix_keys = set()
+            for token in self._tokens_with_prefix(tokens[-1]):
+                prefix_keys |= self._postings[token]
+            candidates = prefix_keys if candidates is None else candidates & prefix_keys
+
+            ranked = sorted(
+                candidates,
+                key=lambda k: (len(self._docs[k]['file_name']), self._docs[k]['file_name'])
+            )
+            return [dict(self._docs[key], key=key) for key in ranked[:limit]]
+
+    def _tokens_with_prefix(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def load(self):
+        """Rebuild the index from the snapshot plus the journal written after it"""
+        try:
+            if self.snapshot_path.exists():
+                with open(self.snapshot_path, encoding='utf-8') as f:
+                    for key, doc in json.load(f).items():
+                        self._index(key, doc)
+            if self.path.exists():
+                with open(self.path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # Torn write at crash time
+                        self._index(entry['key'], entry['doc'])
+                        self._journal_lines += 1
+            if self._docs:
+                logger.info(f"Loaded {len(self._docs)} files into the inline index")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading file index: {e}")
+
+    def _append_journal(self, key, doc):
+        try:
+            if self._journal is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = open(self.path, 'a', encoding='utf-8')
+            self._journal.write(json.dumps({'key': key, 'doc': doc}, ensure_ascii=False) + '\n')
+            self._journal.flush()
+            self._journal_lines += 1
+            if self._journal_lines >= self.compact_after:
+                self._compact()
+        except OSError as e:
+            logger.error(f"Error persisting file index entry: {e}")
+
+    def _compact(self):
+        """Write a fresh snapshot atomically and truncate the journal"""
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._docs, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._journal.close()
+        self._journal = open(self.path, 'w', encoding='utf-8')
+        self._journal_lines = 0
+        logger.info(f"Compacted file index ({len(self._docs)} files)")
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+# Global file index instance
+file_index = FileIndex()
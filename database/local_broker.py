@@ -0,0 +1,99 @@
+import logging
+import os
+import queue
+import threading
+from multiprocessing.managers import BaseManager
+
+from config import Config
+from .work_queue import LocalStreamQueue, default_consumer_name
+
+logger = logging.getLogger(__name__)
+
+# Objects hosted by the broker server process
+_shared = {}
+
+
+def _get_work_queue():
+    if 'work_queue' not in _shared:
+        _shared['work_queue'] = LocalStreamQueue(consumer='broker')
+    return _shared['work_queue']
+
+
+def _get_delivery_events():
+    if 'delivery_events' not in _shared:
+        _shared['delivery_events'] = queue.Queue(maxsize=10000)
+    return _shared['delivery_events']
+
+
+class BrokerManager(BaseManager):
+    """Manager serving shared objects over a Unix socket"""
+
+
+BrokerManager.register('work_queue', callable=_get_work_queue)
+BrokerManager.register('delivery_events', callable=_get_delivery_events)
+
+
+class LocalBroker:
+    """Unix-socket stand-in for Redis when running the multi-process topology"""
+
+    def __init__(self, address=None, authkey=None):
+        self.address = address or Config.BROKER_SOCKET
+        self.authkey = (authkey or Config.BROKER_AUTHKEY).encode()
+        self.manager = None
+
+    def start(self):
+        """Start the broker server process"""
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from a previous run
+        self.manager = BrokerManager(address=self.address, authkey=self.authkey)
+        self.manager.start()
+        logger.info(f"Local broker listening on {self.address}")
+
+    def shutdown(self):
+        if self.manager:
+            self.manager.shutdown()
+            self.manager = None
+            logger.info("Local broker stopped")
+
+
+class BrokerQueueClient:
+    """Work queue client for processes attached to a LocalBroker"""
+
+    def __init__(self, address=None, authkey=None, consumer=None):
+        self.address = address or Config.BROKER_SOCKET
+        self.authkey = (authkey or Config.BROKER_AUTHKEY).encode()
+        self.consumer = consumer or default_consumer_name()
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def _queue(self):
+        # Connect lazily: the broker may start after this module is imported
+        with self._lock:
+            if self._proxy is None:
+                manager = BrokerManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._proxy = manager.work_queue()
+            return self._proxy
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return getattr(self._queue(), method)(*args, **kwargs)
+        except (ConnectionError, EOFError, OSError):
+            with self._lock:
+                self._proxy = None  # Reconnect on the next call
+            raise
+
+    def enqueue(self, job):
+        return self._call('enqueue', job)
+
+    def claim(self, count=10, block_ms=1000):
+        return self._call('claim_for', self.consumer, count, block_ms)
+
+    def ack(self, entry_id):
+        return self._call('ack', entry_id)
+
+    def reclaim(self, min_idle_ms, count=10, max_deliveries=5):
+        return self._call('reclaim_for', self.consumer, min_idle_ms, count, max_deliveries)
+
+    def pending_count(self):
+        return self._call('pending_count')
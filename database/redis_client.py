@@ -1,7 +1,15 @@
 import redis
-import json
+import struct
 import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from config import Config
+from models import UserSession, RequestState
+from utils.circuit_breaker import CircuitBreaker
+from .near_cache import NearCache
+from .local_store import LocalStore
 
 logger = logging.getLogger(__name__)
 
@@ -9,20 +17,218 @@ class RedisClient:
     _instance = None
     
     def __init__(self):
+        # redis_client is the connection if Redis was reachable at startup; the work
+        # queue and event bus pick their backend on it. Storage calls use _connection
+        # behind the circuit breaker and fall back to the local store.
+        self.redis_client = None
+        self._connection = None
+        self.local_store = LocalStore(Config.LOCAL_STORE_MAX_ENTRIES)
+        self.breaker = CircuitBreaker('redis', Config.REDIS_FAILURE_THRESHOLD)
+        self._pending_writes = OrderedDict()  # key -> ('set', data, expires_at) or ('delete', None, None)
+        self._pending_lock = threading.Lock()
+        self._probe_thread = None
+        self.stats = {'fallback_reads': 0, 'fallback_writes': 0, 'replayed': 0, 'dropped_writes': 0}
+        self.near_cache = None
+        self._origin = uuid.uuid4().hex[:12]
+        self._invalidator = None
+        
         if Config.USE_REDIS:
             try:
-                self.redis_client = redis.from_url(Config.REDIS_URL)
-                self.redis_client.ping()  # Test connection
+                self._connection = redis.from_url(
+                    Config.REDIS_URL,
+                    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT
+                )
+                self._connection.ping()  # Test connection
+                self.redis_client = self._connection
                 logger.info("Redis connection established successfully")
-            except redis.ConnectionError as e:
-                logger.warning(f"Redis not available: {e}. Using in-memory mode.")
-                self.redis_client = None
+            except redis.RedisError as e:
+                logger.warning(f"Redis not available: {e}. Using in-memory mode until it recovers.")
+                self._trip()
             except Exception as e:
                 logger.error(f"Failed to connect to Redis: {e}")
-                self.redis_client = None
+                self._connection = None
         else:
-            self.redis_client = None
             logger.info("Redis disabled, using in-memory storage")
+        
+        if self._connection and Config.NEAR_CACHE_ENABLED:
+            self.near_cache = NearCache(Config.NEAR_CACHE_MAX_ENTRIES, Config.NEAR_CACHE_TTL)
+            if self.breaker.state == CircuitBreaker.CLOSED:
+                self._start_invalidator()
+    
+    def _start_invalidator(self):
+        """Drop near-cache entries written by other processes"""
+        def on_invalidate(message):
+            origin, _, key = message['data'].decode().partition('|')
+            if origin != self._origin:
+                self.near_cache.invalidate(key)
+        
+        try:
+            pubsub = self._connection.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{Config.NEAR_CACHE_CHANNEL: on_invalidate})
+            self._invalidator = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except redis.RedisError as e:
+            logger.warning(f"Near-cache invalidation unavailable, disabling near cache: {e}")
+            self.near_cache = None
+    
+    def _available(self):
+        return self._connection is not None and self.breaker.allow()
+    
+    def _failed(self, e):
+        """Count a Redis failure; trips to the local store after repeated ones"""
+        logger.error(f"Redis operation failed: {e}")
+        if self.breaker.record_failure():
+            logger.warning("Redis failing repeatedly, switching to in-memory storage")
+            self._start_probe()
+    
+    def _trip(self):
+        self.breaker.trip()
+        self._start_probe()
+    
+    def _read(self, key):
+        """Raw value, served from the near cache when possible"""
+        if self.near_cache is not None:
+            data = self.near_cache.get(key)
+            if data is not None:
+                return data
+        if not self._available():
+            self.stats['fallback_reads'] += 1
+            return self.local_store.get(key)
+        try:
+            data = self._connection.get(key)
+        except redis.RedisError as e:
+            self._failed(e)
+            self.stats['fallback_reads'] += 1
+            return self.local_store.get(key)
+        self.breaker.record_success()
+        if data is not None and self.near_cache is not None:
+            self.near_cache.put(key, data)
+        return data
+    
+    def _write(self, key, ttl, data):
+        """SETEX and tell other processes' near caches, in one round trip"""
+        # The local copy keeps reads working if Redis goes away later
+        self.local_store.setex(key, ttl, data)
+        if self.near_cache is not None:
+            self.near_cache.put(key, data)
+        if not self._available():
+            self._buffer_write(key, ('set', data, time.time() + ttl))
+            return
+        try:
+            pipe = self._connection.pipeline(transaction=False)
+            pipe.setex(key, ttl, data)
+            if self.near_cache is not None:
+                pipe.publish(Config.NEAR_CACHE_CHANNEL, f"{self._origin}|{key}")
+            pipe.execute()
+            self.breaker.record_success()
+        except redis.RedisError as e:
+            self._failed(e)
+            self._buffer_write(key, ('set', data, time.time() + ttl))
+    
+    def _delete(self, key):
+        self.local_store.delete(key)
+        if self.near_cache is not None:
+            self.near_cache.invalidate(key)
+        if not self._available():
+            self._buffer_write(key, ('delete', None, None))
+            return
+        try:
+            pipe = self._connection.pipeline(transaction=False)
+            pipe.delete(key)
+            if self.near_cache is not None:
+                pipe.publish(Config.NEAR_CACHE_CHANNEL, f"{self._origin}|{key}")
+            pipe.execute()
+            self.breaker.record_success()
+        except redis.RedisError as e:
+            self._failed(e)
+            self._buffer_write(key, ('delete', None, None))
+    
+    def _buffer_write(self, key, op):
+        """Keep the latest write per key for replay once Redis is back"""
+        if self._connection is None:
+            return  # Redis disabled: the local store is the only store
+        self.stats['fallback_writes'] += 1
+        with self._pending_lock:
+            self._pending_writes.pop(key, None)
+            self._pending_writes[key] = op
+            while len(self._pending_writes) > Config.REDIS_WRITE_BUFFER_MAX:
+                self._pending_writes.popitem(last=False)
+                self.stats['dropped_writes'] += 1
+    
+    def _start_probe(self):
+        if self._connection is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name='redis-probe', daemon=True)
+        self._probe_thread.start()
+    
+    def _probe_loop(self):
+        """Ping Redis in the background until it answers, then replay buffered writes"""
+        while True:
+            time.sleep(Config.REDIS_PROBE_INTERVAL)
+            try:
+                self._connection.ping()
+                self.breaker.half_open()
+                self._replay_writes()
+                with self._pending_lock:
+                    if self._pending_writes:
+                        continue  # Writes buffered during the replay; go again
+                    self.breaker.close()
+            except redis.RedisError as e:
+                self.breaker.trip()
+                logger.debug(f"Redis still unavailable: {e}")
+                continue
+            
+            if self.near_cache is not None:
+                # Invalidations published by other processes during the outage were missed
+                self.near_cache.clear()
+                if self._invalidator is None or not self._invalidator.is_alive():
+                    self._start_invalidator()
+            logger.info(f"Redis recovered, replayed {self.stats['replayed']} buffered writes so far")
+            return
+    
+    def _replay_writes(self, batch_size=500):
+        """Write buffered operations back to Redis, oldest first"""
+        while True:
+            with self._pending_lock:
+                batch = []
+                while self._pending_writes and len(batch) < batch_size:
+                    batch.append(self._pending_writes.popitem(last=False))
+            if not batch:
+                return
+            
+            pipe = self._connection.pipeline(transaction=False)
+            now = time.time()
+            for key, (op, data, expires_at) in batch:
+                if op == 'delete':
+                    pipe.delete(key)
+                elif expires_at > now:
+                    pipe.setex(key, max(1, int(expires_at - now)), data)
+                if self.near_cache is not None:
+                    pipe.publish(Config.NEAR_CACHE_CHANNEL, f"{self._origin}|{key}")
+            try:
+                pipe.execute()
+            except redis.RedisError:
+                # Put the batch back in front of anything written meanwhile
+                with self._pending_lock:
+                    for key, op in reversed(batch):
+                        if key not in self._pending_writes:
+                            self._pending_writes[key] = op
+                            self._pending_writes.move_to_end(key, last=False)
+                raise
+            self.stats['replayed'] += len(batch)
+    
+    def cache_metrics(self):
+        """Near-cache hit rate and counters (None when disabled)"""
+        return self.near_cache.metrics() if self.near_cache is not None else None
+    
+    def storage_metrics(self):
+        """Circuit breaker state, fallback counters and the write-back backlog"""
+        return {
+            'breaker': self.breaker.state,
+            'pending_writes': len(self._pending_writes),
+            **self.breaker.stats,
+            **self.stats
+        }
     
     @classmethod
     def get_instance(cls):
@@ -31,84 +237,56 @@ class RedisClient:
         return cls._instance
     
     def set_user_session(self, user_id, session_data):
-        """Store user session data with expiration"""
-        if self.redis_client:
-            key = f"user_session:{user_id}"
-            try:
-                self.redis_client.setex(
-                    key, 
-                    Config.SESSION_TIMEOUT, 
-                    json.dumps(session_data)
-                )
-                return True
-            except redis.RedisError as e:
-                logger.error(f"Error setting user session: {e}")
-                return False
-        return True  # Success for in-memory mode (no storage needed)
+        """Store user session data (dict or UserSession) with expiration"""
+        key = f"user_session:{user_id}"
+        try:
+            session = session_data if isinstance(session_data, UserSession) else UserSession.from_dict(session_data)
+            self._write(key, Config.SESSION_TIMEOUT, session.to_bytes())
+            return True
+        except (TypeError, ValueError, struct.error) as e:
+            logger.error(f"Error setting user session: {e}")
+            return False
     
     def get_user_session(self, user_id):
         """Retrieve user session data"""
-        if self.redis_client:
-            key = f"user_session:{user_id}"
-            try:
-                data = self.redis_client.get(key)
-                return json.loads(data) if data else None
-            except (redis.RedisError, json.JSONDecodeError) as e:
-                logger.error(f"Error getting user session: {e}")
-                return None
-        return None
+        key = f"user_session:{user_id}"
+        try:
+            data = self._read(key)
+            return UserSession.from_bytes(data).to_dict() if data else None
+        except (ValueError, struct.error) as e:
+            logger.error(f"Error getting user session: {e}")
+            return None
     
     def delete_user_session(self, user_id):
         """Remove user session data"""
-        if self.redis_client:
-            key = f"user_session:{user_id}"
-            try:
-                self.redis_client.delete(key)
-                return True
-            except redis.RedisError as e:
-                logger.error(f"Error deleting user session: {e}")
-                return False
+        self._delete(f"user_session:{user_id}")
         return True
     
     def set_request_state(self, puppet_id, backend_message_id, state_data):
-        """Store request state for tracking"""
-        if self.redis_client:
-            key = f"request_state:{puppet_id}:{backend_message_id}"
-            try:
-                self.redis_client.setex(
-                    key,
-                    Config.SESSION_TIMEOUT,
-                    json.dumps(state_data)
-                )
-                return True
-            except redis.RedisError as e:
-                logger.error(f"Error setting request state: {e}")
-                return False
-        return True
+        """Store request state (dict or RequestState) for tracking"""
+        key = f"request_state:{puppet_id}:{backend_message_id}"
+        try:
+            state = state_data if isinstance(state_data, RequestState) else RequestState.from_dict(state_data)
+            self._write(key, Config.SESSION_TIMEOUT, state.to_bytes())
+            return True
+        except (TypeError, KeyError, ValueError, struct.error) as e:
+            logger.error(f"Error setting request state: {e}")
+            return False
     
     def get_request_state(self, puppet_id, backend_message_id):
         """Retrieve request state"""
-        if self.redis_client:
-            key = f"request_state:{puppet_id}:{backend_message_id}"
-            try:
-                data = self.redis_client.get(key)
-                return json.loads(data) if data else None
-            except (redis.RedisError, json.JSONDecodeError) as e:
-                logger.error(f"Error getting request state: {e}")
-                return None
-        return None
+        key = f"request_state:{puppet_id}:{backend_message_id}"
+        try:
+            data = self._read(key)
+            return RequestState.from_bytes(data).to_dict() if data else None
+        except (ValueError, struct.error) as e:
+            logger.error(f"Error getting request state: {e}")
+            return None
     
     def delete_request_state(self, puppet_id, backend_message_id):
         """Remove request state"""
-        if self.redis_client:
-            key = f"request_state:{puppet_id}:{backend_message_id}"
-            try:
-                self.redis_client.delete(key)
-                return True
-            except redis.RedisError as e:
-                logger.error(f"Error deleting request state: {e}")
-                return False
+        self._delete(f"request_state:{puppet_id}:{backend_message_id}")
         return True
 
 # Global redis client instance
-redis_client = RedisClient().get_instance()
\ No newline at end of file
+redis_client = RedisClient().get_instance()
@@ -0,0 +1,190 @@
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from config import Config
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def default_consumer_name():
+    """Consumer name unique to this worker process"""
+    return Config.WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _decode_fields(fields):
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in fields.items()
+    }
+
+
+class RedisStreamQueue:
+    """Search job queue on a Redis Stream with a consumer group (at-least-once delivery)"""
+
+    def __init__(self, connection, stream=None, group=None, consumer=None, maxlen=10000):
+        self.redis = connection
+        self.stream = stream or Config.QUEUE_STREAM
+        self.group = group or Config.QUEUE_GROUP
+        self.consumer = consumer or default_consumer_name()
+        self.maxlen = maxlen
+        self.ensure_group()
+
+    def ensure_group(self):
+        """Create the stream and consumer group if they don't exist yet"""
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+            logger.info(f"Created consumer group {self.group} on {self.stream}")
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def enqueue(self, job):
+        """Append a job; returns its entry id"""
+        entry_id = self.redis.xadd(self.stream, job, maxlen=self.maxlen, approximate=True)
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    def claim(self, count=10, block_ms=1000):
+        """Claim new jobs for this consumer; returns [(entry_id, job), ...]"""
+        response = self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: '>'}, count=count, block=block_ms
+        )
+        jobs = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                jobs.append((entry_id, _decode_fields(fields)))
+        return jobs
+
+    def ack(self, entry_id):
+        """Acknowledge a completed job and drop it from the stream"""
+        self.redis.xack(self.stream, self.group, entry_id)
+        self.redis.xdel(self.stream, entry_id)
+
+    def reclaim(self, min_idle_ms, count=10, max_deliveries=5):
+        """
+        Scan the pending entries list for jobs idle longer than min_idle_ms
+        (their consumer died or stalled) and take them over. Jobs delivered
+        max_deliveries times are acknowledged and dropped as poison.
+        """
+        pending = self.redis.xpending_range(
+            self.stream, self.group, min='-', max='+', count=count, idle=min_idle_ms
+        )
+        claim_ids = []
+        for entry in pending:
+            entry_id = entry['message_id']
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            if entry['times_delivered'] >= max_deliveries:
+                logger.error(f"Dropping job {entry_id} after {entry['times_delivered']} deliveries")
+                self.ack(entry_id)
+            else:
+                claim_ids.append(entry_id)
+
+        if not claim_ids:
+            return []
+
+        claimed = self.redis.xclaim(self.stream, self.group, self.consumer, min_idle_ms, claim_ids)
+        jobs = []
+        for entry_id, fields in claimed:
+            if fields is None:
+                continue  # Deleted while pending
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            jobs.append((entry_id, _decode_fields(fields)))
+        return jobs
+
+    def pending_count(self):
+        return self.redis.xpending(self.stream, self.group)['pending']
+
+
+class LocalStreamQueue:
+    """In-memory stand-in with the same claim/ack/reclaim semantics as RedisStreamQueue"""
+
+    def __init__(self, consumer=None):
+        self.consumer = consumer or default_consumer_name()
+        self._entries = OrderedDict()   # entry_id -> job, not yet delivered
+        self._pending = OrderedDict()   # entry_id -> [job, consumer, delivered_at, times_delivered]
+        self._sequence = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def enqueue(self, job):
+        with self._condition:
+            entry_id = f"{int(time.time() * 1000)}-{next(self._sequence)}"
+            self._entries[entry_id] = dict(job)
+            self._condition.notify()
+            return entry_id
+
+    def claim(self, count=10, block_ms=1000):
+        """Claim new jobs for this consumer; returns [(entry_id, job), ...]"""
+        return self.claim_for(self.consumer, count, block_ms)
+
+    def claim_for(self, consumer, count=10, block_ms=1000):
+        """claim() on behalf of another consumer (broker clients share one queue)"""
+        deadline = time.monotonic() + block_ms / 1000
+        with self._condition:
+            while not self._entries:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+
+            jobs = []
+            while self._entries and len(jobs) < count:
+                entry_id, job = self._entries.popitem(last=False)
+                self._pending[entry_id] = [job, consumer, time.monotonic(), 1]
+                jobs.append((entry_id, dict(job)))
+            return jobs
+
+    def ack(self, entry_id):
+        with self._condition:
+            self._pending.pop(entry_id, None)
+
+    def reclaim(self, min_idle_ms, count=10, max_deliveries=5):
+        """Take over jobs idle for min_idle_ms; jobs delivered max_deliveries times are dropped"""
+        return self.reclaim_for(self.consumer, min_idle_ms, count, max_deliveries)
+
+    def reclaim_for(self, consumer, min_idle_ms, count=10, max_deliveries=5):
+        """reclaim() on behalf of another consumer"""
+        now = time.monotonic()
+        jobs = []
+        with self._condition:
+            for entry_id, entry in list(self._pending.items()):
+                if len(jobs) >= count:
+                    break
+                job, _, delivered_at, times_delivered = entry
+                if (now - delivered_at) * 1000 < min_idle_ms:
+                    continue
+                if times_delivered >= max_deliveries:
+                    logger.error(f"Dropping job {entry_id} after {times_delivered} deliveries")
+                    del self._pending[entry_id]
+                    continue
+                self._pending[entry_id] = [job, consumer, now, times_delivered + 1]
+                jobs.append((entry_id, dict(job)))
+        return jobs
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._pending)
+
+
+def create_work_queue(connection=None):
+    """Redis Streams queue when Redis is available, local stand-in otherwise"""
+    if connection is not None:
+        try:
+            return RedisStreamQueue(connection)
+        except redis.RedisError as e:
+            logger.warning(f"Redis Streams unavailable: {e}. Using local work queue.")
+    if Config.PROCESS_MODE == 'multi':
+        # Share one queue between processes through the supervisor's Unix-socket broker
+        from .local_broker import BrokerQueueClient
+        return BrokerQueueClient()
+    return LocalStreamQueue()
+
+
+# Global work queue instance
+work_queue = create_work_queue(redis_client.redis_client)
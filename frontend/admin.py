@@ -0,0 +1,64 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+import asyncio
+import logging
+from config import Config
+from utils.profiling import handler_stats, process_profiler
+from .send_queue import send_queue
+
+logger = logging.getLogger(__name__)
+
+_profile_tasks = set()
+
+def _reply(message, text):
+    return send_queue.submit(message.chat_id, lambda: message.reply_text(text))
+
+def _format_stats():
+    lines = [
+        f"{name}: {s['calls']} calls, {s['total_s']:.2f}s total, "
+        f"{s['avg_ms']:.1f}ms avg, {s['max_ms']:.0f}ms max, {s['errors']} errors"
+        for name, s in handler_stats.snapshot().items()
+    ]
+    return "\n".join(lines) or "No handler calls recorded yet."
+
+async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Admin-only /profile command:
+    /profile [seconds] - cProfile this process for a while and write it to disk
+    /profile stats     - per-handler call counts and cumulative time
+    /profile on|off    - toggle per-handler recording
+    """
+    if update.effective_user.id not in Config.ADMIN_USER_IDS:
+        return  # Not advertised to regular users
+
+    arg = context.args[0].lower() if context.args else ''
+    if arg == 'stats':
+        _reply(update.message, _format_stats())
+        return
+    if arg in ('on', 'off'):
+        handler_stats.enabled = arg == 'on'
+        _reply(update.message, f"Handler stats {'enabled' if handler_stats.enabled else 'disabled'}.")
+        return
+
+    try:
+        seconds = float(arg) if arg else Config.PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        _reply(update.message, "Usage: /profile [seconds|stats|on|off]")
+        return
+    if process_profiler.running:
+        _reply(update.message, "A profile is already running.")
+        return
+
+    _reply(update.message, f"⏱ Profiling for {min(seconds, Config.PROFILE_MAX_SECONDS):.0f}s...")
+    task = asyncio.create_task(_profile_and_report(update.message, seconds))
+    _profile_tasks.add(task)
+    task.add_done_callback(_profile_tasks.discard)
+
+async def _profile_and_report(message, seconds):
+    try:
+        paths = await process_profiler.profile_for(seconds, label='frontend')
+        if paths:
+            _reply(message, f"✅ Profile written to {paths[0]} (summary: {paths[1]})")
+    except Exception as e:
+        logger.error(f"Profiling failed: {e}")
+        _reply(message, f"❌ Profiling failed: {e}")
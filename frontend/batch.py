@@ -0,0 +1,136 @@
+from telegram import InputMediaDocument, InputMediaVideo, InputMediaAudio
+import logging
+from collections import OrderedDict
+from contextlib import ExitStack
+from config import Config
+from .send_queue import send_queue, PRIORITY_FILE, PRIORITY_PROGRESS
+from .query_cache import index_file
+from .relay import media_source, send_media
+
+logger = logging.getLogger(__name__)
+
+# Media groups may mix photos and videos, but documents and audio only group with their own kind
+_INPUT_MEDIA = {
+    'document': InputMediaDocument,
+    'video': InputMediaVideo,
+    'audio': InputMediaAudio,
+}
+
+class MediaGroupBatcher:
+    """Collect the files of a "send all" batch and deliver them as media groups"""
+
+    def __init__(self, bot, group_size=None):
+        self.bot = bot
+        self.group_size = group_size or Config.MEDIA_GROUP_SIZE
+        self._batches = {}  # (user_id, session_id) -> {'groups': {type: [file_data]}, 'sent', 'failed', 'total'}
+        self._completed = OrderedDict()  # Recently completed batches; their late files go out one by one
+        self.stats = {'groups': 0, 'files': 0, 'failed': 0, 'late': 0}
+
+    async def add(self, event):
+        """Buffer one batch file, sending its group once it is full"""
+        key = (event.user_id, event.session_id)
+        if key in self._completed:
+            # Arrived after the batch was summarised: deliver it on its own rather than reopen the batch
+            self.stats['late'] += 1
+            await self._send_one(event.user_id, event.file_data)
+            return
+        batch = self._batches.setdefault(key, {'groups': {}, 'sent': 0, 'failed': 0, 'total': event.batch_total})
+        media_type = event.file_data.get('type')
+
+        if media_type not in _INPUT_MEDIA:
+            batch['sent' if await self._send_one(event.user_id, event.file_data) else 'failed'] += 1
+            return
+
+        files = batch['groups'].setdefault(media_type, [])
+        files.append(event.file_data)
+        if len(files) >= self.group_size:
+            await self._flush(event.user_id, batch, media_type)
+            self._progress(event.user_id, batch)
+
+    async def complete(self, event):
+        """Send the partial groups left over and a summary"""
+        key = (event.user_id, event.session_id)
+        self._completed[key] = True
+        while len(self._completed) > 1000:
+            self._completed.popitem(last=False)
+        batch = self._batches.pop(key, None)
+        if batch:
+            for media_type in list(batch['groups']):
+                await self._flush(event.user_id, batch, media_type)
+
+        # Count what actually reached the user, not what the puppet fetched
+        sent = batch['sent'] if batch else 0
+        text = f"✅ Sent {sent} of {event.total} files."
+        if event.delivered < event.total:
+            text += f"\n⚠️ {event.total - event.delivered} files could not be fetched."
+        if batch and batch['failed']:
+            text += f"\n⚠️ {batch['failed']} files could not be sent."
+        send_queue.submit(event.user_id, lambda: self.bot.send_message(chat_id=event.user_id, text=text))
+
+    def discard(self, user_id, session_id):
+        """Forget a batch whose session was superseded"""
+        self._batches.pop((user_id, session_id), None)
+
+    async def _flush(self, user_id, batch, media_type):
+        files = batch['groups'].pop(media_type, [])
+        if not files:
+            return
+        try:
+            if len(files) == 1:
+                # A group needs at least two items
+                messages = [await send_queue.send(user_id, lambda: self._send_single(user_id, media_type, files[0]), PRIORITY_FILE)]
+            else:
+                messages = await send_queue.send(
+                    user_id, lambda: self._send_group(user_id, media_type, files), PRIORITY_FILE
+                )
+        except Exception as e:
+            logger.error(f"Error sending media group to user {user_id}: {e}; sending its files one by one")
+            for file_data in files:
+                batch['sent' if await self._send_one(user_id, file_data) else 'failed'] += 1
+            return
+
+        batch['sent'] += len(files)
+        self.stats['groups'] += 1
+        self.stats['files'] += len(files)
+        for message, file_data in zip(messages, files):
+            index_file(message, file_data)
+
+    async def _send_one(self, user_id, file_data):
+        """Deliver one file outside a group; False when it could not be sent"""
+        media_type = file_data.get('type')
+        try:
+            if media_type not in _INPUT_MEDIA:
+                # Nothing to send as media; announce it like a single delivery would
+                await send_queue.send(user_id, lambda: self.bot.send_message(
+                    chat_id=user_id, text=f"Received file: {file_data.get('file_name', 'Unknown')}"
+                ), PRIORITY_FILE)
+                return True
+            message = await send_queue.send(
+                user_id, lambda: self._send_single(user_id, media_type, file_data), PRIORITY_FILE
+            )
+        except Exception as e:
+            logger.error(f"Error sending file to user {user_id}: {e}")
+            self.stats['failed'] += 1
+            return False
+        self.stats['files'] += 1
+        index_file(message, file_data)
+        return True
+
+    async def _send_group(self, user_id, media_type, files):
+        with ExitStack() as stack:
+            media = [
+                _INPUT_MEDIA[media_type](
+                    media=stack.enter_context(media_source(file_data)), caption=file_data.get('file_name')
+                )
+                for file_data in files
+            ]
+            return await self.bot.send_media_group(chat_id=user_id, media=media)
+
+    def _send_single(self, user_id, media_type, file_data):
+        send = getattr(self.bot, f"send_{media_type}")
+        return send_media(send, file_data, media_type, chat_id=user_id, caption=file_data.get('file_name'))
+
+    def _progress(self, user_id, batch):
+        if batch['total'] and batch['sent'] < batch['total']:
+            text = f"📦 Sent {batch['sent']} of {batch['total']} files..."
+            send_queue.submit(user_id, lambda: self.bot.send_message(chat_id=user_id, text=text), PRIORITY_PROGRESS)
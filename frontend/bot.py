@@ -1,38 +1,65 @@
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters
 from telegram import Update
 from telegram.ext import ContextTypes
+import asyncio
 import logging
 from config import Config
 from .handlers import start_handler, message_handler, callback_handler, error_handler
+from .inline import inline_query_handler
+from .admin import profile_handler
+from .delivery import DeliveryConsumer
+from .send_queue import send_queue
+from .cache_warmer import cache_warmer
+from database.file_index import file_index
 
 logger = logging.getLogger(__name__)
 
 class FrontendBot:
     def __init__(self):
         self.application = Application.builder().token(Config.FRONTEND_BOT_TOKEN).build()
+        self.delivery = DeliveryConsumer(self.application.bot)
+        self.delivery_task = None
+        self.warmer_task = None
+        self.send_queue_task = None
         self._setup_handlers()
     
     def _setup_handlers(self):
         """Setup all message and callback handlers"""
         self.application.add_handler(CommandHandler("start", start_handler))
+        self.application.add_handler(CommandHandler("profile", profile_handler))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
         self.application.add_handler(CallbackQueryHandler(callback_handler))
+        self.application.add_handler(InlineQueryHandler(inline_query_handler))
         self.application.add_error_handler(error_handler)
     
     async def run(self):
         """Start the bot"""
         logger.info("Starting Frontend Bot...")
         await self.application.initialize()
+        self.send_queue_task = asyncio.create_task(send_queue.run())
         await self.application.start()
         await self.application.updater.start_polling()
+        self.delivery_task = asyncio.create_task(self.delivery.run())
+        if Config.CACHE_WARM_ENABLED:
+            self.warmer_task = asyncio.create_task(cache_warmer.run())
         logger.info("Frontend Bot is now running!")
     
     async def stop(self):
         """Stop the bot gracefully"""
         logger.info("Stopping Frontend Bot...")
+        self.delivery.stop()
+        if self.delivery_task:
+            self.delivery_task.cancel()
+        cache_warmer.stop()
+        if self.warmer_task:
+            self.warmer_task.cancel()
         await self.application.updater.stop()
         await self.application.stop()
+        await send_queue.stop()
+        if self.send_queue_task:
+            self.send_queue_task.cancel()
         await self.application.shutdown()
+        file_index.close()
         logger.info("Frontend Bot stopped successfully!")
 
 # Global bot instance
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+import zlib
+from config import Config
+from database import work_queue
+from utils.heavy_hitters import SpaceSaving
+from utils.helpers import generate_session_id
+from utils.query_normalizer import canonicalize_query
+from .query_cache import expires_in, refresh_result
+from .send_queue import send_queue
+
+logger = logging.getLogger(__name__)
+
+# A warming search that hasn't answered by then is given up on
+_INFLIGHT_EXPIRY = 10 * 60
+
+def warming_user_id(canonical):
+    """Stable negative pseudo user id for a warming search (the puppet keys off the sign)"""
+    return -(zlib.crc32(canonical.encode('utf-8')) + 1)
+
+class CacheWarmer:
+    """
+    Track the most frequent queries with a SpaceSaving sketch and, while the
+    puppet and the send queue are idle, re-run the ones whose cached results
+    are about to expire. Warming searches go through the work queue like
+    any other job, so they share the puppet's pacing and retry budget.
+    """
+
+    def __init__(self, capacity=None, top_k=None, interval=None, ahead=None):
+        self.hitters = SpaceSaving(capacity or Config.CACHE_WARM_TRACKED)
+        self.top_k = top_k or Config.CACHE_WARM_TOP_K
+        self.interval = interval or Config.CACHE_WARM_INTERVAL
+        self.ahead = ahead or Config.CACHE_WARM_AHEAD
+        self._queries = {}    # canonical -> latest query text typed for it
+        self._inflight = {}   # canonical -> (session_id, started_at)
+        self.is_running = False
+        self.stats = {'cycles': 0, 'busy_skips': 0, 'enqueued': 0, 'refreshed': 0, 'expired': 0}
+
+    def record(self, query):
+        """Count one user search"""
+        if not Config.CACHE_WARM_ENABLED:
+            return
+        canonical = canonicalize_query(query)
+        if canonical:
+            self.hitters.add(canonical)
+            if canonical in self.hitters:
+                self._queries[canonical] = query
+
+    async def run(self):
+        """Warm the cache every interval until stopped"""
+        self.is_running = True
+        logger.info("Cache warmer started")
+        while self.is_running:
+            await asyncio.sleep(self.interval)
+            try:
+                self.warm_once()
+            except Exception as e:
+                logger.error(f"Error in cache warmer: {e}")
+
+    def warm_once(self):
+        """One cycle: enqueue refreshes for hot entries close to expiry, if there is spare capacity"""
+        self.stats['cycles'] += 1
+        now = time.monotonic()
+        for canonical, (_, started) in list(self._inflight.items()):
+            if now - started > _INFLIGHT_EXPIRY:
+                del self._inflight[canonical]
+                self.stats['expired'] += 1
+
+        if not self._idle():
+            self.stats['busy_skips'] += 1
+        else:
+            enqueued = 0
+            for canonical in self.candidates():
+                if enqueued >= Config.CACHE_WARM_MAX_PER_CYCLE:
+                    break
+                self._enqueue(canonical, now)
+                enqueued += 1
+
+        self.hitters.decay(Config.CACHE_WARM_DECAY)
+        self._queries = {canonical: q for canonical, q in self._queries.items() if canonical in self.hitters}
+
+    def candidates(self):
+        """Hot queries whose cached results expire within the look-ahead window, hottest first"""
+        for canonical, count, error in self.hitters.top(self.top_k):
+            # Only counts the sketch can vouch for: guaranteed hits = count - error
+            if count - error < Config.CACHE_WARM_MIN_HITS or canonical in self._inflight:
+                continue
+            remaining = expires_in(canonical)
+            if remaining is not None and 0 <= remaining <= self.ahead:
+                yield canonical
+
+    def _idle(self):
+        return (
+            work_queue.pending_count() <= Config.CACHE_WARM_MAX_PENDING_JOBS
+            and send_queue.metrics()['depth'] <= Config.CACHE_WARM_MAX_SEND_DEPTH
+        )
+
+    def _enqueue(self, canonical, now):
+        session_id = generate_session_id()
+        try:
+            work_queue.enqueue({
+                'action': 'warm',
+                'user_id': str(warming_user_id(canonical)),
+                'session_id': session_id,
+                'query': self._queries.get(canonical, canonical)
+            })
+        except Exception as e:
+            logger.error(f"Error enqueueing cache refresh for '{canonical}': {e}")
+            return
+        self._inflight[canonical] = (session_id, now)
+        self.stats['enqueued'] += 1
+
+    def on_refreshed(self, event):
+        """Store the result list a warming search brought back"""
+        canonical = next((c for c, (sid, _) in self._inflight.items() if sid == event.session_id), None)
+        if canonical is None:
+            return  # Given up on, or started by another frontend process
+        del self._inflight[canonical]
+        if refresh_result(canonical, event.buttons_data, event.results_message_id, event.results_puppet):
+            self.stats['refreshed'] += 1
+            logger.info(f"Refreshed cached results for '{canonical}' ({len(event.buttons_data)} files)")
+
+    def metrics(self):
+        return {'tracked': len(self.hitters), 'inflight': len(self._inflight), **self.stats}
+
+    def stop(self):
+        self.is_running = False
+
+# Global cache warmer instance
+cache_warmer = CacheWarmer()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+from config import Config
+from database import redis_client, event_bus
+from models import FileReadyEvent, ErrorEvent, ProgressEvent, BatchCompleteEvent, ResultsRefreshedEvent
+from .handlers import send_file_to_user, format_search_error
+from .send_queue import send_queue, PRIORITY_REPLY, PRIORITY_PROGRESS
+from .query_cache import remember_result, index_file
+from .negative_cache import negative_cache
+from .cache_warmer import cache_warmer
+from .batch import MediaGroupBatcher
+from utils.dispatcher import SessionDispatcher
+from utils.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+class DeliveryConsumer:
+    """
+    Consume puppet delivery events in batches and send them through the
+    frontend bot. Each user's events are delivered in order; users don't
+    wait on each other's rate-limited sends, so the consumer keeps pulling
+    batches while earlier ones are still being delivered.
+    """
+
+    def __init__(self, bot, bus=None, max_batch=50):
+        self.context = SimpleNamespace(bot=bot)
+        self.bus = bus or event_bus
+        self.max_batch = max_batch
+        self.batcher = MediaGroupBatcher(bot)
+        self.dispatcher = SessionDispatcher(
+            self._deliver_safely, Config.DELIVERY_WORKERS, Config.DELIVERY_MAX_PENDING, name='delivery dispatcher'
+        )
+        self.is_running = False
+        self.stats = {'batches': 0, 'events': 0, 'stale': 0, 'failed': 0}
+
+    async def run(self):
+        """Deliver events until stopped"""
+        self.is_running = True
+        logger.info("Delivery consumer started")
+        try:
+            while self.is_running:
+                try:
+                    events = await self.bus.consume_batch(self.max_batch, timeout=1.0)
+                    if events:
+                        await self.deliver_batch(events)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in delivery consumer: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            await self.dispatcher.stop()
+
+    async def deliver_batch(self, events):
+        """
+        Hand a batch to the per-user dispatcher without waiting for the sends;
+        only waits when DELIVERY_MAX_PENDING events are already queued
+        """
+        self.stats['batches'] += 1
+        self.stats['events'] += len(events)
+        for event in events:
+            await self.dispatcher.submit(event.user_id, event)
+
+    async def _deliver_safely(self, event):
+        try:
+            await self._deliver(event)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Error delivering {event!r}: {e}")
+
+    @profiled('frontend.delivery.deliver')
+    async def _deliver(self, event):
+        if isinstance(event, ResultsRefreshedEvent):
+            cache_warmer.on_refreshed(event)
+            return
+        if event.user_id < 0:
+            # Other events of a cache-warming search have no chat to go to
+            return
+
+        if isinstance(event, FileReadyEvent):
+            session_data = redis_client.get_user_session(event.user_id)
+            if not session_data:
+                logger.error(f"No session found for user {event.user_id}")
+                return
+            if event.session_id and session_data.get('session_id') != event.session_id:
+                # File belongs to a search the user has already replaced
+                self.stats['stale'] += 1
+                self.batcher.discard(event.user_id, event.session_id)
+                return
+            if event.batch_total:
+                await self.batcher.add(event)
+                return
+            try:
+                sent = await send_file_to_user(event.user_id, event.file_data, session_data, self.context)
+                remember_result(session_data, sent, event.file_data)
+                index_file(sent, event.file_data)
+            except Exception:
+                self._send_text(
+                    event.user_id,
+                    "❌ Error occurred while processing your request:\n\nFailed to deliver file",
+                    PRIORITY_REPLY
+                )
+
+        elif isinstance(event, ErrorEvent):
+            if event.no_results:
+                self._remember_no_results(event)
+            self._send_text(event.user_id, format_search_error(event.error_message), PRIORITY_REPLY)
+
+        elif isinstance(event, BatchCompleteEvent):
+            await self.batcher.complete(event)
+
+        elif isinstance(event, ProgressEvent):
+            self._send_text(event.user_id, event.text, PRIORITY_PROGRESS)
+
+    def _remember_no_results(self, event):
+        """Cache the query behind a "not found" reply so repeats skip the backend"""
+        session_data = redis_client.get_user_session(event.user_id)
+        if session_data and session_data.get('session_id') == event.session_id:
+            negative_cache.add(session_data['original_query'], event.error_message)
+
+    def _send_text(self, user_id, text, priority):
+        """Queue a plain text message (errors and progress don't hold up the batch)"""
+        send_queue.submit(user_id, lambda: self.context.bot.send_message(chat_id=user_id, text=text), priority)
+
+    def stop(self):
+        self.is_running = False
@@ -1,13 +1,48 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import logging
-from database import redis_client
-from puppet.client import puppet_client
-from utils.helpers import generate_session_id
+from database import redis_client, work_queue
+from utils.helpers import generate_session_id, parse_callback_data
+from utils.profiling import profiled
 from config import Config
+from .send_queue import send_queue, PRIORITY_FILE, PRIORITY_REPLY, PRIORITY_PROGRESS
+from .query_cache import lookup_result
+from .negative_cache import negative_cache
+from .cache_warmer import cache_warmer
+from .results import SORT_LABELS, results_view, available_qualities
+from .keyboards import create_results_keyboard
+from .relay import send_media
 
 logger = logging.getLogger(__name__)
 
+def _reply(message, text, priority=PRIORITY_REPLY, **kwargs):
+    """Queue a reply through the rate-limited send queue"""
+    return send_queue.submit(message.chat_id, lambda: message.reply_text(text, **kwargs), priority)
+
+def format_search_error(error_message):
+    """User-facing text for a backend error reply"""
+    return (
+        "❌ Error occurred while processing your request:\n\n"
+        f"{error_message}\n\n"
+        "Please check the spelling or try a different search term."
+    )
+
+def _callback_chat(query):
+    """Send-queue key of a callback: its chat, or the user for inline messages (no message attached)"""
+    return query.message.chat_id if query.message is not None else query.from_user.id
+
+def _reply_to_callback(query, text, priority=PRIORITY_REPLY, **kwargs):
+    """Queue a new message answering a callback; inline messages get it in the user's private chat"""
+    if query.message is not None:
+        return _reply(query.message, text, priority, **kwargs)
+    user_id = query.from_user.id
+    return send_queue.submit(user_id, lambda: query.get_bot().send_message(chat_id=user_id, text=text, **kwargs), priority)
+
+def _edit(query, text, **kwargs):
+    """Queue a callback message edit through the rate-limited send queue"""
+    return send_queue.submit(_callback_chat(query), lambda: query.edit_message_text(text, **kwargs))
+
+@profiled()
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
     welcome_message = (
@@ -20,15 +55,26 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Just type what you're looking for!"
     )
     
-    await update.message.reply_text(welcome_message)
+    _reply(update.message, welcome_message)
 
+@profiled()
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle incoming text messages"""
     user_id = update.effective_user.id
     query = update.message.text.strip()
     
     if not query:
-        await update.message.reply_text("Please provide a search query.")
+        _reply(update.message, "Please provide a search query.")
+        return
+    
+    # Every search counts towards the heavy hitters the cache warmer refreshes
+    cache_warmer.record(query)
+    
+    # Queries the backend recently had nothing for are answered locally
+    cached_error = negative_cache.check(query)
+    if cached_error:
+        logger.info(f"Negative cache hit for '{query}'")
+        _reply(update.message, format_search_error(cached_error))
         return
     
     # Generate session ID for this request
@@ -44,20 +90,45 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'session_id': session_id
     }
     
+    # Queries resolved before (or near-duplicates of them) are answered without the backend
+    cached = lookup_result(query)
+    if cached:
+        session_data['total_files'] = cached['total_files']
+        session_data['buttons_data'] = cached['buttons_data']
+        if cached.get('results_message_id') and cached.get('results_puppet'):
+            # Other puppet workers ignore the id and repeat the search on their own account
+            session_data['results_message_id'] = cached['results_message_id']
+            session_data['results_puppet'] = cached['results_puppet']
+    
     if not redis_client.set_user_session(user_id, session_data):
-        await update.message.reply_text("❌ System busy. Please try again in a moment.")
+        _reply(update.message, "❌ System busy. Please try again in a moment.")
         return
     
-    # Notify user that search is in progress
-    await update.message.reply_text(f"🔍 Searching for: '{query}'...")
-    
-    # Forward request to puppet system
-    success = await puppet_client.send_search_request(user_id, query, session_id)
+    if cached:
+        try:
+            await send_file_to_user(user_id, cached['file_data'], session_data, context)
+            return
+        except Exception as e:
+            logger.warning(f"Cached result for user {user_id} could not be sent, searching instead: {e}")
     
-    if not success:
-        await update.message.reply_text("❌ Service temporarily unavailable. Please try again later.")
+    # Queue the search durably; a puppet worker claims and acknowledges it
+    try:
+        work_queue.enqueue({
+            'action': 'search',
+            'user_id': str(user_id),
+            'session_id': session_id,
+            'query': query
+        })
+    except Exception as e:
+        logger.error(f"Error enqueueing search for user {user_id}: {e}")
+        _reply(update.message, "❌ Service temporarily unavailable. Please try again later.")
         redis_client.delete_user_session(user_id)
+        return
+    
+    # Notify user that search is in progress
+    _reply(update.message, f"🔍 Searching for: '{query}'...", PRIORITY_PROGRESS)
 
+@profiled()
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle inline keyboard callbacks"""
     query = update.callback_query
@@ -75,40 +146,140 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             # Verify the callback is from the correct user
             if user_id != target_user_id:
-                await query.edit_message_text("❌ This action is not authorized.")
+                _edit(query, "❌ This action is not authorized.")
                 return
             
             # Get user session
             session_data = redis_client.get_user_session(user_id)
             if not session_data:
-                await query.edit_message_text("❌ Session expired. Please start a new search.")
+                _edit(query, "❌ Session expired. Please start a new search.")
                 return
             
             # Check if there are more files
             if next_index >= session_data.get('total_files', 0):
-                await query.edit_message_text(
+                _edit(
+                    query,
                     f"📭 No more files found for: '{session_data['original_query']}'\n\n"
                     "Try a different search query."
                 )
                 return
             
-            # Update session with new index
-            session_data['current_index'] = next_index
-            redis_client.set_user_session(user_id, session_data)
+            # Update session with new index and request the file via a puppet worker
+            _request_file(query, user_id, session_data, next_index)
             
-            # Request next file via puppet
-            success = await puppet_client.request_next_file(
-                user_id, 
-                session_data['session_id'],
-                next_index
-            )
+        except (ValueError, IndexError) as e:
+            logger.error(f"Error parsing callback data: {e}")
+            _edit(query, "❌ Invalid request. Please start a new search.")
+    
+    # Send every remaining file (format: all_userId_startIndex)
+    elif callback_data.startswith('all_'):
+        try:
+            parts = callback_data.split('_')
+            target_user_id = int(parts[1])
+            start_index = int(parts[2])
+            
+            if user_id != target_user_id:
+                _edit(query, "❌ This action is not authorized.")
+                return
+            
+            session_data = redis_client.get_user_session(user_id)
+            if not session_data:
+                _edit(query, "❌ Session expired. Please start a new search.")
+                return
+            
+            remaining = session_data.get('total_files', 0) - start_index
+            if remaining <= 0:
+                return
             
-            if not success:
-                await query.edit_message_text("❌ Error fetching next file. Please try a new search.")
+            # Drop the buttons so the batch isn't requested twice
+            send_queue.submit(_callback_chat(query), lambda: query.edit_message_reply_markup(reply_markup=None))
+            
+            try:
+                work_queue.enqueue({
+                    'action': 'all',
+                    'user_id': str(user_id),
+                    'session_id': session_data['session_id'],
+                    'start_index': str(start_index)
+                })
+            except Exception as e:
+                logger.error(f"Error enqueueing batch request for user {user_id}: {e}")
+                _reply_to_callback(query, "❌ Error fetching the files. Please try again.")
+                return
+            
+            _reply_to_callback(query, f"📦 Fetching {remaining} more files...", PRIORITY_PROGRESS)
             
         except (ValueError, IndexError) as e:
             logger.error(f"Error parsing callback data: {e}")
-            await query.edit_message_text("❌ Invalid request. Please start a new search.")
+            _edit(query, "❌ Invalid request. Please start a new search.")
+
+    # Results list: open, page, sort, filter and jump to a result
+    elif callback_data.startswith(('results_', 'list_', 'sort_', 'filter_', 'pick_')):
+        data = parse_callback_data(callback_data)
+        if not data:
+            _edit(query, "❌ Invalid request. Please start a new search.")
+            return
+        if user_id != data['user_id']:
+            _edit(query, "❌ This action is not authorized.")
+            return
+        
+        session_data = redis_client.get_user_session(user_id)
+        if not session_data:
+            _edit(query, "❌ Session expired. Please start a new search.")
+            return
+        
+        if data['type'] == 'pick':
+            if 0 <= data['index'] < session_data.get('total_files', 0):
+                _request_file(query, user_id, session_data, data['index'])
+            return
+        
+        view = session_data.get('results_view') or {'sort': 'default', 'quality': None}
+        page = data.get('page', 0)
+        if data['type'] == 'sort' and data['value'] in SORT_LABELS:
+            view['sort'] = data['value']
+        elif data['type'] == 'filter':
+            view['quality'] = None if data['value'] == 'all' else data['value']
+        if data['type'] in ('sort', 'filter'):
+            session_data['results_view'] = view
+            redis_client.set_user_session(user_id, session_data)
+        
+        # Opened from a file message (a caption can't become a list): send the list separately
+        _show_results(query, user_id, session_data, view, page, edit=data['type'] != 'results')
+
+def _request_file(query, user_id, session_data, index):
+    """Move the session to a result and have a puppet worker fetch it"""
+    session_data['current_index'] = index
+    redis_client.set_user_session(user_id, session_data)
+    
+    try:
+        work_queue.enqueue({
+            'action': 'next',
+            'user_id': str(user_id),
+            'session_id': session_data['session_id'],
+            'next_index': str(index)
+        })
+    except Exception as e:
+        logger.error(f"Error enqueueing next file request for user {user_id}: {e}")
+        _edit(query, "❌ Error fetching next file. Please try a new search.")
+
+def _show_results(query, user_id, session_data, view, page, edit=True):
+    """Render one page of the sorted/filtered results list"""
+    buttons_data = session_data.get('buttons_data', [])
+    entries = results_view(buttons_data, view['sort'], view['quality'])
+    page_size = Config.RESULTS_PAGE_SIZE
+    page = min(max(page, 0), max(0, (len(entries) - 1) // page_size))
+    
+    text = f"📋 Results for '{session_data['original_query']}'"
+    if view['quality']:
+        text += f" ({view['quality']}: {len(entries)} files)"
+    text += "\n\nTap a result to get it."
+    keyboard = create_results_keyboard(
+        user_id, entries, page, page_size, view['sort'], view['quality'], available_qualities(buttons_data)
+    )
+    
+    if edit:
+        _edit(query, text, reply_markup=keyboard)
+    else:
+        _reply_to_callback(query, text, reply_markup=keyboard)
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors in the bot"""
@@ -116,14 +287,15 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if update and update.effective_message:
         try:
-            await update.effective_message.reply_text(
+            _reply(
+                update.effective_message,
                 "❌ An error occurred. Please try again or contact support if the issue persists."
             )
         except Exception as e:
             logger.error(f"Failed to send error message: {e}")
 
 async def send_file_to_user(user_id, file_data, session_data, context: ContextTypes.DEFAULT_TYPE):
-    """Send file to user with next button"""
+    """Send file to user with next button; returns the sent message"""
     try:
         caption = (
             f"📁 File {session_data['current_index'] + 1} of {session_data['total_files']}\n"
@@ -132,43 +304,46 @@ async def send_file_to_user(user_id, file_data, session_data, context: ContextTy
             "Use 'Next' for more options."
         )
         
-        # Create next button if there are more files
+        # Create next button if there are more files, and "send all" if there are several
         keyboard = None
         if session_data['current_index'] + 1 < session_data['total_files']:
             next_index = session_data['current_index'] + 1
             callback_data = f"next_{user_id}_{next_index}"
-            keyboard = InlineKeyboardMarkup([[
-                InlineKeyboardButton("Next ➡️", callback_data=callback_data)
-            ]])
+            row = [InlineKeyboardButton("Next ➡️", callback_data=callback_data)]
+            if session_data['total_files'] - next_index > 1:
+                row.append(InlineKeyboardButton("📦 Send all", callback_data=f"all_{user_id}_{next_index}"))
+            keyboard = InlineKeyboardMarkup([
+                row, [InlineKeyboardButton("📋 All results", callback_data=f"results_{user_id}")]
+            ])
         
         # Send the file based on type
         if file_data['type'] == 'document':
-            await context.bot.send_document(
+            return await send_queue.send(user_id, lambda: send_media(
+                context.bot.send_document, file_data, 'document',
                 chat_id=user_id,
-                document=file_data['file_id'],
                 caption=caption,
                 reply_markup=keyboard
-            )
+            ), PRIORITY_FILE)
         elif file_data['type'] == 'video':
-            await context.bot.send_video(
+            return await send_queue.send(user_id, lambda: send_media(
+                context.bot.send_video, file_data, 'video',
                 chat_id=user_id,
-                video=file_data['file_id'],
                 caption=caption,
                 reply_markup=keyboard
-            )
+            ), PRIORITY_FILE)
         elif file_data['type'] == 'audio':
-            await context.bot.send_audio(
+            return await send_queue.send(user_id, lambda: send_media(
+                context.bot.send_audio, file_data, 'audio',
                 chat_id=user_id,
-                audio=file_data['file_id'],
                 caption=caption,
                 reply_markup=keyboard
-            )
+            ), PRIORITY_FILE)
         else:
-            await context.bot.send_message(
+            return await send_queue.send(user_id, lambda: context.bot.send_message(
                 chat_id=user_id,
                 text=f"Received file: {file_data.get('file_name', 'Unknown')}\n\n{caption}",
                 reply_markup=keyboard
-            )
+            ), PRIORITY_FILE)
             
     except Exception as e:
         logger.error(f"Error sending file to user {user_id}: {e}")
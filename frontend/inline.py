@@ -0,0 +1,48 @@
+from telegram import (
+    Update,
+    InlineQueryResultCachedDocument,
+    InlineQueryResultCachedVideo,
+    InlineQueryResultCachedAudio,
+)
+from telegram.ext import ContextTypes
+import logging
+from config import Config
+from database.file_index import file_index
+from utils.helpers import format_file_size
+from utils.profiling import profiled
+from utils.hot_log import get_hot_logger
+
+logger = logging.getLogger(__name__)
+hot_log = get_hot_logger(__name__)
+
+def _inline_result(entry):
+    """Cached inline result re-sending an already uploaded file by its file_id"""
+    result_id = entry['key'][:64]
+    description = format_file_size(entry['file_size']) if entry['file_size'] else None
+    if entry['type'] == 'video':
+        return InlineQueryResultCachedVideo(
+            id=result_id, video_file_id=entry['file_id'], title=entry['file_name'], description=description
+        )
+    if entry['type'] == 'audio':
+        return InlineQueryResultCachedAudio(id=result_id, audio_file_id=entry['file_id'])
+    return InlineQueryResultCachedDocument(
+        id=result_id, title=entry['file_name'], document_file_id=entry['file_id'], description=description
+    )
+
+@profiled()
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer inline queries from the local file index, without a backend round trip"""
+    query = update.inline_query
+    text = query.query.strip()
+    if not text:
+        await query.answer([], cache_time=Config.INLINE_CACHE_TIME)
+        return
+
+    entries = file_index.search(text, limit=Config.INLINE_RESULTS_LIMIT)
+    hot_log.info('inline_query', user=query.from_user.id, query=text, results=len(entries))
+    # Answers aren't chat messages, so they bypass the per-chat send queue
+    await query.answer(
+        [_inline_result(entry) for entry in entries],
+        cache_time=Config.INLINE_CACHE_TIME,
+        is_personal=False
+    )
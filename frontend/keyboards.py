@@ -1,4 +1,5 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from .results import SORT_LABELS, format_result_label
 
 def create_next_keyboard(user_id, next_index):
     """Create inline keyboard with Next button"""
@@ -17,4 +18,41 @@ def create_error_keyboard():
         InlineKeyboardButton("New Search", callback_data="new_search")
     ]]
     
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+def create_results_keyboard(user_id, entries, page, page_size, sort='default', quality=None, qualities=()):
+    """
+    Paginated results list: one button per result that fetches it directly,
+    then page navigation, sort and quality filter rows
+    """
+    total_pages = max(1, (len(entries) + page_size - 1) // page_size)
+    page = min(max(page, 0), total_pages - 1)
+    start = page * page_size
+    
+    keyboard = [
+        [InlineKeyboardButton(format_result_label(start + offset + 1, button), callback_data=f"pick_{user_id}_{index}")]
+        for offset, (index, button) in enumerate(entries[start:start + page_size])
+    ]
+    
+    if total_pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("⬅️", callback_data=f"list_{user_id}_{page - 1}"))
+        nav.append(InlineKeyboardButton(f"{page + 1}/{total_pages}", callback_data=f"list_{user_id}_{page}"))
+        if page + 1 < total_pages:
+            nav.append(InlineKeyboardButton("➡️", callback_data=f"list_{user_id}_{page + 1}"))
+        keyboard.append(nav)
+    
+    keyboard.append([
+        InlineKeyboardButton(f"✓ {label}" if key == sort else label, callback_data=f"sort_{user_id}_{key}")
+        for key, label in SORT_LABELS.items()
+    ])
+    
+    if qualities:
+        keyboard.append([
+            InlineKeyboardButton(f"✓ {label}" if value == (quality or 'all') else label,
+                                 callback_data=f"filter_{user_id}_{value}")
+            for value, label in [('all', 'All')] + [(q, q) for q in qualities[:4]]
+        ])
+    
+    return InlineKeyboardMarkup(keyboard)
@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import OrderedDict
+from config import Config
+from utils.bloom_filter import BloomFilter
+from utils.query_normalizer import canonicalize_query
+
+logger = logging.getLogger(__name__)
+
+class NegativeCache:
+    """
+    Queries the backend answered with "not found" / "not released", kept for
+    a short TTL. A Bloom filter in front of the entries rejects the common
+    case (never failed) without touching them, and is rebuilt periodically
+    from the live entries so expired ones age out of it.
+    """
+
+    def __init__(self, ttl=None, capacity=None, error_rate=None, rebuild_interval=None):
+        self.ttl = ttl or Config.NEGATIVE_CACHE_TTL
+        self.capacity = capacity or Config.NEGATIVE_CACHE_CAPACITY
+        self.error_rate = error_rate or Config.NEGATIVE_CACHE_ERROR_RATE
+        self.rebuild_interval = rebuild_interval or Config.NEGATIVE_CACHE_REBUILD_INTERVAL
+        self._entries = OrderedDict()  # canonical -> (error message, expires_at)
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._rebuilt_at = time.monotonic()
+        self.stats = {'checks': 0, 'bloom_rejects': 0, 'hits': 0, 'false_positives': 0, 'rebuilds': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, query, error_message):
+        """Record a query the backend has no result for"""
+        canonical = canonicalize_query(query)
+        if not canonical:
+            return
+        self._entries.pop(canonical, None)
+        self._entries[canonical] = (error_message, time.monotonic() + self.ttl)
+        if len(self._entries) > self.capacity or self._bloom.count >= self.capacity:
+            self.rebuild()
+        else:
+            self._bloom.add(canonical)
+
+    def check(self, query):
+        """Cached error message for the query, or None when it should go to the backend"""
+        now = time.monotonic()
+        if now - self._rebuilt_at >= self.rebuild_interval:
+            self.rebuild()
+
+        self.stats['checks'] += 1
+        canonical = canonicalize_query(query)
+        if canonical not in self._bloom:
+            self.stats['bloom_rejects'] += 1
+            return None
+
+        entry = self._entries.get(canonical)
+        if entry is None or entry[1] < now:
+            # Bloom collision, or an entry that expired since the last rebuild
+            self.stats['false_positives'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def rebuild(self):
+        """
+        Drop expired entries, and over capacity the oldest ones down to 90% of it,
+        then rebuild the filter from the rest. The headroom keeps a full cache from
+        rebuilding (O(n)) on every add.
+        """
+        now = time.monotonic()
+        live = [(key, entry) for key, entry in self._entries.items() if entry[1] >= now]
+        if len(live) >= self.capacity:
+            live = live[-(self.capacity - max(1, self.capacity // 10)):]
+        self._entries = OrderedDict(live)
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        for key in self._entries:
+            self._bloom.add(key)
+        self._rebuilt_at = now
+        self.stats['rebuilds'] += 1
+
+    def metrics(self):
+        """Entry count, filter size, counters and the observed false-positive rate"""
+        maybe = self.stats['checks'] - self.stats['bloom_rejects']
+        return {
+            'entries': len(self._entries),
+            'filter_bytes': self._bloom.size_bytes,
+            'false_positive_rate': self.stats['false_positives'] / maybe if maybe else 0.0,
+            **self.stats
+        }
+
+
+# Global negative cache instance
+negative_cache = NegativeCache()
@@ -0,0 +1,88 @@
+import logging
+import time
+from config import Config
+from database.file_index import file_index
+from utils.query_normalizer import canonicalize_query
+from utils.trigram_index import TrigramIndex
+from utils.hot_log import get_hot_logger
+
+logger = logging.getLogger(__name__)
+hot_log = get_hot_logger(__name__)
+
+# Canonical query -> first delivered file (Bot API file_id) and the result list
+query_index = TrigramIndex(
+    max_entries=Config.QUERY_INDEX_MAX_ENTRIES,
+    threshold=Config.QUERY_SIMILARITY_THRESHOLD,
+    ttl=Config.QUERY_CACHE_TTL
+)
+
+def sent_file_id(message):
+    """Bot API (type, file_id) of a message sent by the frontend bot"""
+    for media_type in ('document', 'video', 'audio'):
+        media = getattr(message, media_type, None)
+        if media is not None:
+            return media_type, media.file_id
+    return None, None
+
+def remember_result(session_data, sent_message, file_data):
+    """Record the first file delivered for a query so near-duplicates can skip the backend"""
+    if not sent_message or session_data.get('current_index', 0) != 0:
+        return
+    media_type, file_id = sent_file_id(sent_message)
+    if not file_id:
+        return
+    query_index.add(canonicalize_query(session_data['original_query']), {
+        'file_data': {
+            'type': media_type,
+            'file_id': file_id,
+            'file_name': file_data.get('file_name', 'Unknown'),
+            'file_size': file_data.get('file_size', 0)
+        },
+        'total_files': session_data.get('total_files', 0),
+        'buttons_data': session_data.get('buttons_data', []),
+        # Message ids are per puppet account; the id is only usable together with its owner
+        'results_message_id': session_data.get('results_message_id'),
+        'results_puppet': session_data.get('results_puppet')
+    })
+
+def expires_in(canonical):
+    """Seconds until the exact cached entry expires (None: no expiry), or -1 when not cached"""
+    entry = query_index.peek(canonical)
+    if entry is None:
+        return -1
+    _, expires_at = entry
+    return None if expires_at is None else expires_at - time.monotonic()
+
+def refresh_result(canonical, buttons_data, results_message_id, results_puppet):
+    """Replace a cached entry's result list with a fresh one, restarting its TTL"""
+    entry = query_index.peek(canonical)
+    if entry is None or not buttons_data:
+        return False
+    query_index.add(canonical, {
+        **entry[0],
+        'total_files': len(buttons_data),
+        'buttons_data': buttons_data,
+        'results_message_id': results_message_id,
+        'results_puppet': results_puppet
+    })
+    return True
+
+def index_file(sent_message, file_data):
+    """Add a delivered file to the inline-mode file index"""
+    media_type, file_id = sent_file_id(sent_message) if sent_message else (None, None)
+    file_index.add(
+        file_data.get('file_id'),
+        media_type,
+        file_id,
+        file_data.get('file_name'),
+        file_data.get('file_size', 0)
+    )
+
+def lookup_result(query):
+    """Cached result for the query or a near-duplicate of it, or None"""
+    match = query_index.lookup(canonicalize_query(query))
+    if match is None:
+        return None
+    canonical, result, score = match
+    hot_log.info('query_cache_hit', query=query, canonical=canonical, similarity=f"{score:.2f}")
+    return result
@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+
+from database.blob_cache import blob_cache
+
+
+@contextmanager
+def media_source(file_data):
+    """What to upload for a file: the relayed blob when cached, else its file_id"""
+    blob = blob_cache.open(file_data['blob']) if file_data.get('blob') else None
+    try:
+        yield blob or file_data['file_id']
+    finally:
+        if blob is not None:
+            blob.close()
+
+
+async def send_media(send, file_data, field, **kwargs):
+    """Call a Bot API send method with the file passed as `field` (document, video, ...)"""
+    with media_source(file_data) as media:
+        return await send(**{field: media}, **kwargs)
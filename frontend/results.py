@@ -0,0 +1,47 @@
+from utils.helpers import format_file_size
+
+# Sort orders offered on the results list
+SORT_LABELS = {'default': 'Default', 'size': 'Size', 'name': 'Name', 'episode': 'Episode'}
+
+_QUALITY_ORDER = ('2160p', '1440p', '1080p', '720p', '576p', '480p', '360p', '240p')
+
+
+def _meta(button):
+    return button.get('meta') or {}
+
+
+def results_view(buttons_data, sort='default', quality=None):
+    """(original index, button) pairs of the file buttons, filtered and sorted"""
+    entries = [(index, button) for index, button in enumerate(buttons_data) if button.get('data') is not None]
+    if quality:
+        entries = [entry for entry in entries if _meta(entry[1]).get('quality') == quality]
+
+    if sort == 'size':
+        entries.sort(key=lambda entry: -(_meta(entry[1]).get('size') or 0))
+    elif sort == 'name':
+        entries.sort(key=lambda entry: (_meta(entry[1]).get('name') or entry[1].get('text', '')).lower())
+    elif sort == 'episode':
+        # Files without an episode tag go last, in backend order
+        entries.sort(key=lambda entry: (_meta(entry[1]).get('episode') is None, _meta(entry[1]).get('episode') or ''))
+    return entries
+
+
+def available_qualities(buttons_data):
+    """Qualities present in the results, best first"""
+    found = {_meta(button).get('quality') for button in buttons_data}
+    return [quality for quality in _QUALITY_ORDER if quality in found]
+
+
+def format_result_label(position, button, max_length=60):
+    """Button label for one result: position, name, quality and size"""
+    meta = _meta(button)
+    name = meta.get('name') or button.get('text', '')
+    # Quality/episode already visible in the name aren't repeated
+    details = [value for value in (meta.get('quality'), meta.get('episode')) if value and value not in name.lower()]
+    if meta.get('size'):
+        details.append(format_file_size(meta['size']))
+    suffix = f" · {' · '.join(details)}" if details else ''
+    room = max_length - len(suffix) - len(f"{position}. ")
+    if len(name) > room:
+        name = name[:max(1, room - 1)] + '…'
+    return f"{position}. {name}{suffix}"
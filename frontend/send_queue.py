@@ -0,0 +1,216 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from telegram.error import RetryAfter
+from config import Config
+from utils.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Lower value is sent first
+PRIORITY_FILE = 0
+PRIORITY_REPLY = 1
+PRIORITY_PROGRESS = 2
+
+
+class TokenBucket:
+    """Token bucket that reports how long to wait for the next token"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self, now=None) -> float:
+        """Seconds until a token is available (0 when one is available now)"""
+        now = now or time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, now=None):
+        self._refill(now or time.monotonic())
+        self.tokens -= 1.0
+
+    def block(self, seconds: float):
+        """Hold the bucket empty, e.g. for a server-side retry_after"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class _Send:
+    __slots__ = ('chat_id', 'factory', 'priority', 'sequence', 'enqueued_at', 'future', 'attempts')
+
+    def __init__(self, chat_id, factory, priority, sequence, future):
+        self.chat_id = chat_id
+        self.factory = factory
+        self.priority = priority
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.future = future
+        self.attempts = 0
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class SendQueue:
+    """Central outbound Bot API queue with global and per-chat rate limits"""
+
+    def __init__(self, global_rate=None, per_chat_rate=None, per_chat_burst=None,
+                 max_concurrent=None, max_attempts=3):
+        self.global_bucket = TokenBucket(global_rate or Config.SEND_GLOBAL_RATE, global_rate or Config.SEND_GLOBAL_RATE)
+        self.per_chat_rate = per_chat_rate or Config.SEND_PER_CHAT_RATE
+        self.per_chat_burst = per_chat_burst or Config.SEND_PER_CHAT_BURST
+        self.max_attempts = max_attempts
+        self._chat_buckets = {}
+        self._pending = {}  # chat_id -> heap of _Send
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(max_concurrent or Config.SEND_MAX_CONCURRENT)
+        self._tasks = set()
+        self.is_running = False
+        self.queue_latency = LatencyWindow(size=1000)
+        self.stats = {'sent': 0, 'failed': 0, 'retry_after': 0, 'queued': 0}
+
+    def submit(self, chat_id, factory, priority=PRIORITY_REPLY) -> asyncio.Future:
+        """
+        Queue factory() (a coroutine function performing one Bot API call)
+        for chat_id. Returns a future with the call's result; callers that
+        don't need the result can ignore it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._log_failure)
+        item = _Send(chat_id, factory, priority, next(self._sequence), future)
+        heapq.heappush(self._pending.setdefault(chat_id, []), item)
+        self.stats['queued'] += 1
+        self._wakeup.set()
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        # Retrieving the exception also keeps fire-and-forget sends from warning at GC
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Queued send failed: {future.exception()}")
+
+    async def send(self, chat_id, factory, priority=PRIORITY_REPLY):
+        """Queue a call and wait for its result"""
+        return await self.submit(chat_id, factory, priority)
+
+    def _bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10000:
+                # Idle chats' buckets would be full again anyway
+                self._chat_buckets = {cid: b for cid, b in self._chat_buckets.items() if cid in self._pending}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    def _next_ready(self):
+        """Best (priority, age) head among chats allowed to send now, or the shortest wait"""
+        now = time.monotonic()
+        best = None
+        wait = None
+        for chat_id, heap in self._pending.items():
+            ready_in = self._bucket(chat_id).ready_in(now)
+            if ready_in > 0:
+                wait = ready_in if wait is None else min(wait, ready_in)
+            elif best is None or heap[0] < best:
+                best = heap[0]
+        return best, wait
+
+    async def run(self):
+        """Dispatch queued sends until stopped"""
+        self.is_running = True
+        logger.info("Send queue started")
+        while self.is_running:
+            item, wait = self._next_ready()
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait if wait is not None else 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_wait = self.global_bucket.ready_in()
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                continue  # A higher-priority send may have arrived meanwhile
+
+            heap = self._pending[item.chat_id]
+            heapq.heappop(heap)
+            if not heap:
+                del self._pending[item.chat_id]
+            self.global_bucket.take()
+            self._bucket(item.chat_id).take()
+
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._dispatch(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, item):
+        try:
+            if item.attempts == 0:
+                self.queue_latency.record(time.monotonic() - item.enqueued_at)
+            item.attempts += 1
+            result = await item.factory()
+            self.stats['sent'] += 1
+            if not item.future.done():
+                item.future.set_result(result)
+
+        except RetryAfter as e:
+            self.stats['retry_after'] += 1
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning(f"Flood limit for chat {item.chat_id}, retrying after {retry_after}s")
+            self._bucket(item.chat_id).block(retry_after)
+            if item.attempts < self.max_attempts:
+                heapq.heappush(self._pending.setdefault(item.chat_id, []), item)
+                self._wakeup.set()
+            elif not item.future.done():
+                self.stats['failed'] += 1
+                item.future.set_exception(e)
+
+        except Exception as e:
+            self.stats['failed'] += 1
+            if not item.future.done():
+                item.future.set_exception(e)
+
+        finally:
+            self._in_flight.release()
+
+    def metrics(self):
+        """Queue depth, send counters and queue latency percentiles (seconds)"""
+        return {
+            'depth': sum(len(heap) for heap in self._pending.values()),
+            'chats_waiting': len(self._pending),
+            'queue_latency_p50': self.queue_latency.percentile(0.5),
+            'queue_latency_p95': self.queue_latency.percentile(0.95),
+            'queue_latency_p99': self.queue_latency.percentile(0.99),
+            **self.stats
+        }
+
+    async def stop(self):
+        self.is_running = False
+        self._wakeup.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Global send queue instance
+send_queue = SendQueue()
@@ -3,21 +3,29 @@
 Main entry point for the Telegram File Helper Bot
 """
 import asyncio
+import os
 import signal
 import sys
 import logging
 from config import Config
-from frontend.bot import frontend_bot
-from puppet.client import puppet_client
 from utils.logger import setup_logging, get_logger
+from utils.loop_watchdog import LoopWatchdog, install_event_loop_policy
+from utils.profiling import process_profiler
 
 logger = get_logger(__name__)
 
 class BotManager:
-    """Manager for both frontend and puppet bots"""
+    """Manager for the frontend and/or puppet bots of this process"""
     
-    def __init__(self):
+    def __init__(self, role=None):
+        # 'all' runs everything in one process; 'frontend'/'worker' are set by the supervisor
+        self.role = role or Config.PROCESS_ROLE
+        self.frontend_bot = None
+        self.puppet_client = None
         self.is_running = False
+        self.worker_task = None
+        self.watchdog = None
+        self.profile_task = None
         self.setup_signal_handlers()
     
     def setup_signal_handlers(self):
@@ -25,6 +33,10 @@ class BotManager:
         signals = [signal.SIGINT, signal.SIGTERM]
         for sig in signals:
             signal.signal(sig, self.handle_shutdown_signal)
+        
+        # `kill -USR1 <pid>` profiles any process, including supervised workers
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.handle_profile_signal)
     
     def handle_shutdown_signal(self, signum, frame):
         """Handle shutdown signals gracefully"""
@@ -32,18 +44,46 @@ class BotManager:
         self.is_running = False
         asyncio.create_task(self.shutdown())
     
+    def handle_profile_signal(self, signum, frame):
+        """Start a time-boxed profile of this process"""
+        logger.info(f"Received profiling signal {signum}")
+        self.profile_task = asyncio.create_task(
+            process_profiler.profile_for(Config.PROFILE_DEFAULT_SECONDS, label=f"{self.role}-{os.getpid()}")
+        )
+    
     async def startup(self):
         """Initialize and start all bot components"""
         try:
-            logger.info("Starting bot system...")
+            logger.info(f"Starting bot system (role: {self.role})...")
+            
+            if Config.LOOP_WATCHDOG_ENABLED:
+                self.watchdog = LoopWatchdog(
+                    Config.LOOP_LAG_INTERVAL, Config.LOOP_LAG_THRESHOLD, Config.LOOP_LAG_REPORT_INTERVAL
+                )
+                self.watchdog.start()
+            
+            # Bind the delivery bus to this loop before anything can publish
+            from database import event_bus
+            event_bus.start()
             
-            # Connect puppet client first
-            logger.info("Connecting puppet client...")
-            await puppet_client.connect()
+            if self.role in ('all', 'worker'):
+                from puppet.client import puppet_client
+                self.puppet_client = puppet_client
+                
+                # Connect puppet client first
+                logger.info("Connecting puppet client...")
+                await puppet_client.connect()
+                
+                # Start consuming queued search jobs
+                self.worker_task = asyncio.create_task(puppet_client.run_worker())
             
-            # Start frontend bot
-            logger.info("Starting frontend bot...")
-            await frontend_bot.run()
+            if self.role in ('all', 'frontend'):
+                from frontend.bot import frontend_bot
+                self.frontend_bot = frontend_bot
+                
+                # Start frontend bot
+                logger.info("Starting frontend bot...")
+                await frontend_bot.run()
             
             self.is_running = True
             logger.info("Bot system started successfully!")
@@ -63,13 +103,16 @@ class BotManager:
         try:
             logger.info("Shutting down bot system...")
             
+            if self.watchdog is not None:
+                self.watchdog.stop()
+            
             # Stop frontend bot
-            if hasattr(frontend_bot, 'stop'):
-                await frontend_bot.stop()
+            if self.frontend_bot is not None:
+                await self.frontend_bot.stop()
             
             # Disconnect puppet client
-            if hasattr(puppet_client, 'disconnect'):
-                await puppet_client.disconnect()
+            if self.puppet_client is not None:
+                await self.puppet_client.disconnect()
             
             logger.info("Bot system shutdown completed")
             
@@ -100,7 +143,19 @@ async def main():
     bot_manager = BotManager()
     await bot_manager.startup()
 
+def run_supervisor():
+    """Run the multi-process topology: one frontend and N puppet worker processes"""
+    from supervisor import Supervisor
+    Supervisor().run()
+
 if __name__ == "__main__":
+    if Config.PROCESS_MODE == 'multi' and Config.PROCESS_ROLE == 'all':
+        run_supervisor()
+        sys.exit(0)
+    
+    loop_name = install_event_loop_policy(Config.EVENT_LOOP)
+    logger.info(f"Using {loop_name} event loop")
+    
     try:
         # Run the main async function
         asyncio.run(main())
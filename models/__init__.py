@@ -1,9 +1,18 @@
 from .user_session import UserSession, SessionManager
 from .request_state import RequestState, RequestStateManager
+from .delivery_event import (
+    DeliveryEvent, FileReadyEvent, ErrorEvent, ProgressEvent, BatchCompleteEvent, ResultsRefreshedEvent
+)
 
 __all__ = [
     'UserSession',
     'SessionManager',
     'RequestState',
-    'RequestStateManager'
+    'RequestStateManager',
+    'DeliveryEvent',
+    'FileReadyEvent',
+    'ErrorEvent',
+    'ProgressEvent',
+    'BatchCompleteEvent',
+    'ResultsRefreshedEvent'
 ]
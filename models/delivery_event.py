@@ -0,0 +1,123 @@
+from typing import Dict, Any, List
+import base64
+import json
+
+
+class DeliveryEvent:
+    """Base class for puppet -> frontend delivery events"""
+
+    __slots__ = ('user_id', 'session_id')
+
+    kind = None
+    _registry = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        DeliveryEvent._registry[cls.kind] = cls
+
+    def __init__(self, user_id: int, session_id: str = None):
+        self.user_id = user_id
+        self.session_id = session_id
+
+    def __repr__(self):
+        return f"{type(self).__name__}(user_id={self.user_id!r}, session_id={self.session_id!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization"""
+        data = {'kind': self.kind}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                data[name] = getattr(self, name)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DeliveryEvent':
+        """Create the concrete event type named by data['kind']"""
+        data = dict(data)
+        event_cls = DeliveryEvent._registry[data.pop('kind')]
+        return event_cls(**data)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw) -> 'DeliveryEvent':
+        return cls.from_dict(json.loads(raw))
+
+
+class FileReadyEvent(DeliveryEvent):
+    """A backend file is ready to be delivered to the user"""
+
+    __slots__ = ('file_data', 'batch_total')
+    kind = 'file_ready'
+
+    def __init__(self, user_id: int, session_id: str = None, file_data: Dict[str, Any] = None,
+                 batch_total: int = None):
+        super().__init__(user_id, session_id)
+        self.file_data = file_data or {}
+        self.batch_total = batch_total  # Set for files of a "send all" batch
+
+
+class ErrorEvent(DeliveryEvent):
+    """The backend reported an error for the user's request"""
+
+    __slots__ = ('error_message', 'no_results')
+    kind = 'error'
+
+    def __init__(self, user_id: int, session_id: str = None, error_message: str = '', no_results: bool = False):
+        super().__init__(user_id, session_id)
+        self.error_message = error_message
+        self.no_results = no_results  # Backend has nothing for the query; safe to cache
+
+
+class ProgressEvent(DeliveryEvent):
+    """Intermediate status update for a pending request"""
+
+    __slots__ = ('text',)
+    kind = 'progress'
+
+    def __init__(self, user_id: int, session_id: str = None, text: str = ''):
+        super().__init__(user_id, session_id)
+        self.text = text
+
+
+class BatchCompleteEvent(DeliveryEvent):
+    """A "send all" batch finished; no more files will follow for it"""
+
+    __slots__ = ('delivered', 'total')
+    kind = 'batch_complete'
+
+    def __init__(self, user_id: int, session_id: str = None, delivered: int = 0, total: int = 0):
+        super().__init__(user_id, session_id)
+        self.delivered = delivered
+        self.total = total
+
+
+class ResultsRefreshedEvent(DeliveryEvent):
+    """Fresh result buttons for a cache-warming search (user_id is a negative pseudo id)"""
+
+    __slots__ = ('query', 'buttons_data', 'results_message_id', 'results_puppet')
+    kind = 'results_refreshed'
+
+    def __init__(self, user_id: int, session_id: str = None, query: str = '',
+                 buttons_data: List[Dict[str, Any]] = None, results_message_id: int = None,
+                 results_puppet: str = None):
+        super().__init__(user_id, session_id)
+        self.query = query
+        # Callback data is bytes; it travels base64-encoded under 'data_b64'
+        self.buttons_data = [
+            {**{k: v for k, v in button.items() if k != 'data_b64'}, 'data': base64.b64decode(button['data_b64'])}
+            if 'data_b64' in button else button
+            for button in buttons_data or []
+        ]
+        self.results_message_id = results_message_id
+        self.results_puppet = results_puppet  # Puppet session whose chat results_message_id belongs to
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data['buttons_data'] = [
+            {**{k: v for k, v in button.items() if k != 'data'}, 'data_b64': base64.b64encode(button['data']).decode('ascii')}
+            if isinstance(button.get('data'), bytes) else button
+            for button in self.buttons_data
+        ]
+        return data
@@ -1,36 +1,107 @@
-from dataclasses import dataclass, asdict
 from typing import Dict, Any
-from datetime import datetime
+import json
+import struct
+import time
+
+# Binary layout: version, status code, user_id, backend_message_id, timestamp
+_HEADER = struct.Struct('<BBqqd')
+_U16 = struct.Struct('<H')
+_FORMAT_VERSION = 1
+
+VALID_STATUSES = ('pending', 'processing', 'completed', 'failed')
+_STATUS_CODES = {status: code for code, status in enumerate(VALID_STATUSES)}
+
+
+def _pack_str(parts, value):
+    raw = value.encode('utf-8')
+    parts.append(_U16.pack(len(raw)))
+    parts.append(raw)
+
+
+def _unpack_str(data, offset):
+    (length,) = _U16.unpack_from(data, offset)
+    offset += _U16.size
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
 
-@dataclass
 class RequestState:
     """Request state tracking model"""
-    user_id: int
-    session_id: str
-    query: str
-    puppet_id: str
-    backend_message_id: int
-    timestamp: float
-    status: str = 'pending'  # pending, processing, completed, failed
+    
+    __slots__ = (
+        'user_id', 'session_id', 'query', 'puppet_id',
+        'backend_message_id', 'timestamp', 'status'
+    )
+    
+    def __init__(self, user_id: int, session_id: str, query: str, puppet_id: str,
+                 backend_message_id: int, timestamp: float, status: str = 'pending'):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.query = query
+        self.puppet_id = puppet_id
+        self.backend_message_id = backend_message_id
+        self.timestamp = timestamp  # epoch seconds
+        self.status = status
+    
+    def __repr__(self):
+        return (f"RequestState(user_id={self.user_id!r}, session_id={self.session_id!r}, "
+                f"backend_message_id={self.backend_message_id!r}, status={self.status!r})")
+    
+    def __eq__(self, other):
+        if not isinstance(other, RequestState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization"""
-        return asdict(self)
+        return {name: getattr(self, name) for name in self.__slots__}
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'RequestState':
         """Create from dictionary"""
-        return cls(**data)
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+    
+    def to_bytes(self) -> bytes:
+        """Compact binary encoding used by the storage layer"""
+        parts = [_HEADER.pack(
+            _FORMAT_VERSION, _STATUS_CODES[self.status], self.user_id,
+            self.backend_message_id, self.timestamp
+        )]
+        _pack_str(parts, self.session_id)
+        _pack_str(parts, self.query)
+        _pack_str(parts, self.puppet_id)
+        return b''.join(parts)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'RequestState':
+        """Decode output of to_bytes (legacy JSON payloads are accepted too)"""
+        if data[:1] == b'{':
+            return cls.from_dict(json.loads(data))
+        
+        version, status, user_id, backend_message_id, timestamp = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported request state format version {version}")
+        offset = _HEADER.size
+        session_id, offset = _unpack_str(data, offset)
+        query, offset = _unpack_str(data, offset)
+        puppet_id, offset = _unpack_str(data, offset)
+        
+        state = cls.__new__(cls)
+        state.user_id = user_id
+        state.session_id = session_id
+        state.query = query
+        state.puppet_id = puppet_id
+        state.backend_message_id = backend_message_id
+        state.timestamp = timestamp
+        state.status = VALID_STATUSES[status]
+        return state
     
     def is_expired(self, timeout_seconds: int = 300) -> bool:
         """Check if request has expired"""
-        current_time = datetime.now().timestamp()
-        return current_time - self.timestamp > timeout_seconds
+        return time.time() - self.timestamp > timeout_seconds
     
     def update_status(self, new_status: str):
         """Update request status"""
-        valid_statuses = ['pending', 'processing', 'completed', 'failed']
-        if new_status in valid_statuses:
+        if new_status in _STATUS_CODES:
             self.status = new_status
 
 class RequestStateManager:
@@ -46,7 +117,7 @@ class RequestStateManager:
             query=query,
             puppet_id=puppet_id,
             backend_message_id=backend_message_id,
-            timestamp=datetime.now().timestamp()
+            timestamp=time.time()
         )
     
     @staticmethod
@@ -61,4 +132,4 @@ class RequestStateManager:
         if state.timestamp <= 0:
             return False
         
-        return True
\ No newline at end of file
+        return True
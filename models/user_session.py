@@ -1,57 +1,207 @@
-from dataclasses import dataclass, asdict
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
+import secrets
+import struct
+import time
+
+# Binary layout: version, user_id, current_index, total_files, created_at, last_activity
+_HEADER = struct.Struct('<Bqiidd')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+# Per button: kind, same_peer, text length, payload length, extra length
+_BUTTON = struct.Struct('<BBHII')
+_FORMAT_VERSION = 1
+
+# Button kinds in the binary layout
+_BUTTON_DATA = 0
+_BUTTON_URL = 1
+_BUTTON_NONE = 2
+_BUTTON_KEYS = ('text', 'data', 'url', 'same_peer')
+
+
+def _to_epoch(value) -> float:
+    """Accept epoch floats as well as legacy datetime/ISO values"""
+    if value is None:
+        return time.time()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _pack_str(parts, value):
+    raw = value.encode('utf-8')
+    parts.append(_U16.pack(len(raw)))
+    parts.append(raw)
+
+
+def _unpack_str(data, offset):
+    (length,) = _U16.unpack_from(data, offset)
+    offset += _U16.size
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+
+def _pack_blob(parts, raw):
+    parts.append(_U32.pack(len(raw)))
+    parts.append(raw)
+
+
+def _unpack_blob(data, offset):
+    (length,) = _U32.unpack_from(data, offset)
+    offset += _U32.size
+    return data[offset:offset + length], offset + length
+
+
+def _pack_extra(parts, extra):
+    _pack_blob(parts, json.dumps(extra, separators=(',', ':')).encode('utf-8') if extra else b'')
+
+
+def _unpack_extra(data, offset):
+    raw, offset = _unpack_blob(data, offset)
+    return (json.loads(raw) if raw else {}), offset
+
 
-@dataclass
 class UserSession:
     """User session data model"""
-    user_id: int
-    original_query: str
-    current_index: int = 0
-    total_files: int = 0
-    buttons_data: List[Dict[str, Any]] = None
-    session_id: str = None
-    created_at: datetime = None
-    last_activity: datetime = None
     
-    def __post_init__(self):
-        if self.buttons_data is None:
-            self.buttons_data = []
-        if self.created_at is None:
-            self.created_at = datetime.now()
-        if self.last_activity is None:
-            self.last_activity = self.created_at
-        if self.session_id is None:
-            import uuid
-            self.session_id = str(uuid.uuid4())[:8]
+    __slots__ = (
+        'user_id', 'original_query', 'current_index', 'total_files',
+        'buttons_data', 'session_id', 'created_at', 'last_activity', 'extra'
+    )
+    
+    FIELDS = __slots__[:-1]
+    
+    def __init__(self, user_id: int, original_query: str, current_index: int = 0,
+                 total_files: int = 0, buttons_data: List[Dict[str, Any]] = None,
+                 session_id: str = None, created_at: float = None,
+                 last_activity: float = None, extra: Dict[str, Any] = None):
+        self.user_id = user_id
+        self.original_query = original_query
+        self.current_index = current_index
+        self.total_files = total_files
+        self.buttons_data = buttons_data if buttons_data is not None else []
+        self.session_id = session_id if session_id is not None else secrets.token_hex(4)
+        self.created_at = _to_epoch(created_at)
+        self.last_activity = _to_epoch(last_activity) if last_activity is not None else self.created_at
+        # Fields added by handlers that have no dedicated slot (None when empty)
+        self.extra = extra or None
+    
+    def __repr__(self):
+        return (f"UserSession(user_id={self.user_id!r}, session_id={self.session_id!r}, "
+                f"original_query={self.original_query!r}, current_index={self.current_index!r}, "
+                f"total_files={self.total_files!r})")
+    
+    def __eq__(self, other):
+        if not isinstance(other, UserSession):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization"""
-        data = asdict(self)
-        # Convert datetime objects to ISO format strings
-        data['created_at'] = self.created_at.isoformat()
-        data['last_activity'] = self.last_activity.isoformat()
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
         return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'UserSession':
-        """Create from dictionary"""
-        # Convert string dates back to datetime objects
-        if 'created_at' in data and isinstance(data['created_at'], str):
-            data['created_at'] = datetime.fromisoformat(data['created_at'])
-        if 'last_activity' in data and isinstance(data['last_activity'], str):
-            data['last_activity'] = datetime.fromisoformat(data['last_activity'])
+        """Create from dictionary (epoch floats or legacy ISO timestamps)"""
+        kwargs = {}
+        extra = {}
+        for key, value in data.items():
+            if key in cls.FIELDS:
+                kwargs[key] = value
+            else:
+                extra[key] = value
+        return cls(extra=extra, **kwargs)
+        
+    def to_bytes(self) -> bytes:
+        """Compact binary encoding used by the storage layer"""
+        parts = [_HEADER.pack(
+            _FORMAT_VERSION, self.user_id, self.current_index, self.total_files,
+            self.created_at, self.last_activity
+        )]
+        _pack_str(parts, self.session_id)
+        _pack_str(parts, self.original_query)
+        
+        parts.append(_U16.pack(len(self.buttons_data)))
+        for button in self.buttons_data:
+            if button.get('data') is not None:
+                kind, payload = _BUTTON_DATA, button['data']
+                if isinstance(payload, str):
+                    payload = payload.encode('utf-8')
+            elif button.get('url') is not None:
+                kind, payload = _BUTTON_URL, button['url'].encode('utf-8')
+            else:
+                kind, payload = _BUTTON_NONE, b''
+            text = button.get('text', '').encode('utf-8')
+            extra = {k: v for k, v in button.items() if k not in _BUTTON_KEYS}
+            extra = json.dumps(extra, separators=(',', ':')).encode('utf-8') if extra else b''
+            parts.append(_BUTTON.pack(kind, 1 if button.get('same_peer') else 0,
+                                      len(text), len(payload), len(extra)))
+            parts.append(text)
+            parts.append(payload)
+            parts.append(extra)
+        
+        _pack_extra(parts, self.extra)
+        return b''.join(parts)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'UserSession':
+        """Decode output of to_bytes (legacy JSON payloads are accepted too)"""
+        if data[:1] == b'{':
+            return cls.from_dict(json.loads(data))
+        
+        version, user_id, current_index, total_files, created_at, last_activity = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format version {version}")
+        offset = _HEADER.size
+        session_id, offset = _unpack_str(data, offset)
+        original_query, offset = _unpack_str(data, offset)
+        
+        (count,) = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        buttons = []
+        unpack_button = _BUTTON.unpack_from
+        for _ in range(count):
+            kind, same_peer, text_len, payload_len, extra_len = unpack_button(data, offset)
+            offset += _BUTTON.size
+            button = {'text': data[offset:offset + text_len].decode('utf-8')}
+            offset += text_len
+            if kind == _BUTTON_DATA:
+                button['data'] = data[offset:offset + payload_len]
+            elif kind == _BUTTON_URL:
+                button['url'] = data[offset:offset + payload_len].decode('utf-8')
+            offset += payload_len
+            button['same_peer'] = bool(same_peer)
+            if extra_len:
+                button.update(json.loads(data[offset:offset + extra_len]))
+                offset += extra_len
+            buttons.append(button)
+        
+        extra, offset = _unpack_extra(data, offset)
         
-        return cls(**data)
+        session = cls.__new__(cls)
+        session.user_id = user_id
+        session.original_query = original_query
+        session.current_index = current_index
+        session.total_files = total_files
+        session.buttons_data = buttons
+        session.session_id = session_id
+        session.created_at = created_at
+        session.last_activity = last_activity
+        session.extra = extra or None
+        return session
     
     def update_activity(self):
         """Update last activity timestamp"""
-        self.last_activity = datetime.now()
+        self.last_activity = time.time()
     
     def is_expired(self, timeout_minutes: int = 5) -> bool:
         """Check if session has expired"""
-        return datetime.now() - self.last_activity > timedelta(minutes=timeout_minutes)
+        return time.time() - self.last_activity > timeout_minutes * 60
     
     def get_next_button_data(self) -> Optional[Dict[str, Any]]:
         """Get next button data if available"""
@@ -87,4 +237,4 @@ class SessionManager:
         if session.current_index >= session.total_files > 0:
             return False
         
-        return True
\ No newline at end of file
+        return True
@@ -1,9 +1,12 @@
-from telethon import TelegramClient
+from telethon import TelegramClient, events, types
+from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.types import Message
 import logging
 import asyncio
+from utils.hot_log import get_hot_logger
 
 logger = logging.getLogger(__name__)
+hot_log = get_hot_logger(__name__)
 
 async def click_button(client, message, button_data):
     """Click a button on a message"""
@@ -14,7 +17,7 @@ async def click_button(client, message, button_data):
                 message=message.id,
                 data=button_data['data']
             )
-            logger.info(f"Clicked button: {button_data['text']}")
+            hot_log.info('button_clicked', message_id=message.id, text=button_data['text'])
             return True
         
         elif 'url' in button_data:
@@ -30,25 +33,50 @@ async def click_button(client, message, button_data):
         logger.error(f"Error clicking button: {e}")
         return False
 
-async def join_channel(client, channel_username):
-    """Join a channel"""
+async def join_channel(client, channel_username, entities=None, confirm_timeout=5.0):
+    """Join a channel, returning as soon as the membership is confirmed"""
     try:
         if not channel_username:
             logger.error("No channel username provided")
             return False
         
-        entity = await client.get_entity(channel_username)
-        await client.join_channel(entity)
-        logger.info(f"Joined channel: {channel_username}")
+        entity = entities.get(channel_username) if entities is not None else None
+        if entity is None:
+            entity = await client.get_entity(channel_username)
+            if entities is not None:
+                entities.put(channel_username, entity)
+        
+        joined = asyncio.get_running_loop().create_future()
+        
+        async def on_channel_update(update):
+            if getattr(update, 'channel_id', None) == entity.id and not joined.done():
+                joined.set_result(True)
+        
+        client.add_event_handler(on_channel_update, events.Raw(types.UpdateChannel))
+        try:
+            result = await client(JoinChannelRequest(entity))
+            # The join's own result usually already carries the channel with us in it
+            if not _membership_confirmed(result, entity.id):
+                await asyncio.wait_for(joined, timeout=confirm_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"No membership update for {channel_username} after {confirm_timeout}s, continuing")
+        finally:
+            client.remove_event_handler(on_channel_update)
         
-        # Wait a moment for the join to process
-        await asyncio.sleep(2)
+        logger.info(f"Joined channel: {channel_username}")
         return True
         
     except Exception as e:
         logger.error(f"Error joining channel {channel_username}: {e}")
         return False
 
+def _membership_confirmed(result, channel_id):
+    """Whether a JoinChannelRequest result shows the account as a member"""
+    for chat in getattr(result, 'chats', None) or ():
+        if chat.id == channel_id and not getattr(chat, 'left', True):
+            return True
+    return False
+
 async def resend_original_request(client, backend_bot_username, original_query):
     """Resend original search request"""
     try:
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRun:
+    """
+    One "send all" run: at most `concurrency` clicks are waiting for their
+    file at a time. Each file that arrives for the session frees a slot.
+    """
+
+    def __init__(self, user_id, session_id, total, concurrency=4):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.total = total
+        self.received = 0
+        self.failed = 0
+        self.written_off = 0  # Clicks given up on by acquire(); their slots were handed on
+        self.slots = asyncio.Semaphore(concurrency)
+        self.finished = asyncio.Event()
+
+    def _check_finished(self):
+        if self.received + self.failed >= self.total:
+            self.finished.set()
+
+    def on_file(self):
+        """A file for this batch arrived"""
+        self.received += 1
+        if self.written_off:
+            # Late file of a written-off click: its slot is already in use and its failure counted
+            self.written_off -= 1
+            self.failed -= 1
+        else:
+            self.slots.release()
+        self._check_finished()
+
+    def on_failure(self, release=True):
+        """A click failed (release) or its file never came (slot already written off)"""
+        self.failed += 1
+        if release:
+            self.slots.release()
+        self._check_finished()
+
+    async def acquire(self, timeout):
+        """Wait for a free click slot; on timeout, write off one outstanding click and return False"""
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Batch for user {self.user_id}: a file did not arrive within {timeout:.1f}s")
+            self.written_off += 1
+            self.on_failure(release=False)
+            return False
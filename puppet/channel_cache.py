@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _channel_key(channel: str) -> str:
+    return channel.lstrip('@').lower()
+
+
+class EntityCache:
+    """In-memory cache of resolved channel entities, so repeat joins skip get_entity"""
+
+    def __init__(self, ttl: float = 24 * 3600, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entities = {}  # channel key -> (entity, expires_at)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, channel: str) -> Optional[Any]:
+        entry = self._entities.get(_channel_key(channel))
+        if entry is None or entry[1] < time.monotonic():
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def put(self, channel: str, entity: Any):
+        if len(self._entities) >= self.max_entries:
+            now = time.monotonic()
+            self._entities = {k: v for k, v in self._entities.items() if v[1] >= now}
+            if len(self._entities) >= self.max_entries:
+                self._entities.pop(next(iter(self._entities)))
+        self._entities[_channel_key(channel)] = (entity, time.monotonic() + self.ttl)
+
+
+class MembershipCache:
+    """
+    Channels this puppet account has joined, persisted per session with a
+    TTL. A cached membership skips the join; if the backend asks to join
+    the same channel again shortly after we trusted the cache, the entry
+    is treated as stale and the caller joins for real.
+    """
+
+    def __init__(self, path=None, ttl: float = None, recheck_window: float = None):
+        self.path = Path(path or Path(Config.MEMBERSHIP_CACHE_DIR) / f"memberships_{Config.PUPPET_SESSION_NAME}.json")
+        self.ttl = ttl or Config.MEMBERSHIP_TTL
+        self.recheck_window = recheck_window or Config.MEMBERSHIP_RECHECK_WINDOW
+        self._channels = {}  # channel key -> {'joined_at', 'expires_at', 'trusted_at'}
+        self.stats = {'hits': 0, 'misses': 0, 'rejoins': 0}
+        self._load()
+
+    def __len__(self):
+        return len(self._channels)
+
+    def should_join(self, channel: str) -> bool:
+        """Whether a join prompt for this channel needs a real join"""
+        key = _channel_key(channel)
+        entry = self._channels.get(key)
+        now = time.time()
+        if entry is None or entry['expires_at'] < now:
+            self.stats['misses'] += 1
+            return True
+
+        trusted_at = entry.get('trusted_at')
+        if trusted_at and now - trusted_at < self.recheck_window:
+            # The backend still says we're not a member: left, kicked or expired
+            self.stats['rejoins'] += 1
+            self.forget(channel)
+            return True
+
+        entry['trusted_at'] = now
+        self.stats['hits'] += 1
+        return False
+
+    def record_join(self, channel: str):
+        now = time.time()
+        self._channels[_channel_key(channel)] = {'joined_at': now, 'expires_at': now + self.ttl, 'trusted_at': None}
+        self._save()
+
+    def forget(self, channel: str):
+        if self._channels.pop(_channel_key(channel), None) is not None:
+            self._save()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                with open(self.path, encoding='utf-8') as f:
+                    now = time.time()
+                    self._channels = {k: v for k, v in json.load(f).items() if v['expires_at'] >= now}
+                logger.info(f"Loaded {len(self._channels)} cached channel memberships")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading membership cache: {e}")
+
+    def _save(self):
+        """Atomically rewrite the cache file (small, and only changes on joins)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._channels, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error saving membership cache: {e}")
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PuppetCheckpoint:
+    """
+    Restart state of one puppet session, persisted to a small JSON file:
+    the backend message id up to which everything has been handled, the
+    ids handled out of order above it, and the search requests still
+    waiting for a backend answer (their request state and work-queue job
+    id). Saves are throttled; disconnect forces one.
+    """
+
+    def __init__(self, path=None, save_interval: float = None, max_age: float = None):
+        self.path = Path(path or Path(Config.CHECKPOINT_DIR) / f"checkpoint_{Config.PUPPET_SESSION_NAME}.json")
+        self.save_interval = Config.CHECKPOINT_INTERVAL if save_interval is None else save_interval
+        self.max_age = max_age or Config.SESSION_TIMEOUT
+        self.last_message_id = 0
+        self.outstanding: Dict[int, Dict[str, Any]] = {}  # backend message id -> {'state', 'job_id', 'sent_at'}
+        self._recent = deque(maxlen=1000)  # Recently dispatched ids; catch-up and live updates overlap
+        self._recent_set = set()
+        self._in_flight = set()   # Dispatched, not yet handled: last_message_id stays below these
+        self._handled = set()     # Handled ids above last_message_id
+        self._catching_up = False  # Live updates may be handled before older missed messages are fetched
+        self._dirty = False
+        self._saved_at = 0.0
+        self.load()
+
+    def seen(self, message_id: int) -> bool:
+        """Mark a backend message as dispatched; False if it already was"""
+        if message_id in self._recent_set or message_id in self._handled or message_id <= self.last_message_id:
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(message_id)
+        self._recent_set.add(message_id)
+        self._in_flight.add(message_id)
+        return True
+
+    def handled(self, message_id: int):
+        """
+        Mark a dispatched message as handled (or dropped). last_message_id only
+        moves past messages that are all handled, so a restart replays the rest.
+        """
+        if message_id not in self._in_flight:
+            return
+        self._in_flight.discard(message_id)
+        self._handled.add(message_id)
+        self._advance()
+        self._mark_dirty()
+
+    def begin_catchup(self):
+        """Hold last_message_id while missed messages are fetched; handled ids are still recorded"""
+        self._catching_up = True
+
+    def end_catchup(self):
+        """Every missed message has been dispatched: the watermark may move again"""
+        self._catching_up = False
+        if self._advance():
+            self._mark_dirty()
+
+    def _advance(self) -> bool:
+        if self._catching_up or not self._handled:
+            return False
+        watermark = min(self._in_flight) - 1 if self._in_flight else max(self._handled)
+        if watermark <= self.last_message_id:
+            return False
+        self.last_message_id = watermark
+        self._handled = {handled_id for handled_id in self._handled if handled_id > watermark}
+        return True
+
+    def add_outstanding(self, message_id: int, state: Dict[str, Any], job_id: Optional[str] = None):
+        self.outstanding[message_id] = {'state': state, 'job_id': job_id, 'sent_at': time.time()}
+        self._mark_dirty()
+
+    def resolve(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Drop an answered (or abandoned) request; returns its entry"""
+        entry = self.outstanding.pop(message_id, None)
+        if entry is not None:
+            self._mark_dirty()
+        return entry
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def load(self):
+        try:
+            if not self.path.exists():
+                return
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.last_message_id = data.get('last_message_id', 0)
+            self._handled = set(data.get('handled', []))
+            cutoff = time.time() - self.max_age
+            self.outstanding = {
+                int(message_id): entry for message_id, entry in data.get('outstanding', {}).items()
+                if entry['sent_at'] >= cutoff
+            }
+            logger.info(
+                f"Loaded puppet checkpoint: last message {self.last_message_id}, "
+                f"{len(self.outstanding)} outstanding requests"
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading puppet checkpoint: {e}")
+
+    def save(self, force=False):
+        """Atomically write the checkpoint if it changed"""
+        if not (self._dirty or force):
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'last_message_id': self.last_message_id,
+                    'handled': sorted(self._handled),
+                    'outstanding': self.outstanding
+                }, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logger.error(f"Error saving puppet checkpoint: {e}")
@@ -2,16 +2,51 @@ from telethon import TelegramClient, events, types
 from telethon.tl.types import Message
 import logging
 import asyncio
+import time
+from collections import OrderedDict, deque
 from config import Config
 from .message_parser import parse_message, extract_buttons, detect_error
 from .actions import click_button, join_channel
-from database import redis_client
-from frontend.handlers import send_file_to_user
+from .retry_policy import RetryPolicy, RetryBudget, ReplyWaiter
+from .channel_cache import MembershipCache, EntityCache
+from .generations import RequestGenerations
+from .batch import BatchRun
+from .checkpoint import PuppetCheckpoint
+from .traffic import TrafficRecorder
+from .downloader import ParallelDownloader
+from database import redis_client, work_queue, event_bus
+from database.blob_cache import blob_cache
+from models import (
+    RequestStateManager, FileReadyEvent, ErrorEvent, ProgressEvent, BatchCompleteEvent, ResultsRefreshedEvent
+)
 from utils.helpers import generate_session_id
+from utils.profiling import profiled
+from utils.metrics import AdaptiveTimeout
+from utils.dispatcher import SessionDispatcher
+from utils.hot_log import get_hot_logger
 
 logger = logging.getLogger(__name__)
+hot_log = get_hot_logger(__name__)
+
+def _is_warming(user_id):
+    """Cache-warming searches (frontend.cache_warmer) run under negative pseudo user ids"""
+    return int(user_id) < 0
+
+def _stage_timeout(default):
+    """Adaptive timeout for one pipeline stage, starting from its static default"""
+    return AdaptiveTimeout(
+        default,
+        quantile=Config.ADAPTIVE_TIMEOUT_QUANTILE,
+        factor=Config.ADAPTIVE_TIMEOUT_FACTOR,
+        floor=Config.ADAPTIVE_TIMEOUT_FLOOR,
+        ceiling=Config.ADAPTIVE_TIMEOUT_CEILING,
+        min_samples=Config.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+    )
 
 class PuppetClient:
+    # Backend reply types that settle a pending search request
+    ANSWER_TYPES = ('buttons', 'join_request', 'error', 'file')
+    
     def __init__(self):
         self.client = TelegramClient(
             Config.PUPPET_SESSION_NAME,
@@ -20,50 +55,164 @@ class PuppetClient:
         )
         self.backend_bot_username = Config.BACKEND_BOT_USERNAME
         self.is_connected = False
+        self.replies = ReplyWaiter()
+        self.search_policy = RetryPolicy(
+            'search',
+            base_timeout=Config.SEARCH_TIMEOUT,
+            max_attempts=Config.SEARCH_MAX_ATTEMPTS,
+            hedge=Config.SEARCH_HEDGE_ENABLED,
+            hedge_quantile=Config.SEARCH_HEDGE_QUANTILE,
+            budget=RetryBudget(ratio=Config.RETRY_BUDGET_RATIO),
+            timeouts=_stage_timeout(Config.SEARCH_TIMEOUT),
+            max_timeout=Config.ADAPTIVE_TIMEOUT_CEILING
+        )
+        self.click_policy = RetryPolicy(
+            'click',
+            base_timeout=Config.SEARCH_TIMEOUT,
+            max_attempts=Config.CLICK_MAX_ATTEMPTS,
+            budget=RetryBudget(ratio=Config.RETRY_BUDGET_RATIO),
+            timeouts=_stage_timeout(Config.SEARCH_TIMEOUT),
+            max_timeout=Config.ADAPTIVE_TIMEOUT_CEILING
+        )
+        self.file_timeout = _stage_timeout(Config.BATCH_FILE_TIMEOUT)  # Click -> file arrival
+        self.join_timeout = _stage_timeout(Config.JOIN_CONFIRM_TIMEOUT)
+        self._click_times = OrderedDict()  # (user_id, session_id) -> click times awaiting their file
+        self.memberships = MembershipCache()
+        self.entities = EntityCache()
+        self._joins = {}  # channel -> in-flight join task
+        self.generations = RequestGenerations()
+        self._batches = {}  # (user_id, session_id) -> BatchRun
+        # (user_id, session_id) -> ('next', index) / ('all', start): follow-ups re-searched on this account
+        self._follow_ups = OrderedDict()
+        self.checkpoint = PuppetCheckpoint()
+        self.recorder = TrafficRecorder(Config.TRAFFIC_RECORD_PATH)
+        self.downloader = ParallelDownloader(self.client)
+        self.dispatcher = SessionDispatcher(
+            self._handle_backend_event, Config.DISPATCH_WORKERS, Config.DISPATCH_MAX_PENDING, name='backend dispatcher'
+        )
+        self._restored = {}  # backend message id -> job id of requests recovered from the checkpoint
+        self._background_tasks = set()
         self.setup_handlers()
     
     def setup_handlers(self):
         """Setup event handlers for the puppet client"""
         
         @self.client.on(events.NewMessage(from_users=self.backend_bot_username))
+        @profiled('puppet.handle_backend_message')
         async def handle_backend_message(event):
             """Handle messages from the backend bot"""
-            try:
-                message = event.message
-                logger.info(f"Received message from backend: {message.text}")
-                
-                # Parse the message to determine action
-                message_type, data = parse_message(message)
-                
-                if message_type == 'buttons':
-                    # Store buttons for user session and click first one
-                    user_id, session_id = await self._get_request_context(message)
-                    if user_id and session_id:
-                        await self._handle_buttons(message, user_id, session_id, data)
-                
-                elif message_type == 'join_request':
-                    # Handle join channel request
-                    success = await join_channel(self.client, data['channel'])
-                    if success:
-                        # Resend original request
-                        user_id, session_id = await self._get_request_context(message)
-                        if user_id and session_id:
-                            await self.resend_search_request(user_id, session_id)
-                
-                elif message_type == 'error':
-                    # Forward error to frontend
-                    user_id, session_id = await self._get_request_context(message)
-                    if user_id and session_id:
-                        await self._forward_error_to_frontend(user_id, data['error_message'])
-                
-                elif message_type == 'file':
-                    # Forward file to frontend
-                    user_id, session_id = await self._get_request_context(message)
-                    if user_id and session_id:
-                        await self._forward_file_to_frontend(user_id, session_id, data)
-                
-            except Exception as e:
-                logger.error(f"Error handling backend message: {e}")
+            self.recorder.record(event.message)
+            await self._dispatch_backend_message(event.message)
+    
+    async def _dispatch_backend_message(self, message):
+        """Parse one backend message and queue it behind its session's earlier messages (live and catch-up)"""
+        if not self.checkpoint.seen(message.id):
+            return  # Already handled, e.g. delivered live while catching up
+        try:
+            # Parse the message to determine action
+            message_type, data = parse_message(message)
+            key = self._session_key(message)
+            hot_log.info(
+                # Keys of messages without a known session are (kind, message id)
+                'backend_message', session=key[1] if isinstance(key[1], str) else None,
+                id=message.id, type=message_type, text=message.text
+            )
+            
+            # First valid answer wins; replies to retried/hedged duplicates are dropped.
+            # Claimed here rather than on a worker: a session's worker may itself be waiting on this reply.
+            if message_type in self.ANSWER_TYPES and not self.replies.claim(message.reply_to_msg_id, message):
+                hot_log.info('superseded_reply_discarded', reply_to=message.reply_to_msg_id)
+                self.checkpoint.handled(message.id)  # Dropped: nothing left to replay
+                return
+            
+            await self.dispatcher.submit(key, (message, message_type, data))
+        
+        except Exception as e:
+            logger.error(f"Error dispatching backend message: {e}")
+            self.checkpoint.handled(message.id)
+    
+    def _session_key(self, message):
+        """Ordering key: the search session a reply belongs to, else the message itself"""
+        if message.reply_to_msg_id:
+            state = redis_client.get_request_state(Config.PUPPET_SESSION_NAME, message.reply_to_msg_id)
+            if state:
+                return (state['user_id'], state['session_id'])
+            return ('reply', message.reply_to_msg_id)
+        return ('message', message.id)
+    
+    @profiled('puppet.handle_backend_event')
+    async def _handle_backend_event(self, event):
+        """Act on one parsed backend message (runs on a dispatcher worker)"""
+        message, message_type, data = event
+        try:
+            if message_type == 'buttons':
+                # Store buttons for user session and click first one
+                user_id, session_id = await self._current_context(message)
+                if user_id and session_id:
+                    await self._handle_buttons(message, user_id, session_id, data)
+            
+            elif message_type == 'join_request':
+                # Handle join channel request
+                success = await self._ensure_joined(data['channel'])
+                if success:
+                    # Resend original request
+                    user_id, session_id = await self._current_context(message)
+                    if user_id and session_id and self._still_current(user_id, session_id):
+                        self._forward_progress_to_frontend(
+                            user_id, "🔐 Joined a required channel, repeating your search...", session_id
+                        )
+                        await self.resend_search_request(user_id, session_id)
+            
+            elif message_type == 'error':
+                # Forward error to frontend
+                user_id, session_id = await self._current_context(message)
+                if user_id and session_id:
+                    self._forward_error_to_frontend(
+                        user_id, data['error_message'], session_id, no_results=data.get('no_results', False)
+                    )
+            
+            elif message_type == 'file':
+                # Forward file to frontend
+                user_id, session_id = await self._current_context(message)
+                if user_id and session_id:
+                    self._file_arrived(user_id, session_id)
+                    await self._relay_media(message, data)
+                    batch = self._batches.get((user_id, session_id))
+                    self._forward_file_to_frontend(
+                        user_id, session_id, data, batch_total=batch.total if batch else None
+                    )
+                    if batch:
+                        batch.on_file()
+            
+        except Exception as e:
+            logger.error(f"Error handling backend message: {e}")
+        
+        # Not on cancellation (shutdown): unhandled messages are replayed after the restart
+        if message_type in self.ANSWER_TYPES:
+            self._resolve_restored(message.reply_to_msg_id)
+        self.checkpoint.handled(message.id)
+    
+    async def _relay_media(self, message, file_data):
+        """Download a backend file into the blob cache (once) so the frontend can re-upload it"""
+        file_id = file_data.get('file_id')
+        if not Config.RELAY_MEDIA_ENABLED or not file_id or file_data.get('file_size', 0) > Config.RELAY_MAX_FILE_SIZE:
+            return
+        try:
+            if file_id not in blob_cache:
+                with blob_cache.writer(file_id) as blob:
+                    await self.downloader.download(message, blob)
+            file_data['blob'] = str(file_id)
+        except Exception as e:
+            logger.error(f"Error relaying file {file_id}: {e}")
+    
+    def _resolve_restored(self, message_id):
+        """An answer for a request recovered from the checkpoint completes its job"""
+        if message_id is None or message_id not in self._restored:
+            return
+        job_id = self._restored.pop(message_id)
+        self.checkpoint.resolve(message_id)
+        if job_id:
+            work_queue.ack(job_id)
     
     async def _get_request_context(self, message):
         """Get user_id and session_id from message context"""
@@ -88,69 +237,176 @@ class PuppetClient:
             logger.error(f"Error getting request context: {e}")
             return None, None
     
+    async def _current_context(self, message):
+        """Request context of a backend reply, or (None, None) if its session was superseded"""
+        user_id, session_id = await self._get_request_context(message)
+        if user_id and not self.generations.is_current(user_id, session_id):
+            self.generations.stats['dropped'] += 1
+            hot_log.info('stale_reply_dropped', session=session_id, user=user_id)
+            return None, None
+        return user_id, session_id
+    
+    def _still_current(self, user_id, session_id):
+        """Check the shared session too, for newer searches handled by other workers"""
+        if not self.generations.is_current(user_id, session_id):
+            return False
+        session_data = redis_client.get_user_session(user_id)
+        if session_data and session_data.get('session_id') != session_id:
+            self.generations.advance(user_id, session_data['session_id'])
+            return False
+        return True
+    
     async def _handle_buttons(self, message, user_id, session_id, buttons_data):
         """Handle message with buttons"""
+        if _is_warming(user_id):
+            self._forward_refreshed_results(message, user_id, session_id, buttons_data)
+            return
         try:
             # Store buttons in user session
             session_data = redis_client.get_user_session(user_id)
+            if session_data and session_data.get('session_id') != session_id:
+                # A newer search replaced this one: don't click for it
+                self.generations.advance(user_id, session_data['session_id'])
+                return
             if session_data:
                 session_data['buttons_data'] = buttons_data
                 session_data['total_files'] = len(buttons_data)
+                session_data['results_message_id'] = message.id
+                # Message ids are per account: only this puppet can click on it
+                session_data['results_puppet'] = Config.PUPPET_SESSION_NAME
                 redis_client.set_user_session(user_id, session_data)
             
-            # Click the first button
+            action, index = self._follow_ups.pop((user_id, session_id), ('next', 0))
+            if action == 'all':
+                self.send_all_files(user_id, session_id, index)
+                return
+            
+            # Click the first button (or the one a re-searched "next" asked for)
             if buttons_data:
-                success = await click_button(self.client, message, buttons_data[0])
-                if not success:
-                    await self._forward_error_to_frontend(user_id, "Failed to process request")
+                button = buttons_data[index] if index < len(buttons_data) else buttons_data[0]
+                success = await self.click_policy.execute(
+                    lambda attempt_no: self._click_attempt(message, button)
+                )
+                if success:
+                    self._clicked(user_id, session_id)
+                else:
+                    self._forward_error_to_frontend(user_id, "Failed to process request", session_id)
         
         except Exception as e:
             logger.error(f"Error handling buttons: {e}")
-            await self._forward_error_to_frontend(user_id, f"Processing error: {str(e)}")
+            self._forward_error_to_frontend(user_id, f"Processing error: {str(e)}", session_id)
+    
+    async def _ensure_joined(self, channel):
+        """Join a channel unless cached as joined; concurrent prompts share one join"""
+        if not channel:
+            return await join_channel(self.client, channel)
+        if not self.memberships.should_join(channel):
+            logger.info(f"Already a member of {channel}, skipping join")
+            return True
+        
+        key = channel.lower()
+        task = self._joins.get(key)
+        if task is None:
+            task = asyncio.create_task(self._timed_join(channel))
+            self._joins[key] = task
+            task.add_done_callback(lambda _: self._joins.pop(key, None))
+        success = await asyncio.shield(task)
+        if success:
+            self.memberships.record_join(channel)
+        return success
+    
+    def _clicked(self, user_id, session_id):
+        """Start the click -> file clock for a successful click"""
+        key = (user_id, session_id)
+        times = self._click_times.pop(key, None) or deque(maxlen=50)
+        times.append(time.monotonic())
+        self._click_times[key] = times
+        while len(self._click_times) > 1000:
+            self._click_times.popitem(last=False)  # Sessions whose files never came
     
-    async def _forward_error_to_frontend(self, user_id, error_message):
-        """Forward error message to frontend bot"""
+    def _file_arrived(self, user_id, session_id):
+        """A file arrived: sample the latency of the oldest click still waiting"""
+        times = self._click_times.get((user_id, session_id))
+        if times:
+            self.file_timeout.record(time.monotonic() - times.popleft())
+            if not times:
+                del self._click_times[(user_id, session_id)]
+    
+    def _file_timed_out(self, user_id, session_id, waited):
+        times = self._click_times.get((user_id, session_id))
+        if times:
+            times.popleft()
+        self.file_timeout.record_timeout(waited)
+    
+    def timeout_metrics(self):
+        """Learned per-stage timeouts and the latency estimates behind them"""
+        return {
+            'search': self.search_policy.timeouts.metrics(),
+            'click': self.click_policy.timeouts.metrics(),
+            'click_to_file': self.file_timeout.metrics(),
+            'join': self.join_timeout.metrics(),
+        }
+    
+    async def _timed_join(self, channel):
+        """Join with the learned confirmation timeout, feeding the join latency back"""
+        confirm_timeout = self.join_timeout.current()
+        started = time.monotonic()
+        success = await join_channel(self.client, channel, self.entities, confirm_timeout)
+        elapsed = time.monotonic() - started
+        if success:
+            if elapsed >= confirm_timeout:
+                self.join_timeout.record_timeout(confirm_timeout)
+            else:
+                self.join_timeout.record(elapsed)
+        return success
+    
+    async def _click_attempt(self, message, button_data):
+        """Single click attempt; None marks it as failed for the retry policy"""
+        return True if await click_button(self.client, message, button_data) else None
+    
+    def _forward_refreshed_results(self, message, user_id, session_id, buttons_data):
+        """Hand a warming search's result list to the frontend cache instead of clicking it"""
+        state = redis_client.get_request_state(Config.PUPPET_SESSION_NAME, message.reply_to_msg_id)
         try:
-            from main import application
-            error_text = (
-                "❌ Error occurred while processing your request:\n\n"
-                f"{error_message}\n\n"
-                "Please check the spelling or try a different search term."
-            )
-            
-            await application.bot.send_message(
-                chat_id=user_id,
-                text=error_text
-            )
-            
+            event_bus.publish(ResultsRefreshedEvent(
+                user_id, session_id, state['query'] if state else '', buttons_data,
+                message.id, Config.PUPPET_SESSION_NAME
+            ))
+        except Exception as e:
+            logger.error(f"Error forwarding refreshed results to frontend: {e}")
+    
+    def _forward_error_to_frontend(self, user_id, error_message, session_id=None, no_results=False):
+        """Publish an error event for the frontend to deliver"""
+        if _is_warming(user_id):
+            # Nobody to tell; the cached entry simply isn't refreshed
+            hot_log.info('warm_search_failed', session=session_id, error=error_message)
+            return
+        try:
+            event_bus.publish(ErrorEvent(user_id, session_id, error_message, no_results))
         except Exception as e:
             logger.error(f"Error forwarding error to frontend: {e}")
     
-    async def _forward_file_to_frontend(self, user_id, session_id, file_data):
-        """Forward received file to frontend"""
+    def _forward_progress_to_frontend(self, user_id, text, session_id=None):
+        """Publish a progress event for the frontend to deliver"""
+        if _is_warming(user_id):
+            return
         try:
-            from main import application
-            
-            # Get user session
-            session_data = redis_client.get_user_session(user_id)
-            if not session_data:
-                logger.error(f"No session found for user {user_id}")
-                return
-            
-            # Update context for sending file
-            context = type('obj', (object,), {
-                'bot': application.bot
-            })
-            
-            # Send file to user
-            await send_file_to_user(user_id, file_data, session_data)
-            
+            event_bus.publish(ProgressEvent(user_id, session_id, text))
+        except Exception as e:
+            logger.error(f"Error forwarding progress to frontend: {e}")
+    
+    def _forward_file_to_frontend(self, user_id, session_id, file_data, batch_total=None):
+        """Publish a file-ready event for the frontend to deliver"""
+        try:
+            event_bus.publish(FileReadyEvent(user_id, session_id, file_data, batch_total))
         except Exception as e:
             logger.error(f"Error forwarding file to frontend: {e}")
-            await self._forward_error_to_frontend(user_id, "Failed to deliver file")
     
     async def connect(self):
         """Connect to Telegram"""
+        # Live updates can arrive as soon as the client starts; they must not move the
+        # watermark past missed messages that catch-up has not fetched yet
+        self.checkpoint.begin_catchup()
         try:
             await self.client.start(phone=Config.PUPPET_PHONE_NUMBER)
             self.is_connected = True
@@ -162,49 +418,220 @@ class PuppetClient:
                 logger.info(f"Backend bot {self.backend_bot_username} is accessible")
             except Exception as e:
                 logger.warning(f"Backend bot might not be accessible: {e}")
+            
+            await self._recover()
                 
         except Exception as e:
             logger.error(f"Failed to connect puppet client: {e}")
             raise
+        finally:
+            self.checkpoint.end_catchup()
+    
+    async def _recover(self):
+        """Warm restart: restore outstanding requests, then replay missed backend messages"""
+        for message_id, entry in self.checkpoint.outstanding.items():
+            # The request state may be gone (in-memory storage, or expired)
+            if not redis_client.get_request_state(Config.PUPPET_SESSION_NAME, message_id):
+                redis_client.set_request_state(Config.PUPPET_SESSION_NAME, message_id, entry['state'])
+            self._restored[message_id] = entry.get('job_id')
+        
+        last_message_id = self.checkpoint.last_message_id
+        if not last_message_id:
+            return  # First start: nothing was missed
+        
+        replayed = 0
+        try:
+            async for message in self.client.iter_messages(
+                self.backend_bot_username, min_id=last_message_id, reverse=True, limit=Config.CATCHUP_LIMIT
+            ):
+                if message.out:
+                    continue
+                await self._dispatch_backend_message(message)
+                replayed += 1
+        except Exception as e:
+            logger.error(f"Error catching up on backend messages: {e}")
+        logger.info(
+            f"Caught up on {replayed} backend messages after {last_message_id}; "
+            f"{len(self._restored)} restored requests still waiting for an answer"
+        )
     
     async def disconnect(self):
         """Disconnect from Telegram"""
+        # Stop handling first so the final save doesn't cover messages still queued
+        await self.dispatcher.stop()
+        self.checkpoint.save(force=True)
+        await asyncio.to_thread(self.recorder.close)
+        await self.downloader.close()
         if self.is_connected:
             await self.client.disconnect()
             self.is_connected = False
             logger.info("Puppet client disconnected")
     
-    async def send_search_request(self, user_id, query, session_id):
-        """Send search request to backend bot"""
-        try:
-            # Send message to backend bot
-            message = await self.client.send_message(
-                self.backend_bot_username,
-                query
-            )
+    async def run_worker(self, batch_size=10):
+        """Claim search jobs from the work queue, reclaiming entries stuck on dead consumers"""
+        logger.info(f"Puppet worker started as consumer {work_queue.consumer}")
+        reclaim_idle_ms = Config.QUEUE_RECLAIM_IDLE * 1000
+        last_reclaim = 0.0
+        loop = asyncio.get_running_loop()
+        
+        while self.is_connected:
+            try:
+                jobs = []
+                if loop.time() - last_reclaim >= Config.QUEUE_RECLAIM_IDLE / 4:
+                    last_reclaim = loop.time()
+                    jobs = await asyncio.to_thread(
+                        work_queue.reclaim, reclaim_idle_ms, batch_size, Config.QUEUE_MAX_DELIVERIES
+                    )
+                    if jobs:
+                        logger.warning(f"Reclaimed {len(jobs)} stuck search jobs")
+                
+                # Leave unclaimed work to other workers while this one is saturated
+                free_slots = Config.WORKER_MAX_INFLIGHT - len(self._background_tasks) - len(jobs)
+                if free_slots > 0:
+                    jobs += await asyncio.to_thread(work_queue.claim, min(batch_size, free_slots), 1000)
+                elif not jobs:
+                    await asyncio.sleep(0.1)
+                
+                for entry_id, job in jobs:
+                    await self._process_job(entry_id, job)
             
-            # Store request state
-            state_data = {
-                'user_id': user_id,
-                'session_id': session_id,
-                'query': query,
-                'timestamp': asyncio.get_event_loop().time()
-            }
-            
-            redis_client.set_request_state(
-                Config.PUPPET_SESSION_NAME,
-                message.id,
-                state_data
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in puppet worker loop: {e}")
+                await asyncio.sleep(1)
+    
+    @profiled('puppet.process_job')
+    async def _process_job(self, entry_id, job):
+        """Start the backend search for one claimed job"""
+        user_id = int(job['user_id'])
+        session_data = redis_client.get_user_session(user_id)
+        if session_data and session_data.get('session_id') != job['session_id']:
+            # The user started a newer search meanwhile
+            logger.info(f"Skipping superseded job {entry_id} for user {user_id}")
+            self.generations.advance(user_id, session_data['session_id'])
+            work_queue.ack(entry_id)
+            return
+        
+        # A new search cancels whatever this worker still runs for the user's older sessions
+        self.generations.advance(user_id, job['session_id'])
+        
+        if job.get('action') == 'next':
+            started = await self.request_next_file(
+                user_id, job['session_id'], int(job['next_index']), job_id=entry_id
             )
-            
-            logger.info(f"Sent search request for user {user_id}: {query}")
+        elif job.get('action') == 'all':
+            started = self.send_all_files(user_id, job['session_id'], int(job['start_index']), job_id=entry_id)
+        else:
+            # 'search', or 'warm': a cache refresh the frontend runs under a pseudo user id
+            started = await self.send_search_request(user_id, job['query'], job['session_id'], job_id=entry_id)
+        
+        if not started:
+            if self.is_connected:
+                # Nothing to retry (e.g. missing session data); don't let it bounce between workers
+                logger.error(f"Dropping job {entry_id} that could not be started")
+                work_queue.ack(entry_id)
+            else:
+                logger.error(f"Could not start job {entry_id}; leaving it pending for reclaim")
+    
+    async def send_search_request(self, user_id, query, session_id, job_id=None):
+        """
+        Send search request to backend bot, retrying/hedging in the background.
+        Returns once the query went out (True) or every attempt to send it failed (False);
+        a session superseded before the search started counts as done (True, job acked).
+        """
+        if not self.is_connected:
+            logger.error("Cannot send search request: puppet client is not connected")
+            return False
+        if self._skip_superseded(user_id, session_id, job_id):
             return True
-            
+        
+        sent = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._search_with_retry(user_id, query, session_id, job_id, sent))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        self.generations.track(user_id, session_id, task)
+        await asyncio.wait({sent, task}, return_when=asyncio.FIRST_COMPLETED)
+        return sent.done()
+    
+    def _skip_superseded(self, user_id, session_id, job_id=None):
+        """Complete the job of a session superseded before its task could start"""
+        if self.generations.is_current(user_id, session_id):
+            return False
+        logger.info(f"Not starting work for superseded session {session_id} of user {user_id}")
+        if job_id:
+            work_queue.ack(job_id)
+        return True
+    
+    async def _search_with_retry(self, user_id, query, session_id, job_id=None, sent=None):
+        """Drive one search through the retry policy until the backend answers"""
+        group = self.replies.new_group()
+        sent_ids = []
+        keep_outstanding = False
+        try:
+            reply = await self.search_policy.execute(
+                lambda attempt_no: self._search_attempt(user_id, query, session_id, group, sent_ids, job_id, sent)
+            )
+            if reply is None:
+                logger.error(f"Search for user {user_id} got no backend answer: {query}")
+                error_message = (
+                    "The search service did not respond in time" if sent_ids
+                    else "Service temporarily unavailable. Please try again later."
+                )
+                self._forward_error_to_frontend(user_id, error_message, session_id)
+                session_data = redis_client.get_user_session(user_id)
+                if session_data and session_data.get('session_id') == session_id:
+                    # Only this search's session: the user may have started a newer one meanwhile
+                    redis_client.delete_user_session(user_id)
+            if job_id:
+                # Completed (answered or reported as failed): the job leaves the pending list
+                work_queue.ack(job_id)
+        except asyncio.CancelledError:
+            # Superseded searches are done with; on shutdown the job stays pending for reclaim
+            if job_id and not self.generations.is_current(user_id, session_id):
+                logger.info(f"Search for superseded session {session_id} of user {user_id} cancelled")
+                work_queue.ack(job_id)
+            else:
+                keep_outstanding = True  # Shutting down: answer it after the restart
+            raise
         except Exception as e:
             logger.error(f"Error sending search request: {e}")
-            return False
+        finally:
+            self.replies.close(group)
+            if not keep_outstanding:
+                for message_id in sent_ids:
+                    self.checkpoint.resolve(message_id)
     
-    async def request_next_file(self, user_id, session_id, next_index):
+    async def _search_attempt(self, user_id, query, session_id, group, sent_ids=None, job_id=None, sent=None):
+        """Send the query once and wait for the group's first answer"""
+        # Send message to backend bot
+        message = await self.client.send_message(
+            self.backend_bot_username,
+            query
+        )
+        if sent is not None and not sent.done():
+            sent.set_result(message.id)
+        self.replies.register(message.id, group)
+        
+        # Store request state
+        state = RequestStateManager.create_state(
+            user_id, session_id, query, Config.PUPPET_SESSION_NAME, message.id
+        )
+        
+        redis_client.set_request_state(
+            Config.PUPPET_SESSION_NAME,
+            message.id,
+            state
+        )
+        self.recorder.record_outgoing(message.id, query)
+        if sent_ids is not None:
+            sent_ids.append(message.id)
+        self.checkpoint.add_outstanding(message.id, state.to_dict(), job_id)
+        
+        hot_log.info('search_sent', session=session_id, user=user_id, message_id=message.id, query=query)
+        return await asyncio.shield(group)
+    
+    async def request_next_file(self, user_id, session_id, next_index, job_id=None):
         """Request next file by clicking the appropriate button"""
         try:
             # Get user session
@@ -220,18 +647,107 @@ class PuppetClient:
             
             button_data = session_data['buttons_data'][next_index]
             
-            # We need to simulate clicking the button
-            # This requires the original message ID, which we might not have stored
-            # For now, we'll resend the search request and handle the new response
-            # In a production system, you'd want to store the original message context
+            # Click the button on the stored results message when we have it
+            message = await self._results_message(session_data)
+            if message is not None:
+                clicked = await self.click_policy.execute(
+                    lambda attempt_no: self._click_attempt(message, button_data)
+                )
+                if clicked:
+                    self._clicked(user_id, session_id)
+                else:
+                    self._forward_error_to_frontend(user_id, "Failed to process request", session_id)
+                if job_id:
+                    work_queue.ack(job_id)
+                return True
             
-            logger.warning("Next file request - implementation requires original message context")
-            return await self.send_search_request(user_id, session_data['original_query'], session_id)
+            # Results shown to another puppet account (or not stored): repeat the search here
+            logger.warning("Next file request without a results message on this account, repeating the search")
+            self._follow_up(user_id, session_id, 'next', next_index)
+            return await self.send_search_request(user_id, session_data['original_query'], session_id, job_id=job_id)
             
         except Exception as e:
             logger.error(f"Error requesting next file: {e}")
             return False
     
+    async def _results_message(self, session_data):
+        """The backend message carrying the result buttons, if it is in this account's chat"""
+        message_id = session_data.get('results_message_id')
+        if not message_id or session_data.get('results_puppet') != Config.PUPPET_SESSION_NAME:
+            return None
+        return await self.client.get_messages(self.backend_bot_username, ids=message_id)
+    
+    def _follow_up(self, user_id, session_id, action, index):
+        """Remember what to do with the result buttons of a repeated search"""
+        self._follow_ups[(user_id, session_id)] = (action, index)
+        while len(self._follow_ups) > 1000:
+            self._follow_ups.popitem(last=False)  # Searches that never answered
+    
+    def send_all_files(self, user_id, session_id, start_index, job_id=None):
+        """Click every remaining result button in the background (\"send all\")"""
+        if not self.is_connected:
+            logger.error("Cannot start batch: puppet client is not connected")
+            return False
+        if self._skip_superseded(user_id, session_id, job_id):
+            return True
+        
+        task = asyncio.create_task(self._run_batch(user_id, session_id, start_index, job_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        self.generations.track(user_id, session_id, task)
+        return True
+    
+    async def _run_batch(self, user_id, session_id, start_index, job_id=None):
+        """Click the buttons with bounded concurrency, then report the batch complete"""
+        key = (user_id, session_id)
+        try:
+            session_data = redis_client.get_user_session(user_id)
+            buttons = (session_data or {}).get('buttons_data', [])[start_index:]
+            message = await self._results_message(session_data) if buttons else None
+            if message is None and buttons:
+                # Results shown to another puppet account: repeat the search here, then send all
+                self._follow_up(user_id, session_id, 'all', start_index)
+                if not await self.send_search_request(user_id, session_data['original_query'], session_id, job_id=job_id):
+                    # The search reported the failure (or, disconnected, the job stays pending for reclaim)
+                    self._follow_ups.pop(key, None)
+                return
+            if message is None:
+                self._forward_error_to_frontend(user_id, "These results are no longer available", session_id)
+            else:
+                run = self._batches[key] = BatchRun(user_id, session_id, len(buttons), Config.BATCH_CLICK_CONCURRENCY)
+                logger.info(f"Sending all {len(buttons)} remaining files to user {user_id}")
+                
+                for button in buttons:
+                    file_timeout = self.file_timeout.current()
+                    if not await run.acquire(file_timeout):
+                        self._file_timed_out(user_id, session_id, file_timeout)
+                    clicked = await self.click_policy.execute(
+                        lambda attempt_no, button=button: self._click_attempt(message, button)
+                    )
+                    if clicked:
+                        self._clicked(user_id, session_id)
+                    else:
+                        run.on_failure()
+                
+                try:
+                    await asyncio.wait_for(run.finished.wait(), timeout=self.file_timeout.current())
+                except asyncio.TimeoutError:
+                    logger.warning(f"Batch for user {user_id} finished with {run.total - run.received} files missing")
+                event_bus.publish(BatchCompleteEvent(user_id, session_id, run.received, run.total))
+        
+        except asyncio.CancelledError:
+            if job_id and not self.generations.is_current(user_id, session_id):
+                work_queue.ack(job_id)
+            raise
+        except Exception as e:
+            logger.error(f"Error sending all files to user {user_id}: {e}")
+            self._forward_error_to_frontend(user_id, "Failed to fetch all files", session_id)
+        finally:
+            self._batches.pop(key, None)
+        
+        if job_id:
+            work_queue.ack(job_id)
+    
     async def resend_search_request(self, user_id, session_id):
         """Resend search request after joining channel"""
         try:
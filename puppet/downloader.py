@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from telethon import utils
+from telethon.errors import FloodWaitError
+from telethon.network import MTProtoSender
+from telethon.tl.alltlobjects import LAYER
+from telethon.tl.functions import InvokeWithLayerRequest
+from telethon.tl.functions.auth import ExportAuthorizationRequest, ImportAuthorizationRequest
+from telethon.tl.functions.upload import GetFileRequest
+from telethon.tl.types.upload import File
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# upload.getFile: limit must divide 1 MiB and offsets must be multiples of it
+PART_SIZE = 512 * 1024
+
+
+class TransferStats:
+    """Progress and throughput of one download"""
+
+    def __init__(self, file_id, size, connections):
+        self.file_id = file_id
+        self.size = size
+        self.connections = connections
+        self.received = 0
+        self.flood_waits = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        """Bytes per second"""
+        return self.received / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'file_id': self.file_id,
+            'size': self.size,
+            'received': self.received,
+            'connections': self.connections,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'flood_waits': self.flood_waits,
+        }
+
+
+class ParallelDownloader:
+    """
+    Download large documents as 512 KiB parts over several MTProto senders
+    connected to the file's own DC. Parts are fetched out of order but
+    written in order, with at most `connections` requests in flight per
+    transfer and `max_parts_in_flight` across all transfers.
+    """
+
+    def __init__(self, client, connections=None, min_size=None, max_parts_in_flight=None):
+        self.client = client
+        self.connections = connections or Config.DOWNLOAD_CONNECTIONS
+        self.min_size = Config.PARALLEL_DOWNLOAD_MIN_SIZE if min_size is None else min_size
+        self._in_flight = asyncio.Semaphore(max_parts_in_flight or Config.DOWNLOAD_MAX_PARTS_IN_FLIGHT)
+        self._senders = {}       # dc id -> idle senders
+        self._auth_keys = {}     # dc id -> auth key exported to that DC
+        self._sender_lock = asyncio.Lock()
+        self.active = {}         # file id -> TransferStats
+        self.recent = deque(maxlen=50)
+
+    async def download(self, message, out):
+        """Write a message's media to the file-like `out`; parallel for large documents"""
+        document = getattr(message, 'document', None)
+        if document is None or document.size < self.min_size:
+            return await self.client.download_media(message, file=out)
+
+        dc_id, location = utils.get_input_location(document)
+        stats = TransferStats(document.id, document.size, self.connections)
+        self.active[document.id] = stats
+        try:
+            await self._download_parts(dc_id, location, document.size, out, stats)
+        finally:
+            stats.finished = time.monotonic()
+            self.active.pop(document.id, None)
+            self.recent.append(stats)
+        logger.info(
+            f"Downloaded {document.size} bytes over {self.connections} connections "
+            f"in {stats.elapsed:.1f}s ({stats.throughput / 1024 ** 2:.1f} MiB/s)"
+        )
+        return out
+
+    async def _download_parts(self, dc_id, location, size, out, stats):
+        part_count = math.ceil(size / PART_SIZE)
+        senders = asyncio.Queue()
+        for sender in await self._acquire_senders(dc_id, min(self.connections, part_count)):
+            senders.put_nowait(sender)
+
+        pending = deque()
+        next_part = 0
+        try:
+            while next_part < part_count or pending:
+                # Keep a bounded window of parts ahead of the writer
+                while next_part < part_count and len(pending) < self.connections * 2:
+                    pending.append(asyncio.create_task(self._fetch_part(senders, location, next_part, stats)))
+                    next_part += 1
+                data = await pending.popleft()
+                out.write(data)
+                stats.received += len(data)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            idle = []
+            while not senders.empty():
+                idle.append(senders.get_nowait())
+            self._release_senders(dc_id, idle)
+
+    async def _fetch_part(self, senders, location, index, stats):
+        request = GetFileRequest(location, offset=index * PART_SIZE, limit=PART_SIZE, precise=False)
+        while True:
+            sender = await senders.get()
+            try:
+                async with self._in_flight:
+                    result = await self.client._call(sender, request)
+            except FloodWaitError as e:
+                stats.flood_waits += 1
+                logger.warning(f"Flood wait of {e.seconds}s while downloading part {index}")
+                await asyncio.sleep(e.seconds)
+                continue
+            finally:
+                senders.put_nowait(sender)
+            if not isinstance(result, File):
+                raise TypeError(f"Unexpected upload.getFile result {type(result).__name__} (CDN files are not supported)")
+            return result.bytes
+
+    async def _acquire_senders(self, dc_id, count):
+        async with self._sender_lock:
+            idle = self._senders.setdefault(dc_id, [])
+            senders = [idle.pop() for _ in range(min(count, len(idle)))]
+            while len(senders) < count:
+                senders.append(await self._create_sender(dc_id))
+            return senders
+
+    def _release_senders(self, dc_id, senders):
+        self._senders.setdefault(dc_id, []).extend(senders)
+
+    async def _create_sender(self, dc_id):
+        """A new MTProto connection to dc_id, authorized as the puppet account"""
+        dc = await self.client._get_dc(dc_id)
+        home = dc_id == self.client.session.dc_id
+        auth_key = self.client.session.auth_key if home else self._auth_keys.get(dc_id)
+        sender = MTProtoSender(auth_key, loggers=self.client._log)
+        await sender.connect(self.client._connection(
+            dc.ip_address, dc.port, dc.id, loggers=self.client._log, proxy=self.client._proxy
+        ))
+        if auth_key is None:
+            # First connection to a foreign DC: import our authorization there
+            exported = await self.client(ExportAuthorizationRequest(dc_id))
+            self.client._init_request.query = ImportAuthorizationRequest(id=exported.id, bytes=exported.bytes)
+            await sender.send(InvokeWithLayerRequest(LAYER, self.client._init_request))
+            self._auth_keys[dc_id] = sender.auth_key
+        return sender
+
+    async def close(self):
+        """Disconnect every pooled sender"""
+        async with self._sender_lock:
+            senders = [sender for idle in self._senders.values() for sender in idle]
+            self._senders.clear()
+        for sender in senders:
+            await sender.disconnect()
+
+    def metrics(self):
+        """Active transfers and throughput of recent ones (bytes per second)"""
+        recent = [stats.throughput for stats in self.recent]
+        return {
+            'active': [stats.to_dict() for stats in self.active.values()],
+            'completed': len(self.recent),
+            'avg_throughput': sum(recent) / len(recent) if recent else 0.0,
+            'last': self.recent[-1].to_dict() if self.recent else None,
+        }
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class RequestGenerations:
+    """
+    Latest session_id per user and the puppet tasks working for each session.
+    Starting a newer session cancels the user's older tasks (their pending
+    retries, clicks and timeouts with them), and is_current() lets late
+    backend replies for superseded sessions be dropped without a Redis read.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._current: Dict[int, str] = {}
+        self._tasks: Dict[int, Dict[str, Set[asyncio.Task]]] = {}
+        self.stats = {'superseded': 0, 'cancelled': 0, 'dropped': 0}
+
+    def advance(self, user_id: int, session_id: str):
+        """Make session_id the user's current session, cancelling older sessions' tasks"""
+        previous = self._current.get(user_id)
+        if previous == session_id:
+            return
+        if len(self._current) >= self.max_users and user_id not in self._current:
+            self._evict()
+        self._current[user_id] = session_id
+
+        sessions = self._tasks.get(user_id, {})
+        for old_session in [s for s in sessions if s != session_id]:
+            self.stats['superseded'] += 1
+            for task in sessions.pop(old_session):
+                if not task.done():
+                    task.cancel()
+                    self.stats['cancelled'] += 1
+            logger.info(f"Session {old_session} of user {user_id} superseded by {session_id}")
+        if user_id in self._tasks and not sessions:
+            del self._tasks[user_id]
+
+    def track(self, user_id: int, session_id: str, task: asyncio.Task):
+        """
+        Tie a background task to a session so a newer session can cancel it.
+        Callers check is_current() first: a task cancelled here never runs its own cleanup.
+        """
+        if self._current.get(user_id) not in (None, session_id):
+            task.cancel()
+            self.stats['cancelled'] += 1
+            return
+        self._current.setdefault(user_id, session_id)
+        tasks = self._tasks.setdefault(user_id, {}).setdefault(session_id, set())
+        tasks.add(task)
+        task.add_done_callback(lambda t: self._untrack(user_id, session_id, t))
+
+    def _untrack(self, user_id, session_id, task):
+        sessions = self._tasks.get(user_id)
+        if not sessions or session_id not in sessions:
+            return
+        sessions[session_id].discard(task)
+        if not sessions[session_id]:
+            del sessions[session_id]
+        if not sessions:
+            del self._tasks[user_id]
+
+    def is_current(self, user_id: int, session_id: str) -> bool:
+        """False when this worker has seen a newer session for the user"""
+        current = self._current.get(user_id)
+        return current is None or current == session_id
+
+    def _evict(self):
+        # Forget idle users first; their sessions have no work left to cancel
+        count = max(1, self.max_users // 10)
+        victims = [u for u in self._current if u not in self._tasks][:count]
+        if len(victims) < count:
+            # Then the oldest busy ones: their tasks stay tracked, and late replies
+            # for them are still checked against the shared session
+            victims += [u for u in self._current if u in self._tasks][:count - len(victims)]
+        for user_id in victims:
+            del self._current[user_id]
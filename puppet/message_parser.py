@@ -1,8 +1,17 @@
 from telethon import types
 import logging
 import re
+from utils.query_normalizer import canonicalize_query
+from utils.hot_log import get_hot_logger
 
 logger = logging.getLogger(__name__)
+hot_log = get_hot_logger(__name__)
+
+_SIZE_PATTERN = re.compile(r'(\d+(?:[.,]\d+)?)\s*(B|KB|MB|GB|TB|KiB|MiB|GiB|TiB)\b', re.IGNORECASE)
+_SIZE_UNITS = {'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3, 'tb': 1024 ** 4}
+_QUALITY_PATTERN = re.compile(r'\b(2160p|1440p|1080p|720p|576p|480p|360p|240p|4k|uhd)\b', re.IGNORECASE)
+_EPISODE_TOKEN = re.compile(r'\bs(\d{2})e(\d{2,3})\b')
+_DECORATION = re.compile(r'^[\W_]+|[\W_]+$')
 
 def parse_message(message):
     """
@@ -49,7 +58,8 @@ def extract_buttons(message):
                     buttons_data.append({
                         'text': button.text,
                         'data': button.data,
-                        'same_peer': getattr(button, 'same_peer', False)
+                        'same_peer': getattr(button, 'same_peer', False),
+                        'meta': parse_button_meta(button.text)
                     })
                 elif hasattr(button, 'url'):
                     buttons_data.append({
@@ -58,13 +68,46 @@ def extract_buttons(message):
                         'same_peer': getattr(button, 'same_peer', False)
                     })
         
-        logger.info(f"Extracted {len(buttons_data)} buttons")
+        hot_log.debug('buttons_extracted', count=len(buttons_data))
         return buttons_data
         
     except Exception as e:
         logger.error(f"Error extracting buttons: {e}")
         return []
 
+def parse_button_meta(text):
+    """
+    Structured metadata from a result button label such as
+    "[1.4 GB] Show.S01E02.1080p.mkv": name, size in bytes, quality and
+    episode (sNNeNN). Fields that can't be found are left out.
+    """
+    meta = {}
+    if not text:
+        return meta
+    
+    name = text
+    size_match = _SIZE_PATTERN.search(text)
+    if size_match:
+        value = float(size_match.group(1).replace(',', '.'))
+        unit = size_match.group(2).lower().replace('i', '')
+        meta['size'] = int(value * _SIZE_UNITS[unit])
+        name = text[:size_match.start()] + text[size_match.end():]
+    
+    quality_match = _QUALITY_PATTERN.search(text)
+    if quality_match:
+        quality = quality_match.group(1).lower()
+        meta['quality'] = '2160p' if quality in ('4k', 'uhd') else quality
+    
+    episode_match = _EPISODE_TOKEN.search(canonicalize_query(text))
+    if episode_match:
+        meta['episode'] = f"s{episode_match.group(1)}e{episode_match.group(2)}"
+    
+    name = re.sub(r'[\[\](){}|]+', ' ', name)
+    name = _DECORATION.sub('', ' '.join(name.split()))
+    if name:
+        meta['name'] = name
+    return meta
+
 def detect_join_request(text):
     """Detect join channel requests"""
     if not text:
@@ -106,11 +149,19 @@ def detect_error(text):
         r'unavailable'
     ]
     
+    # The backend has no result for the query (as opposed to a transient failure)
+    no_result_patterns = [
+        r'could not find',
+        r'not found',
+        r'not released'
+    ]
+    
     text_lower = text.lower()
     
     for pattern in error_patterns:
         if re.search(pattern, text_lower, re.IGNORECASE):
-            return {'error_message': text}
+            no_results = any(re.search(p, text_lower) for p in no_result_patterns)
+            return {'error_message': text, 'no_results': no_results}
     
     return None
 
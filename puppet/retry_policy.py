@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.helpers import calculate_timeout
+from utils.metrics import AdaptiveTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """Per-operation budget limiting retries/hedges to a fraction of first attempts"""
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 0.5, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self.requests = 0
+        self.spent = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self):
+        """Deposit credit for a first attempt"""
+        self._refill()
+        self.requests += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw one retry/hedge; False when the budget is exhausted"""
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.spent += 1
+            return True
+        self.rejected += 1
+        return False
+
+
+class RetryPolicy:
+    """Retry with exponential backoff and optional hedged duplicates"""
+
+    def __init__(self, name: str, base_timeout: int, max_attempts: int = 3,
+                 hedge: bool = False, hedge_quantile: float = 0.95,
+                 min_hedge_delay: float = 1.0, backoff_base: float = 0.5,
+                 budget: Optional[RetryBudget] = None, timeouts: Optional[AdaptiveTimeout] = None,
+                 max_timeout: float = 300):
+        self.name = name
+        self.base_timeout = base_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.backoff_base = backoff_base
+        self.budget = budget or RetryBudget()
+        self.timeouts = timeouts or AdaptiveTimeout(base_timeout)
+        self.max_timeout = max_timeout
+        self.stats = {
+            'calls': 0, 'successes': 0, 'timeouts': 0, 'failures': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay before sending a hedged duplicate, derived from observed latency"""
+        estimate = self.timeouts.sketch.quantile(self.hedge_quantile)
+        if estimate is None:
+            return None
+        return max(self.min_hedge_delay, estimate)
+
+    async def execute(self, attempt: Callable[[int], Awaitable[Any]]) -> Optional[Any]:
+        """
+        Run attempt(n) until it yields a non-None result or attempts run out.
+        Each attempt gets calculate_timeout(t, n), where t is learned from the
+        latency of earlier calls (base_timeout until enough are seen); retries and hedges
+        draw from the budget so a slow backend is not flooded with duplicates.
+        """
+        self.stats['calls'] += 1
+        self.budget.record_request()
+
+        for attempt_no in range(self.max_attempts):
+            if attempt_no > 0:
+                if not self.budget.try_spend():
+                    logger.warning(f"[{self.name}] Retry budget exhausted, giving up after {attempt_no} attempts")
+                    break
+                self.stats['retries'] += 1
+                backoff = self.backoff_base * (2 ** (attempt_no - 1))
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+
+            timeout = calculate_timeout(self.timeouts.current(), attempt_no, self.max_timeout)
+            result, timed_out = await self._run_attempt(attempt, attempt_no, timeout)
+            if result is not None:
+                self.stats['successes'] += 1
+                return result
+
+            if timed_out:
+                self.stats['timeouts'] += 1
+                self.timeouts.record_timeout(timeout)
+                logger.warning(f"[{self.name}] Attempt {attempt_no + 1}/{self.max_attempts} got no valid answer within {timeout}s")
+            else:
+                # Failed fast (error or invalid answer): says nothing about latency
+                self.stats['failures'] += 1
+                logger.warning(f"[{self.name}] Attempt {attempt_no + 1}/{self.max_attempts} failed")
+
+        return None
+
+    async def _run_attempt(self, attempt, attempt_no, timeout):
+        """
+        Run one attempt, hedging it once if it outlives the hedge delay.
+        Returns (result, timed_out); timed_out is False when every try failed before the deadline.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        tasks: Dict[asyncio.Task, bool] = {asyncio.ensure_future(attempt(attempt_no)): False}
+
+        hedge_delay = self.hedge_delay() if self.hedge else None
+        hedge_pending = hedge_delay is not None and hedge_delay < timeout
+
+        try:
+            while tasks:
+                now = loop.time()
+                if now >= deadline:
+                    return None, True
+
+                wait_for = deadline - now
+                if hedge_pending:
+                    wait_for = min(wait_for, max(0.0, started + hedge_delay - now))
+
+                done, _ = await asyncio.wait(tasks.keys(), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    hedged = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"[{self.name}] Attempt failed: {e}")
+                        continue
+                    if result is not None:
+                        self.timeouts.record(loop.time() - started)
+                        if hedged:
+                            self.stats['hedge_wins'] += 1
+                        return result, False
+
+                if hedge_pending and loop.time() >= started + hedge_delay:
+                    hedge_pending = False
+                    if tasks and self.budget.try_spend():
+                        self.stats['hedges'] += 1
+                        logger.info(f"[{self.name}] Sending hedged request after {hedge_delay:.2f}s")
+                        tasks[asyncio.ensure_future(attempt(attempt_no))] = True
+
+            return None, False
+
+        finally:
+            # Losers are cancelled; their late replies are dropped by ReplyWaiter
+            for task in tasks:
+                task.cancel()
+
+
+class ReplyWaiter:
+    """Match backend replies to in-flight requests so that the first reply wins"""
+
+    def __init__(self, discarded_size: int = 1000):
+        self._groups: Dict[int, asyncio.Future] = {}
+        self._discarded = deque(maxlen=discarded_size)
+        self._discarded_set = set()
+
+    def new_group(self) -> asyncio.Future:
+        return asyncio.get_running_loop().create_future()
+
+    def register(self, message_id: int, group: asyncio.Future):
+        """Associate a sent request message with a reply group"""
+        self._groups[message_id] = group
+
+    def claim(self, message_id: Optional[int], reply) -> bool:
+        """
+        Offer a backend reply. Returns True when it should be processed:
+        untracked messages pass through, a tracked reply wins only if its
+        group is still open, and replies to discarded requests are dropped.
+        """
+        if message_id is None:
+            return True
+        if message_id in self._discarded_set:
+            return False
+
+        group = self._groups.pop(message_id, None)
+        if group is None:
+            return True
+        if group.done():
+            self._discard(message_id)
+            return False
+
+        group.set_result(reply)
+        return True
+
+    def close(self, group: asyncio.Future):
+        """Drop every request of a finished group; their late replies are discarded"""
+        for message_id in [mid for mid, g in self._groups.items() if g is group]:
+            del self._groups[message_id]
+            self._discard(message_id)
+        if not group.done():
+            group.cancel()
+
+    def _discard(self, message_id):
+        if len(self._discarded) == self._discarded.maxlen:
+            self._discarded_set.discard(self._discarded[0])
+        self._discarded.append(message_id)
+        self._discarded_set.add(message_id)
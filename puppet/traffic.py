@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from telethon import types
+
+logger = logging.getLogger(__name__)
+
+_USERNAME = re.compile(r'@([A-Za-z0-9_]{3,})')
+_INVITE = re.compile(r'(t\.me/|telegram\.me/)(\+|joinchat/)[\w-]+')
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+_LONG_NUMBER = re.compile(r'\+?\d[\d -]{7,}\d')
+
+
+def _pseudonym(value: str) -> str:
+    return 'u' + hashlib.sha256(value.lower().encode('utf-8')).hexdigest()[:8]
+
+
+def sanitize_text(text: Optional[str]) -> Optional[str]:
+    """
+    Strip personal data while keeping what the parser keys on: usernames
+    become stable pseudonyms (still @-prefixed), invite links, emails and
+    phone-like numbers are masked.
+    """
+    if not text:
+        return text
+    text = _EMAIL.sub('<email>', text)
+    text = _INVITE.sub(r'\1\2<invite>', text)
+    text = _LONG_NUMBER.sub('<number>', text)
+    return _USERNAME.sub(lambda m: '@' + _pseudonym(m.group(1)), text)
+
+
+def _serialize_media(media) -> Optional[Dict[str, Any]]:
+    if media is None:
+        return None
+    data = {'kind': type(media).__name__}
+    document = getattr(media, 'document', None) or getattr(media, 'video', None) or getattr(media, 'audio', None)
+    if document is not None:
+        data.update({
+            'id': document.id,
+            'size': getattr(document, 'size', 0),
+            'mime_type': getattr(document, 'mime_type', None),
+            'file_name': next((a.file_name for a in getattr(document, 'attributes', []) if hasattr(a, 'file_name')), None),
+        })
+    photo = getattr(media, 'photo', None)
+    if photo is not None:
+        data['id'] = photo.id
+    return data
+
+
+def serialize_message(message, received_at: float = None) -> Dict[str, Any]:
+    """Sanitized JSON-able form of a backend message: text, buttons, media metadata and timing"""
+    buttons = []
+    for row in getattr(message, 'buttons', None) or []:
+        buttons.append([
+            {
+                'text': sanitize_text(button.text),
+                'data': base64.b64encode(button.data).decode('ascii') if getattr(button, 'data', None) else None,
+                'url': sanitize_text(getattr(button, 'url', None)),
+                'same_peer': getattr(button, 'same_peer', False),
+            }
+            for button in row
+        ])
+    return {
+        'direction': 'in',
+        'id': message.id,
+        'reply_to_msg_id': message.reply_to_msg_id,
+        'received_at': received_at or time.time(),
+        'date': message.date.timestamp() if getattr(message, 'date', None) else None,
+        'text': sanitize_text(message.text),
+        'buttons': buttons,
+        'media': _serialize_media(message.media),
+    }
+
+
+def _deserialize_media(data):
+    if not data:
+        return None
+    if data['kind'] == 'MessageMediaPhoto':
+        return types.MessageMediaPhoto(photo=types.Photo(
+            id=data.get('id') or 0, access_hash=0, file_reference=b'', date=None, sizes=[], dc_id=0
+        ))
+    attributes = [types.DocumentAttributeFilename(data['file_name'])] if data.get('file_name') else []
+    document = types.Document(
+        id=data.get('id') or 0, access_hash=0, file_reference=b'', date=None,
+        mime_type=data.get('mime_type') or 'application/octet-stream',
+        size=data.get('size') or 0, dc_id=0, attributes=attributes
+    )
+    return types.MessageMediaDocument(document=document)
+
+
+def deserialize_message(data: Dict[str, Any]):
+    """Message-like object that parse_message and the puppet pipeline accept"""
+    buttons = [
+        [
+            SimpleNamespace(
+                text=b['text'],
+                data=base64.b64decode(b['data']) if b.get('data') else None,
+                url=b.get('url'),
+                same_peer=b.get('same_peer', False),
+            )
+            for b in row
+        ]
+        for row in data.get('buttons') or []
+    ]
+    return SimpleNamespace(
+        id=data['id'],
+        reply_to_msg_id=data.get('reply_to_msg_id'),
+        text=data.get('text') or '',
+        buttons=buttons or None,
+        media=_deserialize_media(data.get('media')),
+        out=data.get('direction') == 'out',
+    )
+
+
+class TrafficRecorder:
+    """
+    Append sanitized backend traffic to a JSONL capture (disabled without a
+    path). Records are queued and written by a background thread in
+    batches, so message handling never waits on the disk; when the queue is
+    full, records are dropped and counted rather than blocking.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_queued: int = 10000):
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _write(self, record):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        file = None
+        while True:
+            records = [self._queue.get()]
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = records[-1] is None
+            lines = []
+            for record in records:
+                if record is None:
+                    continue
+                try:
+                    lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Error recording backend traffic: {e}")
+            try:
+                if lines:
+                    if file is None:
+                        file = open(self.path, 'a', encoding='utf-8')
+                    file.write(''.join(lines))
+                    file.flush()
+                    self.recorded += len(lines)
+            except OSError as e:
+                logger.error(f"Error recording backend traffic: {e}")
+            if closing:
+                if file is not None:
+                    file.close()
+                return
+
+    def record(self, message):
+        """Record a message received from the backend; never raises into message handling"""
+        if not self.path:
+            return
+        try:
+            record = serialize_message(message)
+        except Exception as e:
+            logger.error(f"Error serializing backend message {getattr(message, 'id', None)} for capture: {e}")
+            return
+        self._write(record)
+
+    def record_outgoing(self, message_id, query):
+        """Record a search sent to the backend, so replays can map replies to requests"""
+        if self.path:
+            self._write({'direction': 'out', 'id': message_id, 'received_at': time.time(), 'text': sanitize_text(query)})
+
+    def close(self):
+        """Write out everything queued so far and close the capture"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
@@ -0,0 +1,130 @@
+"""
+Process supervisor for the multi-process topology: one frontend ingest
+process and N puppet workers, each with its own Telethon session.
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAIN_SCRIPT = str(Path(__file__).resolve().parent / "main.py")
+
+
+class ChildProcess:
+    """A supervised child process and its restart bookkeeping"""
+
+    def __init__(self, name, env):
+        self.name = name
+        self.env = env
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+
+    def start(self):
+        env = dict(os.environ)
+        env.update(self.env)
+        self.process = subprocess.Popen([sys.executable, MAIN_SCRIPT], env=env)
+        self.started_at = time.monotonic()
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+
+def worker_session_name(index):
+    """Telethon session owned by puppet worker number index"""
+    if index < len(Config.PUPPET_SESSION_NAMES):
+        return Config.PUPPET_SESSION_NAMES[index]
+    return f"{Config.PUPPET_SESSION_NAME}_worker{index}"
+
+
+class Supervisor:
+    """Spawn frontend and puppet worker processes and restart them when they crash"""
+
+    def __init__(self, workers=None, stable_after=60, max_backoff=60):
+        self.workers = workers or Config.PUPPET_WORKERS
+        self.stable_after = stable_after
+        self.max_backoff = max_backoff
+        self.broker = None
+        self.is_running = False
+        self.children = [ChildProcess('frontend', {'PROCESS_MODE': 'multi', 'PROCESS_ROLE': 'frontend'})]
+        for index in range(self.workers):
+            self.children.append(ChildProcess(f"worker-{index}", {
+                'PROCESS_MODE': 'multi',
+                'PROCESS_ROLE': 'worker',
+                'PUPPET_SESSION_NAME': worker_session_name(index),
+                'WORKER_ID': f"worker-{index}"
+            }))
+
+    def handle_shutdown_signal(self, signum, frame):
+        logger.info(f"Supervisor received shutdown signal {signum}")
+        self.is_running = False
+
+    def run(self):
+        """Start all children and keep them alive until a shutdown signal"""
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_shutdown_signal)
+
+        # Always started: with USE_REDIS=true, children still fall back to it while Redis is down
+        from database.local_broker import LocalBroker
+        self.broker = LocalBroker()
+        self.broker.start()
+
+        self.is_running = True
+        for child in self.children:
+            child.start()
+        logger.info(f"Supervisor running 1 frontend and {self.workers} puppet workers")
+
+        try:
+            while self.is_running:
+                self._check_children()
+                time.sleep(1)
+        finally:
+            self.shutdown()
+
+    def _check_children(self):
+        now = time.monotonic()
+        for child in self.children:
+            if child.is_alive():
+                if child.restarts and now - child.started_at > self.stable_after:
+                    child.restarts = 0
+                continue
+
+            if child.next_start == 0.0:
+                exit_code = child.process.returncode if child.process else None
+                delay = min(2 ** child.restarts, self.max_backoff)
+                child.next_start = now + delay
+                logger.error(f"{child.name} exited with code {exit_code}; restarting in {delay}s")
+            elif now >= child.next_start:
+                child.restarts += 1
+                child.next_start = 0.0
+                child.start()
+
+    def shutdown(self, timeout=10):
+        """Terminate all children, escalating to kill after timeout"""
+        logger.info("Stopping supervised processes...")
+        for child in self.children:
+            if child.is_alive():
+                child.process.terminate()
+
+        deadline = time.monotonic() + timeout
+        for child in self.children:
+            if child.process is None:
+                continue
+            try:
+                child.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"{child.name} did not stop in time, killing")
+                child.process.kill()
+
+        if self.broker:
+            self.broker.shutdown()
+        logger.info("Supervisor stopped")
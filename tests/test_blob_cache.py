@@ -0,0 +1,76 @@
+import hashlib
+import os
+
+import pytest
+
+from database.blob_cache import BlobCache
+
+
+def store(cache, document_id, data):
+    with cache.writer(document_id) as blob:
+        blob.write(data)
+
+
+def test_writer_names_blob_by_content_hash(tmp_path):
+    cache = BlobCache(directory=tmp_path, max_bytes=1024)
+
+    store(cache, 42, b'payload')
+
+    digest = hashlib.sha256(b'payload').hexdigest()[:16]
+    assert cache.path(42) == tmp_path / f"42.{digest}"
+    with cache.open(42) as f:
+        assert f.read() == b'payload'
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    cache = BlobCache(directory=tmp_path, max_bytes=1024)
+
+    with pytest.raises(RuntimeError):
+        with cache.writer(1) as blob:
+            blob.write(b'partial')
+            raise RuntimeError('download failed')
+
+    assert 1 not in cache
+    assert os.listdir(tmp_path) == []
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = BlobCache(directory=tmp_path, max_bytes=20)
+    store(cache, 1, b'a' * 10)
+    store(cache, 2, b'b' * 10)
+    cache.path(1)  # 2 is now the least recently used
+
+    store(cache, 3, b'c' * 10)
+
+    assert 1 in cache
+    assert 2 not in cache
+    assert 3 in cache
+    assert cache.total_bytes == 20
+
+
+def test_cap_counts_blobs_written_by_other_processes(tmp_path):
+    frontend = BlobCache(directory=tmp_path, max_bytes=20)
+    puppet = BlobCache(directory=tmp_path, max_bytes=20)
+    store(puppet, 1, b'a' * 10)
+    store(puppet, 2, b'b' * 10)
+
+    store(frontend, 3, b'c' * 10)
+
+    assert len(os.listdir(tmp_path)) == 2
+    # The puppet's index still lists the evicted blob; lookups drop it
+    assert 1 not in puppet
+    assert puppet.open(1) is None
+
+
+def test_reindex_restores_blobs_and_keeps_live_temp_files(tmp_path):
+    store(BlobCache(directory=tmp_path, max_bytes=1024), 7, b'kept')
+    live = tmp_path / f".tmp-8-{os.getpid()}-1"
+    live.write_bytes(b'in progress')
+    dead = tmp_path / ".tmp-9-999999999-1"
+    dead.write_bytes(b'interrupted')
+
+    cache = BlobCache(directory=tmp_path, max_bytes=1024)
+
+    assert 7 in cache
+    assert live.exists()
+    assert not dead.exists()
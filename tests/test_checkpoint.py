@@ -0,0 +1,73 @@
+from puppet.checkpoint import PuppetCheckpoint
+
+
+def make_checkpoint(tmp_path):
+    return PuppetCheckpoint(path=tmp_path / 'checkpoint.json', save_interval=0, max_age=3600)
+
+
+def test_seen_rejects_duplicates(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+
+    assert checkpoint.seen(5)
+    assert not checkpoint.seen(5)
+
+
+def test_watermark_stays_below_in_flight_messages(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.seen(1)
+    checkpoint.seen(2)
+    checkpoint.seen(3)
+
+    checkpoint.handled(2)
+    checkpoint.handled(3)
+    assert checkpoint.last_message_id == 0
+
+    checkpoint.handled(1)
+    assert checkpoint.last_message_id == 3
+
+
+def test_handled_ids_survive_reload(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.seen(1)
+    checkpoint.seen(2)
+    checkpoint.handled(2)
+    checkpoint.add_outstanding(2, {'query': 'dune'}, job_id='1-0')
+    checkpoint.save(force=True)
+
+    reloaded = make_checkpoint(tmp_path)
+
+    assert reloaded.last_message_id == 0
+    assert not reloaded.seen(2)
+    assert reloaded.seen(1)
+    assert reloaded.outstanding[2]['job_id'] == '1-0'
+
+
+def test_resolve_drops_outstanding_entry(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.add_outstanding(7, {'query': 'dune'})
+
+    assert checkpoint.resolve(7)['state'] == {'query': 'dune'}
+    assert checkpoint.resolve(7) is None
+
+
+def test_live_updates_during_catchup_do_not_skip_missed_messages(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.seen(100)
+    checkpoint.handled(100)
+    checkpoint.save(force=True)
+
+    restarted = make_checkpoint(tmp_path)
+    restarted.begin_catchup()
+    assert restarted.seen(101)
+    restarted.handled(101)
+    assert restarted.seen(150)
+    restarted.handled(150)
+
+    # Missed while offline, fetched by catch-up after the live updates above
+    assert restarted.seen(120)
+    restarted.handled(120)
+    assert restarted.last_message_id == 100
+
+    restarted.end_catchup()
+    assert restarted.last_message_id == 150
+    assert not restarted.seen(120)
@@ -0,0 +1,105 @@
+import asyncio
+
+from utils.dispatcher import SessionDispatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_items_of_one_key_run_in_order_one_at_a_time():
+    handled = []
+    running = set()
+
+    async def handler(item):
+        key, index = item
+        assert key not in running
+        running.add(key)
+        await asyncio.sleep(0.001 * (3 - index % 3))
+        handled.append(item)
+        running.discard(key)
+
+    async def scenario():
+        dispatcher = SessionDispatcher(handler, workers=4)
+        for index in range(6):
+            for key in ('a', 'b'):
+                await dispatcher.submit(key, (key, index))
+        await dispatcher.drain()
+        await dispatcher.stop()
+
+    run(scenario())
+
+    for key in ('a', 'b'):
+        assert [index for k, index in handled if k == key] == list(range(6))
+
+
+def test_slow_key_does_not_block_other_keys():
+    handled = []
+    release = None
+
+    async def handler(item):
+        if item == 'slow':
+            await release.wait()
+        handled.append(item)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = SessionDispatcher(handler, workers=2)
+        await dispatcher.submit('user-1', 'slow')
+        await dispatcher.submit('user-2', 'fast')
+        await asyncio.sleep(0.01)
+        assert handled == ['fast']
+        release.set()
+        await dispatcher.drain()
+        await dispatcher.stop()
+
+    run(scenario())
+
+    assert handled == ['fast', 'slow']
+
+
+def test_handler_errors_are_counted_and_do_not_stop_the_key():
+    handled = []
+
+    async def handler(item):
+        if item == 1:
+            raise RuntimeError('boom')
+        handled.append(item)
+
+    async def scenario():
+        dispatcher = SessionDispatcher(handler, workers=1)
+        for item in range(3):
+            await dispatcher.submit('key', item)
+        await dispatcher.drain()
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = run(scenario())
+
+    assert handled == [0, 2]
+    assert dispatcher.stats == {'submitted': 3, 'handled': 2, 'errors': 1}
+
+
+def test_submit_waits_while_full():
+    release = None
+
+    async def handler(item):
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = SessionDispatcher(handler, workers=1, max_pending=2)
+        await dispatcher.submit('key', 1)
+        await dispatcher.submit('key', 2)
+        blocked = asyncio.ensure_future(dispatcher.submit('key', 3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        await dispatcher.drain()
+        await dispatcher.stop()
+        return dispatcher
+
+    assert run(scenario()).stats['handled'] == 3
@@ -0,0 +1,51 @@
+import random
+from collections import Counter
+
+from utils.heavy_hitters import SpaceSaving
+
+
+def test_counts_are_exact_below_capacity():
+    sketch = SpaceSaving(capacity=10)
+    for item in 'aababc':
+        sketch.add(item)
+
+    assert sketch.top(3) == [('a', 3, 0.0), ('b', 2, 0.0), ('c', 1, 0.0)]
+    assert sketch.total == 6
+
+
+def test_new_item_replaces_smallest_counter():
+    sketch = SpaceSaving(capacity=2)
+    for item in 'aaab':
+        sketch.add(item)
+
+    sketch.add('c')
+
+    assert 'b' not in sketch
+    assert len(sketch) == 2
+    assert sketch.top() == [('a', 3, 0.0), ('c', 2, 1.0)]
+
+
+def test_finds_heavy_hitters_in_a_long_tail():
+    rng = random.Random(7)
+    stream = ['hot-%d' % (i % 5) for i in range(2000)] + ['cold-%d' % rng.randrange(5000) for _ in range(3000)]
+    rng.shuffle(stream)
+    sketch = SpaceSaving(capacity=50)
+    for item in stream:
+        sketch.add(item)
+
+    assert {item for item, _, _ in sketch.top(5)} == {'hot-%d' % i for i in range(5)}
+    exact = Counter(stream)
+    for item, count, error in sketch.top(5):
+        assert count - error <= exact[item] <= count
+
+
+def test_decay_keeps_ranking_and_eviction_order():
+    sketch = SpaceSaving(capacity=2)
+    for item in 'aaab':
+        sketch.add(item)
+
+    sketch.decay(0.5)
+    sketch.add('c')
+
+    assert sketch.top() == [('a', 1.5, 0.0), ('c', 1.5, 0.5)]
+    assert sketch.total == 3.0
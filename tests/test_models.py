@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from models import RequestState, UserSession
+
+
+def make_state(**overrides):
+    fields = dict(
+        user_id=123456789, session_id='a1b2c3d4', query='dune 2021 1080p', puppet_id='puppet_1',
+        backend_message_id=98765, timestamp=1700000000.25, status='processing'
+    )
+    fields.update(overrides)
+    return RequestState(**fields)
+
+
+def make_session(**overrides):
+    fields = dict(
+        user_id=123456789, original_query='дюна', current_index=2, total_files=5,
+        buttons_data=[
+            {'text': 'Get file', 'data': b'\x00get:1', 'same_peer': False},
+            {'text': 'Channel', 'url': 'https://t.me/example', 'same_peer': True},
+            {'text': 'Label only', 'same_peer': False, 'row': 1},
+        ],
+        session_id='a1b2c3d4', created_at=1700000000.5, last_activity=1700000060.75,
+        extra={'results_puppet': 'puppet_1'}
+    )
+    fields.update(overrides)
+    return UserSession(**fields)
+
+
+def test_request_state_round_trips():
+    state = make_state()
+
+    assert RequestState.from_bytes(state.to_bytes()) == state
+
+
+def test_request_state_reads_legacy_json():
+    state = make_state()
+
+    assert RequestState.from_bytes(json.dumps(state.to_dict()).encode('utf-8')) == state
+
+
+def test_request_state_rejects_unknown_format_version():
+    data = bytearray(make_state().to_bytes())
+    data[0] = 99
+
+    with pytest.raises(ValueError):
+        RequestState.from_bytes(bytes(data))
+
+
+def test_user_session_round_trips():
+    session = make_session()
+
+    assert UserSession.from_bytes(session.to_bytes()) == session
+
+
+def test_user_session_without_buttons_or_extra_round_trips():
+    session = make_session(buttons_data=[], extra=None)
+
+    decoded = UserSession.from_bytes(session.to_bytes())
+
+    assert decoded == session
+    assert decoded.extra is None
+
+
+def test_user_session_reads_legacy_json_with_iso_timestamps():
+    data = make_session(buttons_data=[]).to_dict()
+    data['created_at'] = '2023-11-14T22:13:20'
+    data['last_activity'] = '2023-11-14T22:14:20'
+
+    decoded = UserSession.from_bytes(json.dumps(data).encode('utf-8'))
+
+    assert decoded.last_activity - decoded.created_at == 60
+    assert decoded.extra == {'results_puppet': 'puppet_1'}
+    assert UserSession.from_bytes(decoded.to_bytes()) == decoded
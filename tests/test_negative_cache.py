@@ -0,0 +1,65 @@
+import time
+
+from frontend.negative_cache import NegativeCache
+from utils.bloom_filter import BloomFilter
+
+
+def make_cache(**kwargs):
+    options = dict(ttl=60, capacity=10, error_rate=0.01, rebuild_interval=3600)
+    options.update(kwargs)
+    return NegativeCache(**options)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"query {index}" for index in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for index in range(1000):
+        bloom.add(f"query {index}")
+
+    false_positives = sum(f"other {index}" in bloom for index in range(10000))
+
+    assert false_positives < 300
+
+
+def test_check_matches_canonical_form():
+    cache = make_cache()
+    cache.add('Breaking.Bad.S05E09', 'Not found')
+
+    assert cache.check('breaking bad 5x9') == 'Not found'
+    assert cache.check('breaking bad s05e10') is None
+    assert cache.stats['hits'] == 1
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = make_cache(ttl=10)
+    cache.add('dune', 'Not released yet')
+
+    later = time.monotonic() + 11
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+
+    assert cache.check('dune') is None
+
+
+def test_overflow_evicts_oldest_entries_in_one_batch():
+    cache = make_cache(capacity=10)
+    for index in range(11):
+        cache.add(f"missing {index}", 'Not found')
+
+    assert len(cache) == 9
+    assert cache.stats['rebuilds'] == 1
+    assert cache.check('missing 0') is None
+    assert cache.check('missing 1') is None
+    assert cache.check('missing 10') == 'Not found'
+
+    # The headroom means the next adds don't rebuild again
+    cache.add('missing 11', 'Not found')
+    assert cache.stats['rebuilds'] == 1
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from utils.query_normalizer import canonicalize_query, number_tokens
+from utils.trigram_index import TrigramIndex
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('Breaking.Bad.S05E09', 'breaking bad s05e09'),
+    ('breaking bad 5x9', 'breaking bad s05e09'),
+    ('Breaking Bad season 5 episode 9', 'breaking bad s05e09'),
+    ('Breaking Bad Season 5', 'breaking bad s05'),
+    ('  Amélie   (2001) ', 'amelie 2001'),
+    ('ＤＵＮＥ', 'dune'),
+    ('', ''),
+])
+def test_canonicalize_query(query, expected):
+    assert canonicalize_query(query) == expected
+
+
+def test_number_tokens():
+    assert number_tokens('breaking bad s05e09 1080') == ('s05e09', '1080')
+
+
+def test_exact_lookup():
+    index = TrigramIndex()
+    index.add('breaking bad s05e09', 'results')
+
+    assert index.lookup('breaking bad s05e09') == ('breaking bad s05e09', 'results', 1.0)
+    assert index.stats['exact_hits'] == 1
+
+
+def test_fuzzy_lookup_tolerates_typos():
+    index = TrigramIndex(threshold=0.5)
+    index.add('the lord of the rings', 'results')
+
+    match = index.lookup('the lord of the rigns')
+
+    assert match[0] == 'the lord of the rings'
+    assert 0.5 <= match[2] < 1.0
+
+
+def test_fuzzy_lookup_requires_matching_numbers():
+    index = TrigramIndex(threshold=0.3)
+    index.add('breaking bad s05e09', 'episode 9')
+
+    assert index.lookup('breaking bad s05e10') is None
+    assert index.stats['misses'] == 1
+
+
+def test_evicts_least_recently_used():
+    index = TrigramIndex(max_entries=2)
+    index.add('alien', 1)
+    index.add('aliens', 2)
+    index.lookup('alien')
+
+    index.add('predator', 3)
+
+    assert index.peek('alien') is not None
+    assert index.peek('aliens') is None
+    assert len(index) == 2
+    assert index.stats['evictions'] == 1
+
+
+def test_expired_entries_are_not_returned(monkeypatch):
+    index = TrigramIndex(ttl=10)
+    index.add('dune', 'results')
+
+    later = time.monotonic() + 11
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+
+    assert index.lookup('dune') is None
+    assert len(index) == 0
@@ -0,0 +1,82 @@
+import asyncio
+
+from puppet.retry_policy import RetryBudget, RetryPolicy
+
+
+def make_policy(budget=None, **kwargs):
+    return RetryPolicy('test', base_timeout=0.2, backoff_base=0, budget=budget, **kwargs)
+
+
+def test_budget_spends_stored_tokens_then_rejects():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    assert budget.rejected == 1
+
+
+def test_budget_earns_tokens_from_first_attempts():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    budget.tokens = 0
+
+    budget.record_request()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert budget.try_spend()
+
+
+def test_retries_until_an_attempt_answers():
+    policy = make_policy()
+    attempts = []
+
+    async def attempt(attempt_no):
+        attempts.append(attempt_no)
+        return 'answer' if attempt_no == 1 else None
+
+    assert asyncio.run(policy.execute(attempt)) == 'answer'
+    assert attempts == [0, 1]
+    assert policy.stats['retries'] == 1
+    assert policy.stats['failures'] == 1
+    assert policy.stats['successes'] == 1
+
+
+def test_exhausted_budget_stops_retries():
+    policy = make_policy(RetryBudget(ratio=0, min_per_second=0, max_tokens=0), max_attempts=3)
+    attempts = []
+
+    async def attempt(attempt_no):
+        attempts.append(attempt_no)
+        return None
+
+    assert asyncio.run(policy.execute(attempt)) is None
+    assert attempts == [0]
+    assert policy.stats['retries'] == 0
+
+
+def test_slow_attempt_times_out_and_retry_gets_a_longer_timeout():
+    policy = make_policy(max_attempts=2)
+
+    async def attempt(attempt_no):
+        await asyncio.sleep(0.3)  # Longer than the first timeout, within the doubled one
+        return attempt_no
+
+    assert asyncio.run(policy.execute(attempt)) == 1
+    assert policy.stats['timeouts'] == 1
+    assert policy.timeouts.timeouts == 1
+
+
+def test_hedge_wins_when_the_first_try_stalls():
+    policy = make_policy(hedge=True, min_hedge_delay=0.05, max_attempts=1)
+    policy.timeouts.sketch.record(0.05)
+    calls = []
+
+    async def attempt(attempt_no):
+        calls.append(attempt_no)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return 'hedged'
+
+    assert asyncio.run(policy.execute(attempt)) == 'hedged'
+    assert policy.stats['hedges'] == 1
+    assert policy.stats['hedge_wins'] == 1
@@ -0,0 +1,76 @@
+import inspect
+
+from database.work_queue import LocalStreamQueue, RedisStreamQueue
+from database.local_broker import BrokerQueueClient
+
+
+def make_queue(consumer='worker-0'):
+    return LocalStreamQueue(consumer=consumer)
+
+
+def test_claim_delivers_each_job_once():
+    queue = make_queue()
+    first = queue.enqueue({'action': 'search', 'query': 'one'})
+    second = queue.enqueue({'action': 'search', 'query': 'two'})
+
+    jobs = queue.claim(count=10, block_ms=0)
+
+    assert [entry_id for entry_id, _ in jobs] == [first, second]
+    assert jobs[0][1] == {'action': 'search', 'query': 'one'}
+    assert queue.claim(count=10, block_ms=0) == []
+    assert queue.pending_count() == 2
+
+
+def test_claim_respects_count():
+    queue = make_queue()
+    for index in range(3):
+        queue.enqueue({'index': str(index)})
+
+    assert len(queue.claim(count=2, block_ms=0)) == 2
+    assert len(queue.claim(count=2, block_ms=0)) == 1
+
+
+def test_claim_times_out_when_empty():
+    assert make_queue().claim(count=1, block_ms=10) == []
+
+
+def test_ack_removes_pending_job():
+    queue = make_queue()
+    entry_id = queue.enqueue({'action': 'search'})
+    queue.claim(block_ms=0)
+
+    queue.ack(entry_id)
+    queue.ack(entry_id)  # Idempotent, like XACK
+
+    assert queue.pending_count() == 0
+    assert queue.reclaim(min_idle_ms=0) == []
+
+
+def test_reclaim_takes_over_idle_jobs():
+    queue = make_queue()
+    entry_id = queue.enqueue({'action': 'search'})
+    queue.claim(block_ms=0)
+
+    assert queue.reclaim(min_idle_ms=60_000) == []  # Not idle long enough yet
+    assert queue.claim_for('worker-1', block_ms=0) == []
+
+    reclaimed = queue.reclaim_for('worker-1', min_idle_ms=0)
+    assert reclaimed == [(entry_id, {'action': 'search'})]
+    assert queue.pending_count() == 1
+
+
+def test_reclaim_drops_jobs_after_max_deliveries():
+    queue = make_queue()
+    queue.enqueue({'action': 'search'})
+    queue.claim(block_ms=0)
+
+    assert len(queue.reclaim(min_idle_ms=0, max_deliveries=2)) == 1
+    assert queue.reclaim(min_idle_ms=0, max_deliveries=2) == []
+    assert queue.pending_count() == 0
+
+
+def test_queues_are_interchangeable():
+    for method in ('enqueue', 'claim', 'ack', 'reclaim', 'pending_count'):
+        expected = inspect.signature(getattr(RedisStreamQueue, method))
+        assert inspect.signature(getattr(LocalStreamQueue, method)) == expected, method
+        assert inspect.signature(getattr(BrokerQueueClient, method)) == expected, method
@@ -10,6 +10,10 @@ from .helpers import (
     calculate_timeout
 )
 from .logger import setup_logging, get_logger
+from .metrics import LatencyWindow
+from .loop_watchdog import LoopWatchdog
+from .query_normalizer import canonicalize_query
+from .trigram_index import TrigramIndex
 
 __all__ = [
     'generate_session_id',
@@ -22,5 +26,9 @@ __all__ = [
     'get_timestamp',
     'calculate_timeout',
     'setup_logging',
-    'get_logger'
+    'get_logger',
+    'LatencyWindow',
+    'LoopWatchdog',
+    'canonicalize_query',
+    'TrigramIndex'
 ]
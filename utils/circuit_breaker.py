@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. While open, callers skip the
+    protected dependency entirely; recovery is driven by an external probe
+    calling half_open() and close(), so no request ever pays for a trial call.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        self.stats = {'trips': 0, 'recoveries': 0, 'short_circuited': 0}
+
+    def allow(self) -> bool:
+        """Whether a call may go to the dependency"""
+        if self.state == self.CLOSED:
+            return True
+        self.stats['short_circuited'] += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this one tripped the breaker"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+                return True
+            return False
+
+    def trip(self):
+        """Open immediately (e.g. the dependency was down at startup)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.stats['trips'] += 1
+
+    def half_open(self):
+        with self._lock:
+            self.state = self.HALF_OPEN
+
+    def close(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.stats['recoveries'] += 1
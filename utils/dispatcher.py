@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from utils.metrics import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+
+class SessionDispatcher:
+    """
+    Run handler(item) for queued items on a bounded pool of workers. Items
+    with the same key (a user, or a user's search session) are handled one
+    at a time in arrival order; different keys run in parallel, so one slow
+    key doesn't hold up everyone else.
+    """
+
+    def __init__(self, handler, workers=16, max_pending=1000, name='dispatcher'):
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queues = {}         # key -> deque of (item, enqueued_at)
+        self._ready = None        # keys with queued items and no worker on them
+        self._busy = set()        # keys a worker is handling right now
+        self._pending = 0
+        self._space = None        # Set while below max_pending
+        self._idle = None         # Set when nothing is queued or running
+        self._tasks = []
+        self.wait_time = QuantileSketch()
+        self.handle_time = QuantileSketch()
+        self.stats = {'submitted': 0, 'handled': 0, 'errors': 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"{self.name.capitalize()} started with {self.workers} workers")
+
+    async def submit(self, key, item):
+        """Queue an item behind earlier items of its key; waits while the dispatcher is full"""
+        if not self._tasks:
+            self.start()
+        while self._pending >= self.max_pending:
+            self._space.clear()
+            await self._space.wait()
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            if key not in self._busy:
+                self._ready.put_nowait(key)
+        queue.append((item, time.monotonic()))
+        self._pending += 1
+        self._idle.clear()
+        self.stats['submitted'] += 1
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._queues.get(key)
+            if not queue:
+                continue
+            item, enqueued_at = queue.popleft()
+            if not queue:
+                del self._queues[key]
+            self._busy.add(key)
+
+            started = time.monotonic()
+            self.wait_time.record(started - enqueued_at)
+            try:
+                await self.handler(item)
+                self.stats['handled'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error handling {self.name} item: {e}")
+            finally:
+                self.handle_time.record(time.monotonic() - started)
+                self._busy.discard(key)
+                self._pending -= 1
+                if key in self._queues:
+                    # Requeue at the back so busy sessions take turns with the rest
+                    self._ready.put_nowait(key)
+                if self._pending < self.max_pending:
+                    self._space.set()
+                if self._pending == 0:
+                    self._idle.set()
+
+    async def drain(self):
+        """Wait until everything submitted so far has been handled"""
+        if self._tasks:
+            await self._idle.wait()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def metrics(self):
+        """Queue depth, sessions waiting and wait/handling latency (seconds)"""
+        return {
+            'depth': self._pending,
+            'sessions_queued': len(self._queues),
+            'sessions_running': len(self._busy),
+            'wait_p50': self.wait_time.quantile(0.5),
+            'wait_p99': self.wait_time.quantile(0.99),
+            'handle_p50': self.handle_time.quantile(0.5),
+            'handle_p99': self.handle_time.quantile(0.99),
+            **self.stats
+        }
@@ -0,0 +1,72 @@
+import heapq
+import itertools
+from typing import Dict, Hashable, List, Tuple
+
+
+class SpaceSaving:
+    """
+    Top-k frequent items of a stream in bounded memory (Metwally et al.).
+    Holds at most `capacity` counters; an unseen item takes over the
+    smallest one, inheriting its count as the over-estimation `error`.
+    The smallest counter is found through a min-heap whose outdated
+    entries are skipped lazily, so add() is O(log capacity).
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._counts: Dict[Hashable, float] = {}
+        self._errors: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []  # (count, sequence, item); stale once the count moved
+        self._sequence = itertools.count()  # Ties never compare items
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def add(self, item: Hashable, count: float = 1.0):
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+            self._push(item)
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0.0
+            self._push(item)
+            return
+
+        while True:
+            floor, _, victim = heapq.heappop(self._heap)
+            if self._counts.get(victim) == floor:
+                break
+        del self._counts[victim]
+        del self._errors[victim]
+        self._counts[item] = floor + count
+        self._errors[item] = floor
+        self._push(item)
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self._counts[item], next(self._sequence), item))
+        if len(self._heap) > 4 * max(self.capacity, 1):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Drop stale heap entries: one entry per tracked item"""
+        self._heap = [(count, next(self._sequence), item) for item, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n: int = 10) -> List[Tuple[Hashable, float, float]]:
+        """(item, estimated count, maximum over-estimation), most frequent first"""
+        ranked = sorted(self._counts.items(), key=lambda entry: entry[1], reverse=True)[:n]
+        return [(item, count, self._errors[item]) for item, count in ranked]
+
+    def decay(self, factor: float = 0.5):
+        """Scale every counter down so the ranking follows recent traffic"""
+        for item in self._counts:
+            self._counts[item] *= factor
+            self._errors[item] *= factor
+        self.total *= factor
+        self._rebuild()
@@ -69,6 +69,31 @@ def parse_callback_data(callback_data: str) -> Optional[Dict[str, Any]]:
                     'next_index': int(parts[2])
                 }
         
+        elif callback_data.startswith(('pick_', 'list_')):
+            parts = callback_data.split('_')
+            if len(parts) >= 3:
+                key = 'index' if parts[0] == 'pick' else 'page'
+                return {
+                    'type': parts[0],
+                    'user_id': int(parts[1]),
+                    key: int(parts[2])
+                }
+        
+        elif callback_data.startswith(('sort_', 'filter_')):
+            parts = callback_data.split('_', 2)
+            if len(parts) == 3:
+                return {
+                    'type': parts[0],
+                    'user_id': int(parts[1]),
+                    'value': parts[2]
+                }
+        
+        elif callback_data.startswith('results_'):
+            return {
+                'type': 'results',
+                'user_id': int(callback_data.split('_')[1])
+            }
+        
         elif callback_data in ['retry', 'new_search']:
             return {
                 'type': callback_data
@@ -86,6 +111,22 @@ def create_callback_data(action: str, **kwargs) -> str:
         if 'user_id' in kwargs and 'next_index' in kwargs:
             return f"next_{kwargs['user_id']}_{kwargs['next_index']}"
     
+    elif action == 'pick':
+        if 'user_id' in kwargs and 'index' in kwargs:
+            return f"pick_{kwargs['user_id']}_{kwargs['index']}"
+    
+    elif action == 'list':
+        if 'user_id' in kwargs and 'page' in kwargs:
+            return f"list_{kwargs['user_id']}_{kwargs['page']}"
+    
+    elif action in ['sort', 'filter']:
+        if 'user_id' in kwargs and 'value' in kwargs:
+            return f"{action}_{kwargs['user_id']}_{kwargs['value']}"
+    
+    elif action == 'results':
+        if 'user_id' in kwargs:
+            return f"results_{kwargs['user_id']}"
+    
     elif action in ['retry', 'new_search']:
         return action
     
@@ -103,6 +144,6 @@ def get_timestamp() -> str:
     """Get current timestamp string"""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def calculate_timeout(base_timeout: int, retry_count: int) -> int:
+def calculate_timeout(base_timeout: float, retry_count: int, max_timeout: float = 300) -> float:
     """Calculate timeout with exponential backoff"""
-    return min(base_timeout * (2 ** retry_count), 300)  # Max 5 minutes
\ No newline at end of file
+    return min(base_timeout * (2 ** retry_count), max_timeout)  # Default max 5 minutes
\ No newline at end of file
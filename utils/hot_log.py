@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+import zlib
+
+from config import Config
+
+
+def session_sampled(session_id, fraction=None) -> bool:
+    """Whether a session is in the always-logged sample (same answer in every process)"""
+    fraction = Config.LOG_SESSION_SAMPLE_RATE if fraction is None else fraction
+    if session_id is None or fraction <= 0:
+        return False
+    return zlib.crc32(str(session_id).encode('utf-8')) % 10000 < fraction * 10000
+
+
+class _Record:
+    """key=value message formatted only if a handler actually emits it"""
+
+    __slots__ = ('event', 'fields', 'max_value')
+
+    def __init__(self, event, fields, max_value):
+        self.event = event
+        self.fields = fields
+        self.max_value = max_value
+
+    def __str__(self):
+        parts = [self.event]
+        for key, value in self.fields.items():
+            value = str(value)
+            if self.max_value and len(value) > self.max_value:
+                value = value[:self.max_value] + '…'
+            if not value or any(ch in value for ch in ' ="\n'):
+                value = '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            parts.append(f"{key}={value}")
+        return ' '.join(parts)
+
+
+class _SiteLimit:
+    __slots__ = ('tokens', 'updated', 'suppressed')
+
+    def __init__(self, burst):
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+
+class HotPathLogger:
+    """
+    Structured logging for high-frequency events. Each event name is a call
+    site with its own token bucket; events over the rate are counted and the
+    count is reported with the next one that gets through. Warnings and
+    errors, and every event of a sampled session, always pass, in full.
+    """
+
+    def __init__(self, logger, rate=None, burst=None, max_value=None):
+        self.logger = logger
+        self.rate = Config.LOG_HOT_RATE if rate is None else rate
+        self.burst = Config.LOG_HOT_BURST if burst is None else burst
+        self.max_value = Config.LOG_VALUE_MAX_LENGTH if max_value is None else max_value
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def _admit(self, event):
+        """Token bucket per call site; returns (allowed, suppressed since the last allowed)"""
+        if self.rate <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(event)
+            if site is None:
+                site = self._sites[event] = _SiteLimit(self.burst)
+            site.tokens = min(self.burst, site.tokens + (now - site.updated) * self.rate)
+            site.updated = now
+            if site.tokens < 1:
+                site.suppressed += 1
+                return False, 0
+            site.tokens -= 1
+            suppressed, site.suppressed = site.suppressed, 0
+            return True, suppressed
+
+    def log(self, level, event, session=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if session is not None:
+            fields['session'] = session
+        if level >= logging.WARNING or session_sampled(session):
+            self.logger.log(level, '%s', _Record(event, fields, None))
+            return
+
+        allowed, suppressed = self._admit(event)
+        if not allowed:
+            return
+        if suppressed:
+            fields['suppressed'] = suppressed
+        self.logger.log(level, '%s', _Record(event, fields, self.max_value))
+
+    def debug(self, event, session=None, **fields):
+        self.log(logging.DEBUG, event, session, **fields)
+
+    def info(self, event, session=None, **fields):
+        self.log(logging.INFO, event, session, **fields)
+
+    def warning(self, event, session=None, **fields):
+        self.log(logging.WARNING, event, session, **fields)
+
+    def error(self, event, session=None, **fields):
+        self.log(logging.ERROR, event, session, **fields)
+
+    def metrics(self):
+        """Events currently being suppressed, per call site"""
+        with self._lock:
+            return {event: site.suppressed for event, site in self._sites.items() if site.suppressed}
+
+
+def get_hot_logger(name: str) -> HotPathLogger:
+    """Hot-path logger wrapping logging.getLogger(name)"""
+    return HotPathLogger(logging.getLogger(name))
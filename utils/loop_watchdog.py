@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    """
+    Measures event loop scheduling lag with a periodic sleep, and uses a
+    helper thread to sample the loop thread's stack while it is blocked,
+    so slow synchronous callbacks show up in the log with where they were.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25,
+                 report_interval: float = 60.0, window: int = 3000):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.lag = LatencyWindow(size=window)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start measuring on the running loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(target=self._sample_stalls, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            lag = max(0.0, now - started - self.interval)
+            self._heartbeat = time.monotonic()
+            self.lag.record(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            if now - last_report >= self.report_interval:
+                last_report = now
+                m = self.metrics()
+                logger.info(
+                    f"Event loop lag p50={m['lag_p50_ms']:.1f}ms p99={m['lag_p99_ms']:.1f}ms "
+                    f"max={m['lag_max_ms']:.1f}ms stalls={m['stalls']}"
+                )
+
+    def _sample_stalls(self):
+        """Log the loop thread's stack once per stall longer than the threshold"""
+        reported_heartbeat = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else '<no frame>'
+            logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f}ms, loop thread at:\n{stack}")
+
+    def _ms(self, q) -> Optional[float]:
+        value = self.lag.percentile(q)
+        return value * 1000 if value is not None else 0.0
+
+    def metrics(self):
+        """Lag percentiles (milliseconds) and the number of reported stalls"""
+        return {
+            'lag_p50_ms': self._ms(0.5),
+            'lag_p95_ms': self._ms(0.95),
+            'lag_p99_ms': self._ms(0.99),
+            'lag_max_ms': self.max_lag * 1000,
+            'stalls': self.stalls,
+        }
+
+
+def install_event_loop_policy(name: str) -> str:
+    """Select the event loop implementation; returns the one actually installed"""
+    if name == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("uvloop requested but not installed, using the default asyncio loop")
+            return 'asyncio'
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return 'uvloop'
+    if name != 'asyncio':
+        logger.warning(f"Unknown event loop {name!r}, using the default asyncio loop")
+    return 'asyncio'
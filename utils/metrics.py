@@ -0,0 +1,134 @@
+import math
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies for percentile estimates"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class QuantileSketch:
+    """
+    Compact streaming quantile estimate: log-spaced buckets with bounded
+    relative error (DDSketch-style). Counts are halved every `half_life`
+    samples so estimates follow a backend whose latency drifts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 1e-4,
+                 max_buckets: int = 512, half_life: Optional[int] = 1000):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.half_life = half_life
+        self._buckets: Dict[int, float] = {}
+        self.count = 0.0
+        self._since_decay = 0
+
+    def __len__(self):
+        return int(self.count)
+
+    def record(self, value: float):
+        index = math.ceil(math.log(max(value, self.min_value)) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0.0) + 1.0
+        self.count += 1.0
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+        self._since_decay += 1
+        if self.half_life and self._since_decay >= self.half_life:
+            self._decay()
+
+    def _collapse(self):
+        """Merge the two lowest buckets; only the tail we time out on needs precision"""
+        low, second = sorted(self._buckets)[:2]
+        self._buckets[second] += self._buckets.pop(low)
+
+    def _decay(self):
+        self._since_decay = 0
+        self._buckets = {i: c / 2 for i, c in self._buckets.items() if c / 2 >= 0.01}
+        self.count = sum(self._buckets.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._buckets:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                break
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+
+class AdaptiveTimeout:
+    """
+    Timeout for one operation derived from its observed latency: the
+    quantile times a safety factor, clamped to [floor, ceiling]. Until
+    min_samples have been seen the configured default is used.
+
+    Timed-out waits are censored samples (the latency is only known to
+    exceed the wait), so they never enter the sketch; recording them at
+    the timeout would make the timeout feed on itself. Instead, while more
+    waits time out than the quantile allows for, the estimate is stretched
+    by up to `max_stretch`.
+    """
+
+    def __init__(self, default: float, quantile: float = 0.99, factor: float = 3.0,
+                 floor: float = 1.0, ceiling: float = 300.0, min_samples: int = 20,
+                 max_stretch: float = 2.0, rate_alpha: float = 0.02):
+        self.default = default
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.max_stretch = max_stretch
+        self.rate_alpha = rate_alpha
+        self.sketch = QuantileSketch()
+        self.timeouts = 0
+        self.timeout_rate = 0.0  # Exponentially weighted fraction of waits that timed out
+
+    def record(self, seconds: float):
+        self.sketch.record(seconds)
+        self.timeout_rate *= 1 - self.rate_alpha
+
+    def record_timeout(self, waited: float):
+        """A wait that hit its deadline; `waited` is a lower bound on the latency, not a sample"""
+        self.timeouts += 1
+        self.timeout_rate += self.rate_alpha * (1 - self.timeout_rate)
+
+    def stretch(self) -> float:
+        """Multiplier (1 to max_stretch) for timeouts occurring beyond the quantile's share"""
+        tail = 1 - self.quantile
+        if tail <= 0 or self.timeout_rate <= tail:
+            return 1.0
+        return min(self.max_stretch, self.timeout_rate / tail)
+
+    def current(self) -> float:
+        if len(self.sketch) < self.min_samples:
+            return self.default
+        estimate = self.sketch.quantile(self.quantile) * self.factor * self.stretch()
+        return min(self.ceiling, max(self.floor, estimate))
+
+    def metrics(self):
+        return {
+            'timeout': self.current(),
+            'p50': self.sketch.quantile(0.5),
+            'p99': self.sketch.quantile(0.99),
+            'samples': len(self.sketch),
+            'timeouts': self.timeouts,
+            'timeout_rate': self.timeout_rate,
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import time
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerStats:
+    """Per-handler call counts and cumulative wall time, recorded by @profiled"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._stats = {}  # name -> [calls, total seconds, max seconds, errors]
+
+    def record(self, name, elapsed, failed=False):
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = [0, 0.0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+        if failed:
+            entry[3] += 1
+
+    def snapshot(self):
+        """{name: {calls, total_s, avg_ms, max_ms, errors}}, busiest first"""
+        return {
+            name: {
+                'calls': calls,
+                'total_s': total,
+                'avg_ms': total / calls * 1000 if calls else 0.0,
+                'max_ms': worst * 1000,
+                'errors': errors,
+            }
+            for name, (calls, total, worst, errors) in sorted(self._stats.items(), key=lambda item: -item[1][1])
+        }
+
+    def reset(self):
+        self._stats.clear()
+
+
+def profiled(name=None, stats=None):
+    """
+    Record call count and cumulative time of a handler. While recording is
+    disabled the wrapper only checks one flag before calling through.
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+        target = stats or handler_stats
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not target.enabled:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    target.record(label, time.perf_counter() - started, failed)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not target.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                target.record(label, time.perf_counter() - started, failed)
+        return wrapper
+
+    return decorator
+
+
+class ProcessProfiler:
+    """Time-boxed cProfile of the running event loop thread, written to disk"""
+
+    def __init__(self, directory='profiles', max_seconds=120):
+        self.directory = Path(directory)
+        self.max_seconds = max_seconds
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    async def profile_for(self, seconds: float, label: str = 'process'):
+        """Profile for `seconds`; returns the (.prof, .txt) paths, or None if one is already running"""
+        if self._running:
+            return None
+        seconds = max(1.0, min(float(seconds), self.max_seconds))
+        self._running = True
+        profiler = cProfile.Profile()
+        try:
+            logger.info(f"Profiling {label} for {seconds:.0f}s")
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+            return await asyncio.to_thread(self._write, profiler, label)
+        finally:
+            self._running = False
+
+    def _write(self, profiler, label):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"{label}-{time.strftime('%Y%m%d-%H%M%S')}"
+        prof_path = stem.with_suffix('.prof')
+        text_path = stem.with_suffix('.txt')
+        profiler.dump_stats(prof_path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(50)
+        text_path.write_text(summary.getvalue(), encoding='utf-8')
+        logger.info(f"Profile written to {prof_path}")
+        return prof_path, text_path
+
+
+# Global profiling instances
+handler_stats = HandlerStats(enabled=Config.HANDLER_STATS_ENABLED)
+process_profiler = ProcessProfiler(Config.PROFILE_DIR, Config.PROFILE_MAX_SECONDS)
@@ -0,0 +1,43 @@
+import re
+import unicodedata
+from typing import Tuple
+
+# s05e09, S5E9, s05 e09, 5x09, season 5 episode 9
+_EPISODE_PATTERNS = [
+    re.compile(r'\bs(?:eason)?\s*(\d{1,2})\s*e(?:p(?:isode)?)?\s*(\d{1,3})\b'),
+    re.compile(r'\b(\d{1,2})x(\d{1,3})\b'),
+]
+_SEASON_PATTERN = re.compile(r'\bs(?:eason)?\s*(\d{1,2})\b')
+_SEPARATORS = re.compile(r'[\s._\-+/\\|:,;]+')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_NUMBER_TOKEN = re.compile(r'\b(?:s\d{2}e\d{2,3}|s\d{2}|\d+)\b')
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def canonicalize_query(query: str) -> str:
+    """
+    Canonical form of a search query: lowercase, accents stripped,
+    separators/punctuation collapsed to single spaces, and season/episode
+    tokens normalized to sNNeNN (or sNN).
+    """
+    if not query:
+        return ''
+
+    text = _strip_accents(unicodedata.normalize('NFKC', query)).lower()
+    text = _SEPARATORS.sub(' ', text)
+    text = _PUNCTUATION.sub('', text)
+
+    for pattern in _EPISODE_PATTERNS:
+        text = pattern.sub(lambda m: f"s{int(m.group(1)):02d}e{int(m.group(2)):02d}", text)
+    text = _SEASON_PATTERN.sub(lambda m: f"s{int(m.group(1)):02d}", text)
+
+    return ' '.join(text.split())
+
+
+def number_tokens(canonical: str) -> Tuple[str, ...]:
+    """Season/episode and numeric tokens that must match exactly between near-duplicates"""
+    return tuple(_NUMBER_TOKEN.findall(canonical))
@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .query_normalizer import number_tokens
+
+
+def trigrams(text: str) -> frozenset:
+    """Character trigrams of each word, padded so short words still produce some"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class TrigramIndex:
+    """Bounded LRU map of canonical queries to results with trigram fuzzy lookup"""
+
+    def __init__(self, max_entries: int = 5000, threshold: float = 0.6, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._entries = OrderedDict()  # canonical -> (grams, value, expires_at)
+        self._postings = {}            # trigram -> set of canonical keys
+        self.stats = {'exact_hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, canonical: str, value: Any):
+        """Insert or refresh a resolved query"""
+        if not canonical:
+            return
+        if canonical in self._entries:
+            self._remove(canonical)
+        grams = trigrams(canonical)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[canonical] = (grams, value, expires_at)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(canonical)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+
+    def _remove(self, canonical):
+        grams, _, _ = self._entries.pop(canonical)
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(canonical)
+                if not keys:
+                    del self._postings[gram]
+
+    def _live(self, canonical, now):
+        _, value, expires_at = self._entries[canonical]
+        if expires_at is not None and expires_at < now:
+            self._remove(canonical)
+            return False
+        return True
+
+    def peek(self, canonical: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """(value, monotonic expiry) of an exact entry, without touching LRU order or stats"""
+        entry = self._entries.get(canonical)
+        return (entry[1], entry[2]) if entry else None
+
+    def lookup(self, canonical: str) -> Optional[Tuple[str, Any, float]]:
+        """Return (matched canonical, value, similarity) for the best match above threshold"""
+        now = time.monotonic()
+        if canonical in self._entries and self._live(canonical, now):
+            self._entries.move_to_end(canonical)
+            self.stats['exact_hits'] += 1
+            return canonical, self._entries[canonical][1], 1.0
+
+        grams = trigrams(canonical)
+        if not grams:
+            self.stats['misses'] += 1
+            return None
+
+        # Count shared trigrams per candidate from the posting lists
+        shared = {}
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        numbers = number_tokens(canonical)
+        best = None
+        best_score = self.threshold
+        for key, overlap in shared.items():
+            key_grams = self._entries[key][0]
+            score = overlap / (len(grams) + len(key_grams) - overlap)
+            # Different episodes/years are different results, however similar the text
+            if score >= best_score and number_tokens(key) == numbers:
+                best, best_score = key, score
+
+        if best is None or not self._live(best, now):
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(best)
+        self.stats['fuzzy_hits'] += 1
+        return best, self._entries[best][1], best_score
+
+    def hit_rate(self) -> float:
+        hits = self.stats['exact_hits'] + self.stats['fuzzy_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0